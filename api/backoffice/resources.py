@@ -10,10 +10,8 @@ logger = logging.getLogger()
 logger.setLevel(eval(os.environ["LOGGINGLEVEL"]))
 
 from decimal import Decimal
-from models import OrdersModel, ItemReceiptsModel, CustomersModel
-ordersModel = OrdersModel()
-itemReceiptsModel = ItemReceiptsModel()
-customersModel = CustomersModel()
+from models import TableModel, OrdersModel, tables
+models = dict([(table, OrdersModel() if table == "orders" else TableModel(table)) for table in tables.keys()])
 
 def handler(event, context):
     # TODO implement
@@ -23,41 +21,50 @@ def handler(event, context):
             frontend = event["queryStringParameters"]["frontend"]
             feOrderId = event["queryStringParameters"]["feorderid"]
             order = json.loads(event["body"], parse_float=Decimal)
-            return ordersModel.insertOrder(frontend, feOrderId, order)
+            return models["orders"].insertEntity(frontend, feOrderId, order)
         elif function == "orderstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             orderStatus = json.loads(event["body"])
-            return ordersModel.updateOrderStatus(id, orderStatus)
+            return models["orders"].updateEntityStatus(id, orderStatus)
+        elif function == "orderstatus:batch" and event["httpMethod"] == "PUT":
+            ordersStatus = json.loads(event["body"])
+            return models["orders"].updateEntitiesStatus(ordersStatus)
         elif function == "order" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             feOrderId = event["queryStringParameters"]["feorderid"]
-            return ordersModel.getOrder(frontend, feOrderId)
+            return models["orders"].getEntity(frontend, feOrderId)
         elif function == "itemreceipt" and event["httpMethod"] == "PUT":
             frontend = event["queryStringParameters"]["frontend"]
             boPONum = event["queryStringParameters"]["boponum"]
             itemReceipt = json.loads(event["body"], parse_float=Decimal)
-            return itemReceiptsModel.insertItemReceipt(frontend, boPONum, itemReceipt)
+            return models["itemreceipts"].insertEntity(frontend, boPONum, itemReceipt)
         elif function == "itemreceiptstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             itemReceiptStatus = json.loads(event["body"])
-            return itemReceiptsModel.updateItemReceiptStatus(id, itemReceiptStatus)
+            return models["itemreceipts"].updateEntityStatus(id, itemReceiptStatus)
+        elif function == "itemreceiptstatus:batch" and event["httpMethod"] == "PUT":
+            itemReceiptsStatus = json.loads(event["body"])
+            return models["itemreceipts"].updateEntitiesStatus(itemReceiptsStatus)
         elif function == "itemreceipt" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             boPONum = event["queryStringParameters"]["boponum"]
-            return itemReceiptsModel.getItemReceipt(frontend, boPONum)
+            return models["itemreceipts"].getEntity(frontend, boPONum)
         elif function == "customer" and event["httpMethod"] == "PUT":
             frontend = event["queryStringParameters"]["frontend"]
             feCustomerId = event["queryStringParameters"]["fecustomerid"]
             customer = json.loads(event["body"], parse_float=Decimal)
-            return customersModel.insertCustomer(frontend, feCustomerId, customer)
+            return models["customers-bo"].insertEntity(frontend, feCustomerId, customer)
         elif function == "customerstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             customerStatus = json.loads(event["body"])
-            return customersModel.updateCustomerStatus(id, customerStatus)
+            return models["customers-bo"].updateEntityStatus(id, customerStatus)
+        elif function == "customerstatus:batch" and event["httpMethod"] == "PUT":
+            customersStatus = json.loads(event["body"])
+            return models["customers-bo"].updateEntitiesStatus(customersStatus)
         elif function == "customer" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             feCustomerId = event["queryStringParameters"]["fecustomerid"]
-            return customersModel.getCustomer(frontend, feCustomerId)
+            return models["customers-bo"].getEntity(frontend, feCustomerId)
     except Exception as e:
         log = traceback.format_exc()
         logger.exception(log)
@@ -4,6 +4,7 @@ from __future__ import print_function
 __author__ = 'bibow'
 
 import json, uuid, os, traceback
+from time import sleep
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 
@@ -13,6 +14,7 @@ logger.setLevel(eval(os.environ["LOGGINGLEVEL"]))
 
 import boto3
 from boto3.dynamodb.conditions import Key, Attr
+from datawald_tablemodel import tables, countSyncTask
 dynamodb = boto3.resource('dynamodb')
 sqs = boto3.resource('sqs')
 
@@ -36,98 +38,9 @@ class SyncControlModel(object):
 
     def __init__(self):
         self._syncControl = dynamodb.Table('sync_control')
-        self.tables = {
-            "orders": {
-                "area": "backoffice",
-                "srcKey": "fe_order_id",
-                "tgtKey": "bo_order_id",
-                "subject": "syncOrders"
-            },
-            "invoices": {
-                "area": "frontend",
-                "srcKey": "bo_invoice_id",
-                "tgtKey": "fe_invoice_id",
-                "subject": "syncInvoices"
-            },
-            "customers-bo": {
-                "area": "backoffice",
-                "srcKey": "fe_customer_id",
-                "tgtKey": "bo_customer_id",
-                "subject": "syncBOCustomers"
-            },
-            "customers-fe": {
-                "area": "frontend",
-                "srcKey": "bo_customer_id",
-                "tgtKey": "fe_customer_id",
-                "subject": "syncFECustomers"
-            },
-            "shipments": {
-                "area": "frontend",
-                "srcKey": "bo_shipment_id",
-                "tgtKey": "fe_shipment_id",
-                "subject": "syncShipments"
-            },
-            "purchaseorders": {
-                "area": "frontend",
-                "srcKey": "bo_po_num",
-                "tgtKey": "fe_po_num",
-                "subject": "syncPurchaseOrders"
-            },
-            "itemreceipts": {
-                "area": "backoffice",
-                "srcKey": "bo_po_num",
-                "tgtKey": "bo_itemreceipt_id",
-                "subject": "syncItemReceipts"
-            },
-            "products": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProducts"
-            },
-            "products-customoption": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-inventory": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-imagegallery": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-links": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-categories": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-pricelevels": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            },
-            "products-variants": {
-                "area": "frontend",
-                "srcKey": "sku",
-                "tgtKey": "fe_product_id",
-                "subject": "syncProductsExtData"
-            }
-        }
+        self.tables = tables
+        # Long-lived work queues by name (see SQSSHAREDQUEUES), opened once per container.
+        self._queues = {}
         self.boTables = [k for k, v in self.tables.items() if v["area"] == "backoffice"]
         self.feTables = [k for k, v in self.tables.items() if v["area"] == "frontend"]
 
@@ -135,14 +48,9 @@ class SyncControlModel(object):
     def syncControl(self):
         return self._syncControl
 
-    def getTask(self, table, id):
+    def _task(self, table, item):
         task = {"ready": 0}
-        response = dynamodb.Table(table).query(
-            KeyConditionExpression=Key('id').eq(id),
-            # Limit=1
-        )
-        if response['Count'] != 0:
-            item = response["Items"][0]
+        if item is not None:
             task["status"] = item["tx_status"]
             task["detail"] = {"note": item["tx_note"]}
             pk = self.tables[table]["tgtKey"]
@@ -150,6 +58,14 @@ class SyncControlModel(object):
                 task["detail"][pk] = item[pk]
             if task["status"] not in ["N", "P"]:
                 task["ready"] = 1
+        return task
+
+    def getTask(self, table, id):
+        response = dynamodb.Table(table).query(
+            KeyConditionExpression=Key('id').eq(id),
+            # Limit=1
+        )
+        task = self._task(table, response["Items"][0] if response['Count'] != 0 else None)
 
         return {
             "statusCode": 200,
@@ -157,16 +73,48 @@ class SyncControlModel(object):
             "body": (json.dumps(task, indent=4, cls=JSONEncoder))
         }
 
+    def getTasks(self, table, ids):
+        """The getTask results of the ids, in order, resolved with BatchGetItem.
+        """
+        maxIds = int(os.environ.get("TASKSBATCHMAXIDS", 1000))
+        if len(ids) > maxIds:
+            return {
+                "statusCode": 400,
+                "headers": {},
+                "body": (
+                    json.dumps({"error": "Up to {0} ids per request, got {1}.".format(maxIds, len(ids))}, indent=4)
+                )
+            }
+        items = dict(
+            [
+                (item["id"], item) for item in self._getEntities(
+                    table, ids, "id,tx_status,tx_note,{0}".format(self.tables[table]["tgtKey"])
+                )
+            ]
+        )
+        tasks = []
+        for id in ids:
+            task = self._task(table, items.get(id))
+            task["id"] = id
+            tasks.append(task)
+
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": (json.dumps({"tasks": tasks}, indent=4, cls=JSONEncoder))
+        }
+
     def getCutDt(self, frontend, task):
         cutDt = os.environ["DEFAULTCUTDT"]
         offset = 0
+        cursor = None
         response = self.syncControl.query(
             IndexName="task_index",
             KeyConditionExpression=Key('task').eq(task),
             FilterExpression=Attr('frontend').eq(frontend) & Attr('sync_status').is_in(['Completed', 'Fail', 'Incompleted', 'Processing']),
-            ProjectionExpression="id,cut_dt,#offset",
+            ProjectionExpression="id,cut_dt,#offset,#cursor",
             ScanIndexForward=False,
-            ExpressionAttributeNames={"#offset": "offset"}
+            ExpressionAttributeNames={"#offset": "offset", "#cursor": "cursor"}
         )
         items = response['Items']
         while 'LastEvaluatedKey' in response:
@@ -174,9 +122,9 @@ class SyncControlModel(object):
                 IndexName="task_index",
                 KeyConditionExpression=Key('task').eq(task),
                 FilterExpression=Attr('frontend').eq(frontend) & Attr('sync_status').is_in(['Completed', 'Fail', 'Incompleted']),
-                ProjectionExpression="id,cut_dt,#offset",
+                ProjectionExpression="id,cut_dt,#offset,#cursor",
                 ScanIndexForward=False,
-                ExpressionAttributeNames={"#offset": "offset"},
+                ExpressionAttributeNames={"#offset": "offset", "#cursor": "cursor"},
                 ExclusiveStartKey=response['LastEvaluatedKey']
             )
             items.extend(response['Items'])
@@ -191,6 +139,7 @@ class SyncControlModel(object):
             id = lastItem['id']
             cutDt = lastItem['cut_dt']
             offset = int(lastItem['offset'])
+            cursor = lastItem.get('cursor')
             # Flsuh Sync Control Table by frontend and task.
             self.flushSyncControl(id, frontend, task)
         return {
@@ -198,7 +147,8 @@ class SyncControlModel(object):
             "headers": {},
             "body": (json.dumps({
                         "cut_dt": cutDt,
-                        "offset": offset
+                        "offset": offset,
+                        "cursor": cursor
                     },
                     indent=4,
                     cls=JSONEncoder
@@ -248,8 +198,12 @@ class SyncControlModel(object):
             'start_dt': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
             'cut_dt': syncTask['cut_dt'],
             'offset': 0 if "offset" not in syncTask.keys() else syncTask["offset"],
+            # Keyset cursor (serialized LastEvaluatedKey) of the back office, if it pages that way.
+            'cursor': syncTask.get("cursor"),
             'sync_note': 'Process task(%s) for frontend(%s).' % (task, frontend),
-            'entities': []
+            'entities': [],
+            # Records DataWald kept rejecting; the offset has moved past them.
+            'failed': syncTask.get("failed", [])
         }
 
         if len(syncTask['entities']) > 0:
@@ -258,6 +212,11 @@ class SyncControlModel(object):
             self.syncControl.put_item(Item=_syncTask)
 
             self.dispatchSyncTask(backoffice, frontend, table, id, syncTask['entities'])
+        else:
+            # Nothing to dispatch, but keep the cut date, the cursor and the failed records.
+            _syncTask['sync_status'] = 'Fail' if len(_syncTask['failed']) > 0 else 'Completed'
+            _syncTask['end_dt'] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            self.syncControl.put_item(Item=_syncTask)
 
         return {
             "statusCode": 200,
@@ -330,8 +289,76 @@ class SyncControlModel(object):
     def getSyncTasks(self):
         pass
 
+    def _getEntities(self, table, ids, projection=None):
+        """Get the entities (by default their dispatch attributes) with BatchGetItem, 100 keys per call,
+        in the order of ids.
+        """
+        if projection is None:
+            projection = "id,frontend,{0},data_type,tx_status,tx_note".format(self.tables[table]["srcKey"])
+        items = {}
+        # BatchGetItem rejects duplicated keys.
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), 100):
+            requestItems = {
+                table: {
+                    "Keys": [{"id": id} for id in ids[i:i + 100]],
+                    "ProjectionExpression": projection
+                }
+            }
+            retries = 0
+            while requestItems:
+                if retries > 0:
+                    # Unprocessed keys mean the table is throttling; back off before asking again.
+                    sleep(min(0.05 * 2 ** retries, 2))
+                response = dynamodb.batch_get_item(RequestItems=requestItems)
+                for item in response["Responses"].get(table, []):
+                    items[item["id"]] = item
+                requestItems = response.get("UnprocessedKeys")
+                retries = retries + 1
+        return [items[id] for id in ids if id in items.keys()]
+
+    def _packMessages(self, items):
+        """Pack the items into message bodies.  With SQSPACKMESSAGES, several items share one
+        message (a JSON list) up to SQSMAXMESSAGESIZE bytes.
+        """
+        maxMessageSize = int(os.environ.get("SQSMAXMESSAGESIZE", 262144))
+        # The id is only read back here (to flag failed sends), it is not part of the message.
+        body = lambda item: dict([(k, v) for k, v in item.items() if k != "id"])
+        if os.environ.get("SQSPACKMESSAGES") is None:
+            return [([item], json.dumps(body(item), indent=4, cls=JSONEncoder)) for item in items]
+
+        messages = []
+        pack = []
+        size = 2
+        for item in items:
+            itemSize = len(json.dumps(body(item), cls=JSONEncoder).encode("utf-8")) + 2
+            if len(pack) > 0 and size + itemSize > maxMessageSize:
+                messages.append((pack, json.dumps([body(item) for item in pack], cls=JSONEncoder)))
+                pack = []
+                size = 2
+            pack.append(item)
+            size = size + itemSize
+        if len(pack) > 0:
+            messages.append((pack, json.dumps([body(item) for item in pack], cls=JSONEncoder)))
+        return messages
+
+    def _getQueue(self, queueName):
+        # create_queue returns the existing queue when the attributes match.
+        if queueName not in self._queues.keys():
+            self._queues[queueName] = sqs.create_queue(
+                QueueName=queueName,
+                Attributes={"FifoQueue": "true", "ContentBasedDeduplication": "true"}
+            )
+        return self._queues[queueName]
+
     def dispatchSyncTask(self, backoffice, frontend, table, id, entities):
-        queueName = "{0}_{1}_{2}_{3}".format(backoffice, frontend, table, id)[:75] + ".fifo"
+        # With SQSSHAREDQUEUES, the sync tasks of a (backoffice, frontend, table) share one long-lived
+        # queue: the task id is the message group id, and an end-of-task message closes the group.
+        shared = os.environ.get("SQSSHAREDQUEUES") is not None
+        if shared:
+            queueName = "{0}_{1}_{2}".format(backoffice, frontend, table)[:75] + ".fifo"
+        else:
+            queueName = "{0}_{1}_{2}_{3}".format(backoffice, frontend, table, id)[:75] + ".fifo"
 
         if table in self.boTables:
             maxTaskAgents = int(os.environ["BACKOFFICEMAXTASKAGENTS"])
@@ -343,33 +370,100 @@ class SyncControlModel(object):
             maxTaskAgents = 1
 
         try:
-            taskQueue = sqs.create_queue(
-                QueueName=queueName,
-                Attributes={"FifoQueue": "true", "ContentBasedDeduplication": "true"}
-            )
+            if shared:
+                taskQueue = self._getQueue(queueName)
+            else:
+                taskQueue = sqs.create_queue(
+                    QueueName=queueName,
+                    Attributes={"FifoQueue": "true", "ContentBasedDeduplication": "true"}
+                )
             subject = self.tables[table]["subject"]
-            for entity in entities:
-                response = dynamodb.Table(table).get_item(
-                    Key={
-                        'id': entity["id"],
-                    },
-                    ProjectionExpression="frontend,{0},data_type,tx_status,tx_note".format(self.tables[table]["srcKey"])
+            items = [item for item in self._getEntities(table, [entity["id"] for entity in entities]) if item['tx_status'] == "N"]
+            # The status update of every dispatched entity counts down pending (see countSyncTask).
+            updateExpression = "set total=:val0, pending=:val0, processed=:val1, failed=:val1"
+            expressionAttributeValues = {':val0': len(items), ':val1': 0}
+            if len(items) == 0:
+                updateExpression = updateExpression + ", sync_status=:val2, end_dt=:val3"
+                expressionAttributeValues[':val2'] = 'Completed'
+                expressionAttributeValues[':val3'] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            self.syncControl.update_item(
+                Key={'id': id},
+                UpdateExpression=updateExpression,
+                ExpressionAttributeValues=expressionAttributeValues
+            )
+            for item in items:
+                item["sync_task_id"] = id
+            messages = self._packMessages(items)
+            maxMessageSize = int(os.environ.get("SQSMAXMESSAGESIZE", 262144))
+
+            # send_message_batch takes 10 messages and SQSMAXMESSAGESIZE bytes per call.
+            batches = []
+            for message in messages:
+                size = len(message[1].encode("utf-8"))
+                if len(batches) == 0 or len(batches[-1]) == 10 or \
+                    sum([len(body.encode("utf-8")) for (pack, body) in batches[-1]]) + size > maxMessageSize:
+                    batches.append([])
+                batches[-1].append(message)
+
+            sentMessages = 0
+            failedItems = 0
+            for n, batch in enumerate(batches):
+                entries = [
+                    {"Id": str(i), "MessageBody": body, "MessageGroupId": id} for i, (pack, body) in enumerate(batch)
+                ]
+                if shared:
+                    # Equal bodies of different tasks must not be deduplicated on a shared queue.
+                    for i, entry in enumerate(entries):
+                        entry["MessageDeduplicationId"] = "{0}-{1}-{2}".format(id, n, i)
+                        entry["MessageAttributes"] = {"sync_task_id": {"DataType": "String", "StringValue": id}}
+                try:
+                    response = taskQueue.send_messages(Entries=entries)
+                    failed = dict([(int(f["Id"]), f.get("Message", f["Code"])) for f in response.get("Failed", [])])
+                except Exception as e:
+                    log = traceback.format_exc()
+                    logger.exception(log)
+                    failed = dict([(i, log) for i in range(len(batch))])
+                sentMessages = sentMessages + len(batch) - len(failed)
+                for i, log in failed.items():
+                    for item in batch[i][0]:
+                        # Count an item once, only if no agent has given it a final status yet
+                        # (a send that raised may still have been delivered).
+                        try:
+                            dynamodb.Table(table).update_item(
+                                Key={
+                                    'id': item["id"]
+                                },
+                                UpdateExpression="set tx_status=:val0, tx_note=:val1",
+                                ConditionExpression="tx_status IN (:val2, :val3)",
+                                ExpressionAttributeValues={
+                                    ':val0': "F",
+                                    ':val1': log,
+                                    ':val2': "N",
+                                    ':val3': "P"
+                                }
+                            )
+                            failedItems = failedItems + 1
+                        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+                            continue
+
+            if failedItems > 0:
+                countSyncTask(id, failedItems, failedItems)
+
+            if shared:
+                # Sent last in the group, it is received once every message of the task has been handled.
+                taskQueue.send_message(
+                    MessageBody=json.dumps({"sync_task_id": id}),
+                    MessageGroupId=id,
+                    MessageDeduplicationId="{0}-end".format(id),
+                    MessageAttributes={
+                        "sync_task_id": {"DataType": "String", "StringValue": id},
+                        "sync_task_end": {"DataType": "String", "StringValue": "1"}
+                    }
                 )
-                item = response['Item']
-                if item['tx_status'] == "N":
-                    try:
-                        taskQueue.send_message(
-                            MessageBody=json.dumps(item, indent=4, cls=JSONEncoder),
-                            MessageGroupId=id
-                        )
-                    except Exception as e:
-                        log = traceback.format_exc()
-                        logger.exception(log)
-                        item['tx_status'] = "F"
-                        item['tx_note'] = log
-                        dynamodb.Table(table).put_item(item)
-
-            while(maxTaskAgents):
+
+            # One agent per SQSMAXMSG messages, at least one to close the task and at most maxTaskAgents.
+            taskAgents = max(1, min(maxTaskAgents, -(-sentMessages // int(os.environ.get("SQSMAXMSG", 10)))))
+            while(taskAgents):
                 response = boto3.client('lambda').invoke(
                     FunctionName=functionName,
                     InvocationType='Event',
@@ -380,7 +474,7 @@ class SyncControlModel(object):
                         }
                     ),
                 )
-                maxTaskAgents -= 1
+                taskAgents -= 1
         except Exception as e:
             log = traceback.format_exc()
             logger.exception(log)
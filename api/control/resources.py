@@ -20,6 +20,10 @@ def handler(event, context):
             table = event["queryStringParameters"]["table"]
             id = event["queryStringParameters"]["id"]
             return syncControlModel.getTask(table, id)
+        elif function == "tasks:batch" and event["httpMethod"] == "POST":
+            table = event["queryStringParameters"]["table"]
+            ids = json.loads(event["body"])
+            return syncControlModel.getTasks(table, ids)
         elif function == "cutdt" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             task = event["queryStringParameters"]["task"]
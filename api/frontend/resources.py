@@ -10,22 +10,8 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(eval(os.environ["LOGGINGLEVEL"]))
 
-from models import InvoicesModel, PurchaseOrdersModel, ProductsModel, ProductsCustomOptionModel, \
-ProductsInventoryModel, ProductsImageGalleryModel, ProductsLinksModel, ProductsCategoriesModel, \
-ProductsPriceLevelsModel, ProductsVariantsModel, CustomersModel, ShipmentsModel
-
-invoicesModel = InvoicesModel()
-purchaseOrdersModel = PurchaseOrdersModel()
-productsModel = ProductsModel()
-productsCustomOptionModel = ProductsCustomOptionModel()
-productsInventoryModel = ProductsInventoryModel()
-productsImageGalleryModel = ProductsImageGalleryModel()
-productsLinksModel = ProductsLinksModel()
-productsCategoriesModel = ProductsCategoriesModel()
-productsPriceLevelsModel = ProductsPriceLevelsModel()
-productsVariantsModel = ProductsVariantsModel()
-customersModel = CustomersModel()
-shipmentsModel = ShipmentsModel()
+from models import TableModel, tables
+models = dict([(table, TableModel(table)) for table in tables.keys()])
 
 def handler(event, context):
     # TODO implement
@@ -36,127 +22,138 @@ def handler(event, context):
             frontend = event["queryStringParameters"]["frontend"]
             boInvoiceId = event["queryStringParameters"]["boinvoiceid"]
             invoice = json.loads(event["body"])
-            return invoicesModel.insertInvoice(backoffice, frontend, boInvoiceId, invoice)
+            return models["invoices"].insertEntity(backoffice, frontend, boInvoiceId, invoice)
+        elif function == "invoices:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            invoices = json.loads(event["body"], parse_float=Decimal)
+            return models["invoices"].insertEntities(backoffice, frontend, invoices)
         elif function == "invoicestatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             invoiceStatus = json.loads(event["body"])
-            return invoicesModel.updateInvoiceStatus(id, invoiceStatus)
+            return models["invoices"].updateEntityStatus(id, invoiceStatus)
+        elif function == "invoicestatus:batch" and event["httpMethod"] == "PUT":
+            invoicesStatus = json.loads(event["body"])
+            return models["invoices"].updateEntitiesStatus(invoicesStatus)
         elif function == "invoice" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             boInvoiceId = event["queryStringParameters"]["boinvoiceid"]
-            return invoicesModel.getInvoice(frontend, boInvoiceId)
+            return models["invoices"].getEntity(frontend, boInvoiceId)
         elif function == "customer" and event["httpMethod"] == "PUT":
             backoffice = event["queryStringParameters"]["backoffice"]
             frontend = event["queryStringParameters"]["frontend"]
             boCustomerId = event["queryStringParameters"]["bocustomerid"]
             customer = json.loads(event["body"])
-            return customersModel.insertCustomer(backoffice, frontend, boCustomerId, customer)
+            return models["customers-fe"].insertEntity(backoffice, frontend, boCustomerId, customer)
+        elif function == "customers:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            customers = json.loads(event["body"], parse_float=Decimal)
+            return models["customers-fe"].insertEntities(backoffice, frontend, customers)
         elif function == "customerstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             customerStatus = json.loads(event["body"])
-            return customersModel.updateCustomerStatus(id, customerStatus)
+            return models["customers-fe"].updateEntityStatus(id, customerStatus)
+        elif function == "customerstatus:batch" and event["httpMethod"] == "PUT":
+            customersStatus = json.loads(event["body"])
+            return models["customers-fe"].updateEntitiesStatus(customersStatus)
         elif function == "customer" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             boCustomerId = event["queryStringParameters"]["bocustomerid"]
-            return customersModel.getCustomer(frontend, boCustomerId)
+            return models["customers-fe"].getEntity(frontend, boCustomerId)
         elif function == "shipment" and event["httpMethod"] == "PUT":
             backoffice = event["queryStringParameters"]["backoffice"]
             frontend = event["queryStringParameters"]["frontend"]
             boShipmentId = event["queryStringParameters"]["boshipmentid"]
             shipment = json.loads(event["body"])
-            return shipmentsModel.insertShipment(backoffice, frontend, boShipmentId, shipment)
+            return models["shipments"].insertEntity(backoffice, frontend, boShipmentId, shipment)
+        elif function == "shipments:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            shipments = json.loads(event["body"], parse_float=Decimal)
+            return models["shipments"].insertEntities(backoffice, frontend, shipments)
         elif function == "shipmentstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             shipmentStatus = json.loads(event["body"])
-            return shipmentsModel.updateShipmentStatus(id, shipmentStatus)
+            return models["shipments"].updateEntityStatus(id, shipmentStatus)
+        elif function == "shipmentstatus:batch" and event["httpMethod"] == "PUT":
+            shipmentsStatus = json.loads(event["body"])
+            return models["shipments"].updateEntitiesStatus(shipmentsStatus)
         elif function == "shipment" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             boShipmentId = event["queryStringParameters"]["boshipmentid"]
-            return shipmentsModel.getShipment(frontend, boShipmentId)
+            return models["shipments"].getEntity(frontend, boShipmentId)
         elif function == "purchaseorder" and event["httpMethod"] == "PUT":
             backoffice = event["queryStringParameters"]["backoffice"]
             frontend = event["queryStringParameters"]["frontend"]
             boPONum = event["queryStringParameters"]["boponum"]
             purchaseOrder = json.loads(event["body"], parse_float=Decimal)
-            return purchaseOrdersModel.insertPurchaseOrder(backoffice, frontend, boPONum, purchaseOrder)
+            return models["purchaseorders"].insertEntity(backoffice, frontend, boPONum, purchaseOrder)
+        elif function == "purchaseorders:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            purchaseOrders = json.loads(event["body"], parse_float=Decimal)
+            return models["purchaseorders"].insertEntities(backoffice, frontend, purchaseOrders)
         elif function == "purchaseorderstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             purchaseOrderStatus = json.loads(event["body"], parse_float=Decimal)
-            return purchaseOrdersModel.updatePurchaseOrderStatus(id, purchaseOrderStatus)
+            return models["purchaseorders"].updateEntityStatus(id, purchaseOrderStatus)
+        elif function == "purchaseorderstatus:batch" and event["httpMethod"] == "PUT":
+            purchaseOrdersStatus = json.loads(event["body"])
+            return models["purchaseorders"].updateEntitiesStatus(purchaseOrdersStatus)
         elif function == "purchaseorder" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             boPONum = event["queryStringParameters"]["boponum"]
-            return purchaseOrdersModel.getPurchaseOrder(frontend, boPONum)
+            return models["purchaseorders"].getEntity(frontend, boPONum)
         elif function == "product" and event["httpMethod"] == "PUT":
             backoffice = event["queryStringParameters"]["backoffice"]
             frontend = event["queryStringParameters"]["frontend"]
             sku = event["queryStringParameters"]["sku"]
             product = json.loads(json.loads(event["body"]), parse_float=Decimal)
-            return productsModel.insertProduct(backoffice, frontend, sku, product)
+            return models["products"].insertEntity(backoffice, frontend, sku, product)
+        elif function == "products:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            products = json.loads(event["body"], parse_float=Decimal)
+            return models["products"].insertEntities(backoffice, frontend, products)
         elif function == "productstatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             productStatus = json.loads(event["body"])
-            return productsModel.updateProductStatus(id, productStatus)
+            return models["products"].updateEntityStatus(id, productStatus)
+        elif function == "productstatus:batch" and event["httpMethod"] == "PUT":
+            productsStatus = json.loads(event["body"])
+            return models["products"].updateEntitiesStatus(productsStatus)
         elif function == "product" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             sku = event["queryStringParameters"]["sku"]
-            return productsModel.getProduct(frontend, sku)
+            return models["products"].getEntity(frontend, sku)
         elif function == "productextdata" and event["httpMethod"] == "PUT":
             backoffice = frontend = event["queryStringParameters"]["backoffice"]
             frontend = event["queryStringParameters"]["frontend"]
             sku = event["queryStringParameters"]["sku"]
             dataType = event["queryStringParameters"]["datatype"]
             productextdata = json.loads(event["body"], parse_float=Decimal)
-            if dataType == "customoption":
-                return productsCustomOptionModel.insertProductCustomOption(backoffice, frontend, sku, productextdata)
-            elif dataType == "inventory":
-                return productsInventoryModel.insertProductInventory(backoffice, frontend, sku, productextdata)
-            elif dataType == "imagegallery":
-                return productsImageGalleryModel.insertProductImageGallery(backoffice, frontend, sku, productextdata)
-            elif dataType == "links":
-                return productsLinksModel.insertProductLinks(backoffice, frontend, sku, productextdata)
-            elif dataType == "categories":
-                return productsCategoriesModel.insertProductCategories(backoffice, frontend, sku, productextdata)
-            elif dataType == "pricelevels":
-                return productsPriceLevelsModel.insertProductPriceLevels(backoffice, frontend, sku, productextdata)
-            elif dataType == "variants":
-                return productsVariantsModel.insertProductVariants(backoffice, frontend, sku, productextdata)
+            return models["products-{0}".format(dataType)].insertEntity(backoffice, frontend, sku, productextdata)
+        elif function == "productsextdata:batch" and event["httpMethod"] == "PUT":
+            backoffice = event["queryStringParameters"]["backoffice"]
+            frontend = event["queryStringParameters"]["frontend"]
+            dataType = event["queryStringParameters"]["datatype"]
+            productsExtData = json.loads(event["body"], parse_float=Decimal)
+            return models["products-{0}".format(dataType)].insertEntities(backoffice, frontend, productsExtData)
         elif function == "productextdatastatus" and event["httpMethod"] == "PUT":
             id = event["queryStringParameters"]["id"]
             productExtDataStatus = json.loads(event["body"])
             dataType = event["queryStringParameters"]["datatype"]
-            if dataType == "customoption":
-                return productsCustomOptionModel.updateProductCustomOptionStatus(id, productExtDataStatus)
-            elif dataType == "inventory":
-                return productsInventoryModel.updateProductInventoryStatus(id, productExtDataStatus)
-            elif dataType == "imagegallery":
-                return productsImageGalleryModel.updateProductImageGalleryStatus(id, productExtDataStatus)
-            elif dataType == "links":
-                return productsLinksModel.updateProductLinksStatus(id, productExtDataStatus)
-            elif dataType == "categories":
-                return productsCategoriesModel.updateProductCategoriesStatus(id, productExtDataStatus)
-            elif dataType == "pricelevels":
-                return productsPriceLevelsModel.updateProductPriceLevelsStatus(id, productExtDataStatus)
-            elif dataType == "variants":
-                return productsVariantsModel.updateProductVariantsStatus(id, productExtDataStatus)
+            return models["products-{0}".format(dataType)].updateEntityStatus(id, productExtDataStatus)
+        elif function == "productextdatastatus:batch" and event["httpMethod"] == "PUT":
+            productsExtDataStatus = json.loads(event["body"])
+            dataType = event["queryStringParameters"]["datatype"]
+            return models["products-{0}".format(dataType)].updateEntitiesStatus(productsExtDataStatus)
         elif function == "productextdata" and event["httpMethod"] == "GET":
             frontend = event["queryStringParameters"]["frontend"]
             sku = event["queryStringParameters"]["sku"]
             dataType = event["queryStringParameters"]["datatype"]
-            if dataType == "customoption":
-                return productsCustomOptionModel.getProductCustomOption(frontend, sku)
-            elif dataType == "inventory":
-                return productsInventoryModel.getProductInventory(frontend, sku)
-            elif dataType == "imagegallery":
-                return productsImageGalleryModel.getProductImageGallery(frontend, sku)
-            elif dataType == "links":
-                return productsLinksModel.getProductLinks(frontend, sku)
-            elif dataType == "categories":
-                return productsCategoriesModel.getProductCategories(frontend, sku)
-            elif dataType == "pricelevels":
-                return productsPriceLevelsModel.getProductPriceLevels(frontend, sku)
-            elif dataType == "variants":
-                return productsVariantsModel.getProductVariants(frontend, sku)
+            return models["products-{0}".format(dataType)].getEntity(frontend, sku)
     except Exception as e:
         log = traceback.format_exc()
         logger.exception(log)
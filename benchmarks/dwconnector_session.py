@@ -0,0 +1,148 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare DWConnector calls through the pooled, retrying session with the
+one-connection-per-call requests.get they replaced, against a local stub API.
+
+Run from the repository root (needs requests and boto3):
+
+    python benchmarks/dwconnector_session.py [calls] [connect delay ms]
+
+The stub sleeps connect delay ms on every new connection to stand in for the
+TCP/TLS handshake, and answers 503 to the first two requests of a "flaky" task
+so the retry path is exercised: the session must return the task, the legacy
+call must fail.  Exits non-zero when a check fails.
+"""
+from __future__ import print_function
+
+import sys, os, time, json, logging, threading, socket
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import requests
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, "ext", "aws_dwconnector"))
+from aws_dwconnector import DWConnector
+
+logging.basicConfig(level=logging.CRITICAL)
+logger = logging.getLogger()
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    connectDelay = 0.0
+    connections = 0
+    failures = {}
+    lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # Headers and body go out in separate writes; without TCP_NODELAY, Nagle and delayed
+        # ACKs would add ~40 ms to every call on a kept-alive connection.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections = self.server.connections + 1
+        time.sleep(self.server.connectDelay)
+
+    def do_GET(self):
+        body = json.dumps({"ready": 1, "status": "S", "detail": {"note": "stub"}}).encode("utf-8")
+        status = 200
+        if "id=flaky" in self.path:
+            with self.server.lock:
+                count = self.server.failures.get(self.path, 0)
+                self.server.failures[self.path] = count + 1
+            if count < 2:
+                (status, body) = (503, b"Service Unavailable")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LegacyDWConnector(DWConnector):
+    """getTask as it was before the shared session: a new connection per call, no retries.
+    """
+
+    def getTask(self, table, id):
+        queryString = {
+            "table": table,
+            "id": id
+        }
+        requestUrl = "{}/control/task".format(self.setting['DWRESTENDPOINT'])
+        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        if response.status_code == 200:
+            task = self._jsonLoads(response.content)
+            return task
+        else:
+            self.logger.error(response.content)
+            raise Exception(response.content)
+
+
+def run(connector, server, calls):
+    server.connections = 0
+    start = time.time()
+    for i in range(calls):
+        assert connector.getTask("products", str(i))["ready"] == 1
+    return (time.time() - start, server.connections)
+
+
+def main(calls, connectDelay):
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.connectDelay = connectDelay
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    setting = {
+        "DWRESTENDPOINT": "http://127.0.0.1:{0}".format(server.server_address[1]),
+        "DWAPIKEY": "benchmark",
+        "DWBACKOFFFACTOR": 0.01
+    }
+    failures = 0
+    try:
+        legacy = LegacyDWConnector(setting=setting, logger=logger)
+        pooled = DWConnector(setting=setting, logger=logger)
+        (legacyTime, legacyConnections) = run(legacy, server, calls)
+        (pooledTime, pooledConnections) = run(pooled, server, calls)
+        print("{0:<8} {1:>6} calls {2:>8.3f}s {3:>6} connections".format("legacy", calls, legacyTime, legacyConnections))
+        print("{0:<8} {1:>6} calls {2:>8.3f}s {3:>6} connections".format("session", calls, pooledTime, pooledConnections))
+        print("speedup {0:.1f}x".format(legacyTime / pooledTime))
+        if pooledConnections > 1:
+            failures = failures + 1
+            print("FAIL: the session opened {0} connections for sequential calls.".format(pooledConnections))
+
+        try:
+            legacy.getTask("products", "flaky-legacy")
+            failures = failures + 1
+            print("FAIL: the legacy call was expected to fail on 503.")
+        except Exception as e:
+            print("legacy   flaky task: fails on the first 503")
+        start = time.time()
+        try:
+            task = pooled.getTask("products", "flaky-session")
+            print("session  flaky task: ready={0} after 2 retries in {1:.3f}s".format(task["ready"], time.time() - start))
+        except Exception as e:
+            failures = failures + 1
+            print("FAIL: the session did not retry the 503s: {0}".format(e))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return failures
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    connectDelay = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    sys.exit(1 if main(calls, connectDelay) > 0 else 0)
@@ -0,0 +1,247 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the S3Agency extension-data builders grouped through
+Abstract.groupRows with the filter-per-key scans they replaced.
+
+Run from the repository root (needs cerberus, for datawald_frontend):
+
+    python benchmarks/group_rows.py [rows ...]
+
+Both paths must build the same data for every sku; the custom options and the
+inventories are compared without their order, which the old code took from a
+set.  Exits non-zero when an output differs.
+"""
+from __future__ import print_function
+
+import sys, os, time, json, random, logging, traceback
+from copy import deepcopy
+from decimal import Decimal
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for package in ["datawald_abstract", "datawald_frontend", "datawald_backoffice", "datawald_s3agency"]:
+    sys.path.insert(0, os.path.join(root, "ext", package))
+from datawald_s3agency import S3Agency
+
+logging.disable(logging.CRITICAL)
+logger = logging.getLogger()
+
+UNORDERED = ["customoption", "inventory"]
+
+
+class LegacyS3Agency(S3Agency):
+    """The builders as they were before groupRows: one filter over all the rows per key.
+    """
+
+    def setCustomOption(self, rawData):
+        try:
+            productsExtData = {}
+            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku', 'title'])
+            for sku in metaData["sku"]:
+                options = []
+                for title in metaData["title"]:
+                    rows = list(filter(lambda t: (t["sku"]==sku and t["title"]==title), rawData))
+                    if len(rows) != 0:
+                        option = deepcopy(self.option)
+                        for row in rows:
+                            for k, v in option.items():
+                                if type(v) is list:
+                                    optionValue = deepcopy(self.optionValue)
+                                    for x in optionValue.keys():
+                                        optionValue[x] = row[x] if x in row.keys() else optionValue[x]
+
+                                    optionValue = {k: v for k, v in optionValue.items() if v is not None and v != ""}
+                                    if "option_value_title" in optionValue.keys():
+                                        option[k].append(optionValue)
+                                else:
+                                    option[k] = row[k] if k in row.keys() and row[k] is not None else option[k]
+
+                        option = {k: v for k, v in option.items() if v is not None and v != ""}
+                        options.append(option)
+                productsExtData[sku]= options
+            return productsExtData
+        except Exception as e:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            raise
+
+    def setImageGallery(self, rawData):
+        try:
+            productsExtData = {}
+            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
+            for sku in metaData["sku"]:
+                imageGallery = deepcopy(self.imageGallery)
+                rows = list(filter(lambda t: (t["sku"]==sku), rawData))
+                uniqueValues = []
+                for row in rows:
+                    mediaGallery = deepcopy(self.mediaGallery)
+                    for key in mediaGallery.keys():
+                        if key in row.keys():
+                            mediaGallery[key] = row[key]
+                    for k, v in imageGallery.items():
+                        if type(v) is list and row["value"] not in uniqueValues:
+                            imageGallery[k].append(mediaGallery)
+                            uniqueValues.append(row['value'])
+                        elif k == row["type"] and type(v) is not list:
+                            imageGallery[k] = row["value"]
+
+                for k, v in imageGallery.items():
+                    if k != "media_gallery" and v is None and len(imageGallery["media_gallery"]) > 0:
+                        imageGallery[k] = imageGallery["media_gallery"][0]["value"]
+
+                productsExtData[sku] = imageGallery
+            return productsExtData
+        except Exception as e:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            raise
+
+    def setLinks(self, rawData):
+        try:
+            productsExtData = {}
+            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
+            for sku in metaData["sku"]:
+                links = deepcopy(self.links)
+                for key in links.keys():
+                    rows = list(filter(lambda t: (t["sku"]==sku and t["type"]==key), rawData))
+                    for row in rows:
+                        link = deepcopy(self.link)
+                        for k,v in link.items():
+                            link[k] = row[k]
+                        links[key].append(link)
+                productsExtData[sku] = links
+            return productsExtData
+        except Exception as e:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            raise
+
+    def setCategories(self, rawData):
+        try:
+            productsExtData = {}
+            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
+            for sku in metaData["sku"]:
+                categories = []
+                rows = list(filter(lambda t: t["sku"]==sku, rawData))
+                for row in rows:
+                    category = deepcopy(self.category)
+                    for key in category.keys():
+                        category[key] = row.pop(key, category[key])
+                    categories.append(category)
+                productsExtData[sku] = categories
+            return productsExtData
+        except Exception as e:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            raise
+
+    def setInventory(self, rawData):
+        try:
+            productsExtData = {}
+            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku', 'warehouse'])
+            for sku in metaData["sku"]:
+                inventories = []
+                for warehouse in metaData["warehouse"]:
+                    rows = list(filter(lambda t: (t["sku"]==sku and t["warehouse"]==warehouse), rawData))
+                    if len(rows) != 0:
+                        entity = rows[0]
+                        inventory = deepcopy(self.inventory)
+                        inventory["warehouse"] = warehouse
+                        inventory["qty"] = Decimal(entity["qty"])
+                        if "store_id" in entity.keys():
+                            inventory["store_id"] = entity["store_id"]
+                        if "full" in entity.keys():
+                            inventory["full"] = bool(entity["full"])
+                        if inventory["full"]:
+                            inventory["on_hand"] = inventory["qty"]
+                        inventory["in_stock"] = True if inventory["qty"] > 0 else False
+                        inventories.append(inventory)
+                productsExtData[sku] = inventories
+            return productsExtData
+        except Exception as e:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            raise
+
+
+def buildRows(dataType, count, rand):
+    skus = ["SKU-{0}".format(i) for i in range(max(1, count // 5))]
+    rows = []
+    for i in range(count):
+        row = {"sku": rand.choice(skus)}
+        if dataType == "customoption":
+            row.update({
+                "title": "Option {0}".format(rand.randint(1, 4)),
+                "type": "drop_down",
+                "option_value_title": rand.choice(["Red", "Blue", "Green", ""]),
+                "option_value_price": rand.choice([None, "1.50", "2.00"])
+            })
+        elif dataType == "imagegallery":
+            row.update({
+                "type": rand.choice(["image", "small_image", "thumbnail", "gallery"]),
+                "value": "/i/{0}.jpg".format(rand.randint(1, 8)),
+                "label": "Image {0}".format(i)
+            })
+        elif dataType == "links":
+            row.update({
+                "type": rand.choice(["cross_sell", "up_sell", "relation", "other"]),
+                "linked_sku": rand.choice(skus),
+                "position": i
+            })
+        elif dataType == "categories":
+            row.update({"path": "Root/Cat {0}".format(rand.randint(1, 20)), "position": i})
+        elif dataType == "inventory":
+            row.update({
+                "warehouse": "WH{0}".format(rand.randint(1, 3)),
+                "qty": str(rand.randint(0, 50)),
+                "full": rand.choice([0, 1])
+            })
+        rows.append(row)
+    return rows
+
+
+def build(agency, dataType, rows):
+    builder = {
+        "customoption": agency.setCustomOption,
+        "imagegallery": agency.setImageGallery,
+        "links": agency.setLinks,
+        "categories": agency.setCategories,
+        "inventory": agency.setInventory
+    }[dataType]
+    # setCategories pops the category columns off the rows.
+    rows = deepcopy(rows)
+    start = time.time()
+    data = builder(rows)
+    return (data, time.time() - start)
+
+
+def normalize(dataType, data):
+    if dataType not in UNORDERED:
+        return data
+    return dict(
+        (sku, sorted(items, key=lambda item: json.dumps(item, sort_keys=True, default=str)))
+        for sku, items in data.items()
+    )
+
+
+def main(counts):
+    (legacy, grouped) = (LegacyS3Agency(logger=logger), S3Agency(logger=logger))
+    rand = random.Random(1)
+    mismatches = 0
+    print("{0:<14} {1:>7} {2:>10} {3:>10} {4:>8}".format("builder", "rows", "legacy(s)", "grouped(s)", "speedup"))
+    for count in counts:
+        for dataType in ["customoption", "imagegallery", "links", "categories", "inventory"]:
+            rows = buildRows(dataType, count, rand)
+            (legacyData, legacyTime) = build(legacy, dataType, rows)
+            (groupedData, groupedTime) = build(grouped, dataType, rows)
+            if normalize(dataType, legacyData) != normalize(dataType, groupedData):
+                mismatches = mismatches + 1
+                print("Mismatch on {0} with {1} rows.".format(dataType, count))
+            print("{0:<14} {1:>7} {2:>10.3f} {3:>10.3f} {4:>7.1f}x".format(
+                dataType, count, legacyTime, groupedTime, legacyTime / max(groupedTime, 1e-6)
+            ))
+    return mismatches
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 2000]
+    sys.exit(1 if main(counts) > 0 else 0)
@@ -0,0 +1,237 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the taskqueue sync agent draining its queue with long polling
+(SQSConnector.drainQueue) against the recursive mode that re-invokes itself
+after every SQSMAXMSG batch.
+
+Run from the repository root (needs boto3):
+
+    python benchmarks/long_poll_drain.py [messages ...]
+
+The frontend agent of taskqueue/frontend/tasks.py runs against an in-memory
+SQS and Lambda on a simulated clock: an SQS call takes 0.02s, a core invoke
+0.05s and a self-invoke 0.6s, plus the 5s sleep of the recursive mode.  Both
+modes must forward every entity exactly once and call updateSyncTask once; a
+shared queue must be kept, end its tasks once each and stop at the first empty
+receive.  Exits non-zero when a check fails.
+"""
+from __future__ import print_function
+
+import sys, os, json, logging, importlib.util
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, "ext", "aws_sqsconnector"))
+import aws_sqsconnector.aws_sqsconnector as sqsconnector
+
+os.environ.update({
+    "LOGGINGLEVEL": "logging.CRITICAL",
+    "CORETASKARN": "core",
+    "SNSTOPICARN": "sns",
+    "SQSMAXMSG": "10"
+})
+logging.disable(logging.CRITICAL)
+
+SQSCALL = 0.02
+COREINVOKE = 0.05
+SELFINVOKE = 0.6
+TIMEOUT = 900
+
+
+class Clock(object):
+    now = 0.0
+
+
+class QueueDoesNotExist(Exception):
+    pass
+
+
+class FakeSQS(object):
+    """The SQS calls the agents make, on FIFO queues drained by one agent at a time.
+    """
+    class exceptions(object):
+        QueueDoesNotExist = QueueDoesNotExist
+
+    def __init__(self, stats):
+        self.queues = {}
+        self.stats = stats
+
+    def _call(self):
+        Clock.now = Clock.now + SQSCALL
+        self.stats["sqsCalls"] = self.stats["sqsCalls"] + 1
+
+    def _queue(self, queueUrl):
+        if queueUrl not in self.queues.keys():
+            raise QueueDoesNotExist(queueUrl)
+        return self.queues[queueUrl]
+
+    def list_queues(self, QueueNamePrefix):
+        self._call()
+        urls = [url for url in self.queues.keys() if url.startswith(QueueNamePrefix)]
+        return {"QueueUrls": urls} if urls else {}
+
+    def get_queue_url(self, QueueName):
+        self._call()
+        self._queue(QueueName)
+        return {"QueueUrl": QueueName}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames):
+        self._call()
+        queue = self._queue(QueueUrl)
+        return {"Attributes": {
+            "ApproximateNumberOfMessages": str(len([m for m in queue if not m["inFlight"]])),
+            "ApproximateNumberOfMessagesNotVisible": str(len([m for m in queue if m["inFlight"]])),
+            "ApproximateNumberOfMessagesDelayed": "0"
+        }}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=30, WaitTimeSeconds=0, MessageAttributeNames=None):
+        self._call()
+        self.stats["receives"] = self.stats["receives"] + 1
+        messages = [m for m in self._queue(QueueUrl) if not m["inFlight"]][0:MaxNumberOfMessages]
+        if len(messages) == 0:
+            # Nothing arrives while the agent waits.
+            Clock.now = Clock.now + WaitTimeSeconds
+            self.stats["emptyReceives"] = self.stats["emptyReceives"] + 1
+        for message in messages:
+            message["inFlight"] = True
+        return {"Messages": [dict(message) for message in messages]} if messages else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._call()
+        self.queues[QueueUrl] = [m for m in self._queue(QueueUrl) if m["ReceiptHandle"] != ReceiptHandle]
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._call()
+        handles = set([entry["ReceiptHandle"] for entry in Entries])
+        self.queues[QueueUrl] = [m for m in self._queue(QueueUrl) if m["ReceiptHandle"] not in handles]
+        return {"Successful": Entries}
+
+    def delete_queue(self, QueueUrl):
+        self._call()
+        del self.queues[QueueUrl]
+
+
+class FakeLambda(object):
+    def __init__(self, stats, pending):
+        self.stats = stats
+        self.pending = pending
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        payload = json.loads(Payload)
+        if FunctionName == "agent":
+            self.pending.append(payload)
+        else:
+            Clock.now = Clock.now + COREINVOKE
+            params = json.loads(payload["params"])
+            if payload["funct"] == "updateSyncTask":
+                self.stats["updateSyncTask"].append(params["id"])
+            else:
+                self.stats["forwarded"].extend([entity["sku"] for entity in params["data"]])
+        return {}
+
+
+class FakeBoto3(object):
+    def __init__(self, sqs, awsLambda):
+        self.clients = {"sqs": sqs, "lambda": awsLambda}
+
+    def client(self, name):
+        return self.clients[name]
+
+
+class Context(object):
+    def __init__(self, requestId):
+        self.aws_request_id = str(requestId)
+        self.invoked_function_arn = "agent"
+        self.start = Clock.now
+
+    def get_remaining_time_in_millis(self):
+        return int((TIMEOUT - (Clock.now - self.start)) * 1000)
+
+
+def loadAgent():
+    spec = importlib.util.spec_from_file_location("frontendtasks", os.path.join(root, "taskqueue", "frontend", "tasks.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def message(i, body, attributes=None):
+    return {
+        "MessageId": str(i),
+        "ReceiptHandle": "r{0}".format(i),
+        "Body": json.dumps(body),
+        "MessageAttributes": attributes or {},
+        "inFlight": False
+    }
+
+
+def run(agent, queueName, messages, longPolling):
+    stats = {"sqsCalls": 0, "receives": 0, "emptyReceives": 0, "hops": 0, "forwarded": [], "updateSyncTask": []}
+    pending = [{"subject": "syncProducts", "queueName": queueName}]
+    sqs = FakeSQS(stats)
+    sqs.queues[queueName] = messages
+    fake = FakeBoto3(sqs, FakeLambda(stats, pending))
+    (agent.boto3, sqsconnector.boto3) = (fake, fake)
+    agent.longPolling = longPolling
+    if longPolling:
+        os.environ["SQSWAITTIMESECONDS"] = "20"
+    else:
+        os.environ.pop("SQSWAITTIMESECONDS", None)
+    agent.sleep = lambda seconds: setattr(Clock, "now", Clock.now + seconds)
+    # The agent aborts a request id it has just seen.
+    agent.lastRequestId = None
+    Clock.now = 0.0
+    requestId = 0
+    while pending:
+        Clock.now = Clock.now + SELFINVOKE
+        requestId = requestId + 1
+        stats["hops"] = requestId - 1
+        agent.handler(pending.pop(0), Context(requestId))
+    stats["time"] = Clock.now
+    stats["kept"] = queueName in sqs.queues.keys()
+    return stats
+
+
+def main(counts):
+    agent = loadAgent()
+    failures = []
+    print("{0:>8} {1:>26} {2:>26}".format("messages", "recursive (hops, SQS calls)", "long-poll (hops, SQS calls)"))
+    for count in counts:
+        skus = ["SKU-{0}".format(i) for i in range(count)]
+        results = []
+        for longPolling in [False, True]:
+            queueName = "ns_mage2_products_1.fifo"
+            stats = run(agent, queueName, [message(i, [{"sku": sku}]) for i, sku in enumerate(skus)], longPolling)
+            if sorted(stats["forwarded"]) != sorted(skus):
+                failures.append("{0} messages, longPolling={1}: entities were not forwarded exactly once.".format(count, longPolling))
+            if stats["updateSyncTask"] != ["1"] or stats["kept"]:
+                failures.append("{0} messages, longPolling={1}: the task was not closed once.".format(count, longPolling))
+            results.append(stats)
+        print("{0:>8} {1:>9.1f}s ({2:>4}, {3:>6}) {4:>10.1f}s ({5:>4}, {6:>6})".format(
+            count,
+            results[0]["time"], results[0]["hops"], results[0]["sqsCalls"],
+            results[1]["time"], results[1]["hops"], results[1]["sqsCalls"]
+        ))
+
+    # A shared queue holding two sync tasks, each closed by its end-of-task message.
+    messages = []
+    for task, size in [("7", 13), ("8", 4)]:
+        for i in range(size):
+            messages.append(message(len(messages), [{"sku": "{0}-{1}".format(task, i)}], {"sync_task_id": {"StringValue": task}}))
+        messages.append(message(len(messages), "", {"sync_task_id": {"StringValue": task}, "sync_task_end": {"StringValue": "1"}}))
+    stats = run(agent, "ns_mage2_products.fifo", messages, True)
+    print("shared queue: {0} entities in {1:.1f}s, {2} receives ({3} empty), {4} hops, updateSyncTask {5}".format(
+        len(stats["forwarded"]), stats["time"], stats["receives"], stats["emptyReceives"], stats["hops"], stats["updateSyncTask"]
+    ))
+    if len(stats["forwarded"]) != 17 or sorted(stats["updateSyncTask"]) != ["7", "8"] or not stats["kept"]:
+        failures.append("shared queue: the tasks were not drained and closed once each.")
+    if stats["emptyReceives"] != 1 or stats["hops"] != 0:
+        failures.append("shared queue: the agent did not stop at the first empty receive.")
+
+    for failure in failures:
+        print("FAIL: {0}".format(failure))
+    return len(failures)
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [105, 1003]
+    sys.exit(1 if main(counts) > 0 else 0)
@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare Mage2Agency.syncProductsFt, which writes a page of products through
+Mage2Connector.syncProducts in batches, with syncing the products one by one.
+
+Run from the repository root (needs cerberus and pymysql):
+
+    python benchmarks/mage2_sync_products.py [products ...]
+
+The connector runs against an in-memory catalog in place of MySQL; like MySQL
+it compares skus case-insensitively, and the pages mix skus such as "abc" and
+"ABC".  Both paths must give every product the same fe_product_id and the same
+failed skus.  Exits non-zero when a result differs.
+"""
+from __future__ import print_function
+
+import sys, os, time, random, logging
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for package in ["datawald_abstract", "datawald_frontend", "datawald_backoffice", "datawald_mage2agency", "aws_mage2connector"]:
+    sys.path.insert(0, os.path.join(root, "ext", package))
+from aws_mage2connector import Mage2Connector
+from datawald_mage2agency import Mage2Agency
+
+logging.disable(logging.CRITICAL)
+logger = logging.getLogger()
+
+ATTRIBUTESETS = {"Default": 4, "Gear": 9}
+
+
+class Cursor(object):
+    def execute(self, sql, args=None):
+        pass
+
+
+class Adaptor(object):
+    mySQLCursor = Cursor()
+
+    def __del__(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class MemoryMage2Connector(Mage2Connector):
+    """The catalog writes of Mage2Connector on dicts keyed by the lower-cased sku.
+    """
+
+    def __init__(self, setting):
+        Mage2Connector.__init__(self, setting=setting, logger=logger)
+        self.catalog = {}
+        self.values = {}
+        self.nextId = 1
+
+    def connect(self):
+        return Adaptor()
+
+    def getEntityMetaData(self, entityTypeCode='catalog_product', attributeSet='Default'):
+        if attributeSet not in ATTRIBUTESETS.keys():
+            raise Exception("attribute_set/entity_type_code: {0}/{1} not existed".format(attributeSet, entityTypeCode))
+        return {"entity_type_id": 4, "attribute_set_id": ATTRIBUTESETS[attributeSet]}
+
+    def getEntityValues(self, data, entityTypeCode='catalog_product', adminStoreId=0):
+        return dict(data)
+
+    def getProductIdsBySkus(self, skus):
+        return dict([(sku.lower(), self.catalog[sku.lower()]) for sku in set(skus) if sku.lower() in self.catalog.keys()])
+
+    def insertCatalogProductEntities(self, products):
+        productIds = {}
+        for (sku, attributeSetId, typeId) in products:
+            self.catalog[sku.lower()] = self.nextId
+            productIds[sku.lower()] = self.nextId
+            self.nextId = self.nextId + 1
+        return productIds
+
+    def updateCatalogProductEntities(self, products):
+        pass
+
+    def writeEntitiesValues(self, entitiesValues, entityTypeCode='catalog_product', adminStoreId=0):
+        for entityId, storeId, values in entitiesValues:
+            self.values[entityId] = values
+
+    def assignWebsites(self, products):
+        pass
+
+    def syncProduct(self, sku, attributeSet, data, typeId, storeId):
+        self.getEntityMetaData('catalog_product', attributeSet)
+        if sku.lower() not in self.catalog.keys():
+            self.insertCatalogProductEntities([(sku, ATTRIBUTESETS[attributeSet], typeId)])
+        productId = self.catalog[sku.lower()]
+        self.values[productId] = self.getEntityValues(data)
+        return productId
+
+
+def buildProducts(count, rand):
+    products = []
+    for i in range(count):
+        sku = "sku-{0}".format(rand.randint(0, max(1, count // 2)))
+        # Some pages carry the same sku in another case, as an import would.
+        sku = rand.choice([sku, sku.upper()])
+        table = rand.choice(["Default", "Gear"])
+        if i % 7 == 0:
+            # A product of an unknown attribute set fails, on a sku of its own.
+            (sku, table) = ("bad-{0}".format(i), "Missing")
+        products.append({"id": str(i), "sku": sku, "table": table, "data": {"name": "Product {0}".format(i)}})
+    products.extend([
+        {"id": "abc", "sku": "abc", "table": "Default", "data": {"name": "lower"}},
+        {"id": "ABC", "sku": "ABC", "table": "Default", "data": {"name": "upper"}}
+    ])
+    return products
+
+
+def copyProducts(products):
+    return [dict(product, data=dict(product["data"])) for product in products]
+
+
+def syncOneByOne(agency, products):
+    logs = {}
+    for product in products:
+        try:
+            agency.syncProductFt(product)
+        except Exception as e:
+            logs[product["id"]] = str(e)
+    return logs
+
+
+def run(sync, products, batchSize):
+    connector = MemoryMage2Connector({"VERSION": "CE", "MAGE2BATCHSIZE": batchSize})
+    agency = Mage2Agency(logger=logger, feApp="mage2", feConn=connector)
+    products = copyProducts(products)
+    start = time.time()
+    logs = sync(agency, products)
+    return (dict([(product["id"], product.get("fe_product_id")) for product in products]), set(logs.keys()), time.time() - start)
+
+
+def main(counts):
+    rand = random.Random(1)
+    mismatches = 0
+    print("{0:>8} {1:>10} {2:>12} {3:>8}".format("products", "batched(s)", "one by one(s)", "failed"))
+    for count in counts:
+        products = buildProducts(count, rand)
+        (batchedIds, batchedFailed, batchedTime) = run(lambda agency, products: agency.syncProductsFt(products), products, 25)
+        (singleIds, singleFailed, singleTime) = run(syncOneByOne, products, 25)
+        if batchedIds != singleIds or batchedFailed != singleFailed:
+            mismatches = mismatches + 1
+            print("Mismatch with {0} products.".format(count))
+        if batchedIds["abc"] is None or batchedIds["abc"] != batchedIds["ABC"]:
+            mismatches = mismatches + 1
+            print("\"abc\" and \"ABC\" did not get the same product id.")
+        print("{0:>8} {1:>10.3f} {2:>12.3f} {3:>8}".format(len(products), batchedTime, singleTime, len(batchedFailed)))
+    return mismatches
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [200, 1000]
+    sys.exit(1 if main(counts) > 0 else 0)
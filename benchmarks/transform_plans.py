@@ -0,0 +1,250 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the compiled transform plans of Abstract.transformData with the
+interpreter they replaced, on records generated from the bundled TXMAPs.
+
+Run from the repository root (needs cerberus and pytz, for NSAgency):
+
+    python benchmarks/transform_plans.py [records]
+
+Every record must transform to the same output (or fail the same way) on both
+paths; the script exits non-zero otherwise and prints the timings per TXMAP.
+The NetSuite TXMAPs also go through NSAgency.transformRecords, which resolves
+the "@" keys from the custom field lists of the records.
+"""
+from __future__ import print_function
+
+import sys, os, time, random, logging, traceback, importlib.util
+# The TXMAP functs are evaluated in the module globals, as in abstract.py.
+from datetime import datetime
+from decimal import Decimal
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for package in ["datawald_abstract", "datawald_frontend", "datawald_backoffice", "datawald_nsagency"]:
+    sys.path.insert(0, os.path.join(root, "ext", package))
+from datawald_abstract import Abstract
+from datawald_nsagency import NSAgency
+
+logging.disable(logging.CRITICAL)
+logger = logging.getLogger()
+
+TXMAPS = [
+    "ext/datawald_nsagency/datawald_nsagency/txmap.py",
+    "ext/datawald_mage2agency/datawald_mage2agency/txmap.py"
+]
+VALUES = ["abc", "1", "2.5", None, "2018-01-01 00:00:00", u"\xe9 x", 3]
+
+
+class LegacyAbstract(Abstract):
+    """The per-record interpreter of transformData before the transform plans.
+    """
+
+    def transformData(self, record, metadatas, getCustValue=None):
+        tgt = {}
+        for k, v in metadatas.items():
+            try:
+                if v["type"] == "list":
+                    value = self.extractValue(getCustValue, **self._getParams(record, v["src"][0]))
+                    tgt[k] = self.loadData(v["funct"], value, dataType="list", getCustValue=getCustValue)
+                elif v["type"] == "dict":
+                    value = self.extractValue(getCustValue, **self._getParams(record, v["src"][0]))
+                    tgt[k] = self.loadData(v["funct"], value, dataType="dict", getCustValue=getCustValue)
+                else:
+                    try:
+                        src = dict(
+                            [(i["label"], self.extractValue(getCustValue, **self._getParams(record, i))) for i in v["src"]]
+                        )
+                        funct = eval("lambda src: {funct}".format(funct=v["funct"]))
+                        tgt[k] = funct(src)
+                    except Exception as e:
+                        self.logger.info(src)
+                        self.logger.info(v["funct"])
+                        log = traceback.format_exc()
+                        self.logger.exception(log)
+                        tgt[k] = None
+            except Exception as e:
+                log = traceback.format_exc()
+                log = "{0}: {1}\nlog: {2}\n".format(k, v, log)
+                self.logger.exception(log)
+                raise Exception(log)
+        tgt = dict([(vkey, vdata) for vkey, vdata in tgt.items() if(vdata is not None)])
+        return tgt
+
+    def loadData(self, tx, value, dataType="attribute", getCustValue=None):
+        if value is None:
+            return None
+        elif dataType == "list":
+            items = []
+            for i in value:
+                item = {}
+                for k, v in tx.items():
+                    item[k] = self.loadData(
+                        v if v["type"] == "attribute" else v["funct"],
+                        i if v["type"] == "attribute" else self.extractValue(getCustValue, **self._getParams(i, v["src"][0])),
+                        dataType=v["type"],
+                        getCustValue=getCustValue
+                    )
+                item = {vkey: vdata for vkey, vdata in item.items() if vdata is not None}
+                items.append(item)
+            return items
+        elif dataType == "dict":
+            item = {}
+            for k, v in tx.items():
+                item[k] = self.loadData(
+                    v if v["type"] == "attribute" else v["funct"],
+                    value,
+                    dataType=v["type"],
+                    getCustValue=getCustValue
+                )
+            item = {vkey: vdata for vkey, vdata in item.items() if vdata is not None}
+            return item
+        else:
+            src = {}
+            for i in tx["src"]:
+                value = self.extractValue(getCustValue, **self._getParams(value, i))
+                if value is not None and isinstance(value, str):
+                    src[i["label"]] = value.encode('ascii', 'ignore')
+                else:
+                    src[i["label"]] = value
+            src = {k: v.decode("utf-8", "ignore") if isinstance(v, (bytes, bytearray)) else v for k, v in src.items()}
+            funct = lambda src: eval(tx["funct"])
+            return funct(src)
+
+    def exists(self, obj, chain):
+        _key = chain.pop(0)
+        if obj is not None and _key in obj:
+            return self.exists(obj[_key], chain) if chain else obj[_key]
+        else:
+            return None
+
+    def _getParams(self, record, params):
+        params["record"] = record
+        return params
+
+    def extractValue(self, getCustValue, **params):
+        record = params.pop("record")
+        key = params.pop("key", None)
+        default = params.pop("default", None)
+        _value = None
+        if key is None:
+            pass
+        elif key == "####":
+            return record
+        elif key.find("@") != -1 and getCustValue is not None:
+            _value = getCustValue(record, key)
+        else:
+            _value = self.exists(record, key.split("|"))
+        value = _value if _value is not None else default
+        return value
+
+
+class PlanAbstract(Abstract):
+    pass
+
+
+def loadTxMap(path):
+    spec = importlib.util.spec_from_file_location("txmap", os.path.join(root, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.TXMAP
+
+
+def putValue(record, key, value):
+    keys = key.split("|")
+    obj = record
+    for k in keys[:-1]:
+        obj = obj.setdefault(k, {}) if isinstance(obj, dict) else {}
+    if isinstance(obj, dict):
+        obj.setdefault(keys[-1], value)
+
+
+def buildRecord(tx, record, rand):
+    for k, v in tx.items():
+        if v.get("type") == "list":
+            items = []
+            for i in range(3):
+                item = {}
+                buildRecord(v["funct"], item, rand)
+                items.append(item)
+            putValue(record, v["src"][0]["key"], items)
+        elif v.get("type") == "dict":
+            buildRecord(v["funct"], record, rand)
+        else:
+            for src in v["src"]:
+                key = src.get("key")
+                if key and key != "####" and "@" not in key:
+                    putValue(record, key, rand.choice(VALUES))
+    return record
+
+
+def addCustomFields(record, rand):
+    """Give the record, and every record listed in it, a NetSuite custom field list.
+    """
+    if isinstance(record, dict):
+        for value in list(record.values()):
+            if isinstance(value, dict):
+                addCustomFields(value, rand)
+            elif isinstance(value, list):
+                for item in value:
+                    addCustomFields(item, rand)
+        record["customFieldList"] = {
+            "customField": [{"scriptId": "custcol8", "value": rand.choice(VALUES)}]
+        }
+    return record
+
+
+def checkNSAgency(count, rand):
+    """The records NSAgency.transformRecords yields must match the interpreter run with
+    NSAgency.getCustomFieldValue.
+    """
+    (legacy, agency) = (LegacyAbstract(), NSAgency.__new__(NSAgency))
+    legacy.logger = agency.logger = logger
+    mismatches = 0
+    for name, tx in loadTxMap(TXMAPS[0]).items():
+        records = [addCustomFields(buildRecord(tx, {}, rand), rand) for i in range(count)]
+        for record, data, log in agency.transformRecords(records, tx):
+            if transform(legacy, record, tx, agency.getCustomFieldValue) != (data if log is None else "Exception"):
+                mismatches = mismatches + 1
+                print("Mismatch on NSAgency/{0}: {1}".format(name, log if log is not None else record))
+    print("{0:<10} {1:<24} {2}".format("NSAgency", "transformRecords", "mismatches: {0}".format(mismatches)))
+    return mismatches
+
+
+def transform(agency, record, tx, getCustValue):
+    try:
+        return agency.transformData(record, tx, getCustValue=getCustValue)
+    except Exception as e:
+        return "Exception"
+
+
+def timeit(agency, records, tx, getCustValue):
+    start = time.time()
+    for record in records:
+        transform(agency, record, tx, getCustValue)
+    return time.time() - start
+
+
+def main(count):
+    getCustValue = lambda record, key: "C" + key
+    (legacy, plan) = (LegacyAbstract(), PlanAbstract())
+    legacy.logger = plan.logger = logger
+    rand = random.Random(1)
+    mismatches = 0
+    print("{0:<10} {1:<24} {2:>10} {3:>10} {4:>8}".format("txmap", "metadatas", "legacy(s)", "plan(s)", "speedup"))
+    for path in TXMAPS:
+        for name, tx in loadTxMap(path).items():
+            records = [buildRecord(tx, {}, rand) for i in range(count)]
+            for record in records:
+                if transform(legacy, record, tx, getCustValue) != transform(plan, record, tx, getCustValue):
+                    mismatches = mismatches + 1
+                    print("Mismatch on {0}/{1}: {2}".format(path.split("/")[1], name, record))
+            legacyTime = timeit(legacy, records * 10, tx, getCustValue)
+            planTime = timeit(plan, records * 10, tx, getCustValue)
+            print("{0:<10} {1:<24} {2:>10.3f} {3:>10.3f} {4:>7.1f}x".format(
+                path.split("/")[1].split("_")[1], name, legacyTime, planTime, legacyTime / planTime
+            ))
+    return mismatches + checkNSAgency(count, rand)
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 300) > 0 else 0)
@@ -1,2 +1,2 @@
 __all__ = ["aws_dwconnector"]
-from .aws_dwconnector import DWConnector
+from .aws_dwconnector import DWConnector, AsyncDWConnector
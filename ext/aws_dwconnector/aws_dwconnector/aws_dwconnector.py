@@ -1,6 +1,9 @@
-import requests, base64, json, time, traceback, boto3, hashlib, hmac
+import requests, base64, json, time, traceback, boto3, hashlib, hmac, gzip, threading, asyncio, functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from decimal import Decimal
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
 # Helper class to convert a DynamoDB item to JSON.
 class JSONEncoder(json.JSONEncoder):
@@ -31,6 +34,26 @@ class JSONDecoder(json.JSONDecoder):
         return o
 
 
+class GzipAdapter(HTTPAdapter):
+    """Gzip request bodies of at least minSize bytes before sending them.
+    """
+
+    def __init__(self, minSize=1024, **kwargs):
+        self.minSize = minSize
+        super(GzipAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if body is not None and "Content-Encoding" not in request.headers:
+            if not isinstance(body, (bytes, bytearray)):
+                body = body.encode("utf-8")
+            if len(body) >= self.minSize:
+                request.body = gzip.compress(body)
+                request.headers["Content-Encoding"] = "gzip"
+                request.headers["Content-Length"] = str(len(request.body))
+        return super(GzipAdapter, self).send(request, **kwargs)
+
+
 class DWConnector(object):
 
     def __init__(self, setting=None, logger=None):
@@ -38,24 +61,85 @@ class DWConnector(object):
         self.logger = logger
         self.expiresTimeTS = time.time()
         self._idToken = None
+        self._headers = None
+        self._session = None
+        self._asyncConnector = None
+        self._lock = threading.Lock()
 
     def connect(self):
-        if "DWUSERPOOLID" in self.setting.keys():
-            if self._idToken is None or (self.expiresTimeTS - time.time()) <= 0:
-                data = self.getTokenId()
-                self.expiresTimeTS = time.time() + data["expiresIn"]
-                self._idToken = data["idToken"]
-            return {
-                "Authorization": self._idToken,
-                "Content-Type": "application/json",
-                "x-api-key": self.setting['DWAPIKEY']
-            }
-        else:
-            return {
-                'Accept': 'application/json',
-                "Content-Type": "application/json",
-                "x-api-key": self.setting['DWAPIKEY']
-            }
+        with self._lock:
+            if "DWUSERPOOLID" in self.setting.keys():
+                if self._idToken is None or (self.expiresTimeTS - time.time()) <= 0:
+                    data = self.getTokenId()
+                    self.expiresTimeTS = time.time() + data["expiresIn"]
+                    self._idToken = data["idToken"]
+                    self._headers = None
+                if self._headers is None:
+                    self._headers = {
+                        "Authorization": self._idToken,
+                        "Content-Type": "application/json",
+                        "x-api-key": self.setting['DWAPIKEY']
+                    }
+            elif self._headers is None:
+                self._headers = {
+                    'Accept': 'application/json',
+                    "Content-Type": "application/json",
+                    "x-api-key": self.setting['DWAPIKEY']
+                }
+            return dict(self._headers)
+
+    def createSession(self):
+        """Build a keep-alive session with a connection pool and retry/backoff on 429/5xx.
+
+        Settings: DWPOOLSIZE, DWMAXRETRIES, DWBACKOFFFACTOR, DWGZIP and DWGZIPMINSIZE.
+        """
+        poolSize = int(self.setting.get("DWPOOLSIZE", 10))
+        retry = Retry(
+            total=int(self.setting.get("DWMAXRETRIES", 3)),
+            backoff_factor=float(self.setting.get("DWBACKOFFFACTOR", 0.5)),
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False
+        )
+        if self.setting.get("DWGZIP", False):
+            adapter = GzipAdapter(
+                minSize=int(self.setting.get("DWGZIPMINSIZE", 1024)),
+                pool_connections=poolSize,
+                pool_maxsize=poolSize,
+                max_retries=retry
+            )
+        else:
+            adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def resetSession(self):
+        """Forget the session (and its pooled connections) inherited from a parent
+        process, so a forked worker opens its own.
+        """
+        self._lock = threading.Lock()
+        self._session = None
+        # Its thread pool did not survive the fork either.
+        self._asyncConnector = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self.createSession()
+        return self._session
+
+    @property
+    def asyncConnector(self):
+        """AsyncDWConnector sharing this connector's session, opened once.
+        """
+        if self._asyncConnector is None:
+            with self._lock:
+                if self._asyncConnector is None:
+                    self._asyncConnector = AsyncDWConnector(setting=self.setting, logger=self.logger, dwConnector=self)
+        return self._asyncConnector
 
 
     def getTokenId(self):
@@ -92,7 +176,7 @@ class DWConnector(object):
 
     def insertConfigEntity(self, configEntity):
         requestUrl = "{}/core/config".format(self.setting['DWRESTENDPOINT'])
-        response = requests.post(
+        response = self.session.post(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(configEntity),
@@ -109,7 +193,7 @@ class DWConnector(object):
     def getConfigEntity(self, key):
         queryString = {"key": key}
         requestUrl = "{}/core/config".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             configEntity = self._jsonLoads(response.content)
             return configEntity
@@ -120,7 +204,7 @@ class DWConnector(object):
     def updateConfigEntity(self, key, configEntity):
         queryString = {"key": key}
         requestUrl = "{}/core/config".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(configEntity),
@@ -138,7 +222,7 @@ class DWConnector(object):
     def delConfigEntity(self, key):
         queryString = {"key": key}
         requestUrl = "{}/core/config".format(self.setting['DWRESTENDPOINT'])
-        response = requests.delete(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.delete(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             log = response.content
             return log
@@ -148,7 +232,7 @@ class DWConnector(object):
 
     def insertConnection(self, connection):
         requestUrl = "{}/core/connections".format(self.setting['DWRESTENDPOINT'])
-        response = requests.post(
+        response = self.session.post(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(connection),
@@ -168,7 +252,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/core/connections".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             metadata = self._jsonLoads(response.content)
             return metadata
@@ -182,7 +266,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/core/connections".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(connection),
@@ -203,7 +287,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/core/connections".format(self.setting['DWRESTENDPOINT'])
-        response = requests.delete(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.delete(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             log = response.content
             return log
@@ -213,7 +297,7 @@ class DWConnector(object):
 
     def insertMetadataEntity(self, metadataEntty):
         requestUrl = "{}/core/productmastermetadata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.post(
+        response = self.session.post(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(metadataEntty),
@@ -233,7 +317,7 @@ class DWConnector(object):
             "table": table
         }
         requestUrl = "{}/core/productmastermetadata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             metadata = self._jsonLoads(response.content)
             return metadata
@@ -247,7 +331,7 @@ class DWConnector(object):
             "column": column
         }
         requestUrl = "{}/core/productmastermetadata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(metadataEntty),
@@ -268,7 +352,7 @@ class DWConnector(object):
             "column": column
         }
         requestUrl = "{}/core/productmastermetadata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.delete(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.delete(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             log = response.content
             return log
@@ -282,7 +366,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/control/task".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             task = self._jsonLoads(response.content)
             return task
@@ -290,16 +374,43 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
-    def getLastCut(self, frontend, task, offset=False):
+    def getTasks(self, table, ids):
+        """The getTask results of the ids, in order, in requests of DWBATCHSIZE ids.
+        """
+        batchSize = int(self.setting.get("DWBATCHSIZE", 100))
+        queryString = {
+            "table": table
+        }
+        requestUrl = "{}/control/tasks:batch".format(self.setting['DWRESTENDPOINT'])
+        tasks = []
+        for i in range(0, len(ids), batchSize):
+            response = self.session.post(
+                                        requestUrl,
+                                        headers=self.headers,
+                                        data=self._jsonDumps(ids[i:i+batchSize]),
+                                        timeout=60,
+                                        verify=True,
+                                        params=queryString
+                                    )
+            if response.status_code == 200:
+                tasks.extend(self._jsonLoads(response.content)['tasks'])
+            else:
+                self.logger.error(response.content)
+                raise Exception(response.content)
+        return tasks
+
+    def getLastCut(self, frontend, task, offset=False, cursor=False):
         queryString = {
             "frontend": frontend,
             "task": task
         }
         requestUrl = "{}/control/cutdt".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             data = self._jsonLoads(response.content)
-            if offset:
+            if offset and cursor:
+                return(int(data['offset']), data['cut_dt'], data.get('cursor'))
+            elif offset:
                 return(int(data['offset']), data['cut_dt'])
             else:
                 return data['cut_dt']
@@ -315,7 +426,7 @@ class DWConnector(object):
             "table": table
         }
         requestUrl = "{}/control/synccontrol".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(syncTask),
@@ -335,7 +446,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/control/synctask".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(entities),
@@ -355,7 +466,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/control/synctask".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             syncTask = self._jsonLoads(response.content)
             return syncTask
@@ -368,7 +479,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/control/synctask".format(self.setting['DWRESTENDPOINT'])
-        response = requests.delete(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.delete(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             log = response.content
             return log
@@ -382,7 +493,7 @@ class DWConnector(object):
             "feorderid": feOrderId
         }
         requestUrl = "{}/backoffice/order".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(order).encode('utf-8'),
@@ -403,7 +514,7 @@ class DWConnector(object):
             "feorderid": feOrderId
         }
         requestUrl = "{}/backoffice/order".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             order = self._jsonLoads(response.content)
             return order
@@ -416,7 +527,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/backoffice/orderstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(orderStatus),
@@ -431,13 +542,16 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateOrdersStatus(self, ordersStatus):
+        return self._updateEntitiesStatus("backoffice/orderstatus:batch", ordersStatus)
+
     def syncBOCustomer(self, frontend, feCustomerId, customer):
         queryString = {
             "frontend": frontend,
             "fecustomerid": feCustomerId
         }
         requestUrl = "{}/backoffice/customer".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(customer),
@@ -458,7 +572,7 @@ class DWConnector(object):
             "fecustomerid": feCustomerId
         }
         requestUrl = "{}/backoffice/customer".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             customer = self._jsonLoads(response.content)
             return customer
@@ -471,7 +585,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/backoffice/customerstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(customerStatus),
@@ -486,6 +600,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateBOCustomersStatus(self, customersStatus):
+        return self._updateEntitiesStatus("backoffice/customerstatus:batch", customersStatus)
+
     def syncFECustomer(self, backoffice, frontend, boCustomerId, customer):
         queryString = {
             "backoffice": backoffice,
@@ -493,7 +610,7 @@ class DWConnector(object):
             "bocustomerid": boCustomerId
         }
         requestUrl = "{}/frontend/customer".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(customer),
@@ -508,13 +625,20 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def syncFECustomers(self, backoffice, frontend, customers):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend
+        }
+        return self._syncEntities("customers:batch", queryString, customers, "bo_customer_id")
+
     def getFECustomer(self, frontend, boCustomerId):
         queryString = {
             "frontend": frontend,
             "bocustomerid": boCustomerId
         }
         requestUrl = "{}/frontend/customer".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             customer = self._jsonLoads(response.content)
             return customer
@@ -527,7 +651,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/frontend/customerstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(customerStatus),
@@ -542,6 +666,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateFECustomersStatus(self, customersStatus):
+        return self._updateEntitiesStatus("frontend/customerstatus:batch", customersStatus)
+
     def syncShipment(self, backoffice, frontend, boShipmentId, shipment):
         queryString = {
             "backoffice": backoffice,
@@ -549,7 +676,7 @@ class DWConnector(object):
             "boshipmentid": boShipmentId
         }
         requestUrl = "{}/frontend/shipment".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(shipment),
@@ -564,13 +691,20 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def syncShipments(self, backoffice, frontend, shipments):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend
+        }
+        return self._syncEntities("shipments:batch", queryString, shipments, "bo_shipment_id")
+
     def getShipment(self, frontend, boShipmentId):
         queryString = {
             "frontend": frontend,
             "boshipmentid": boShipmentId
         }
         requestUrl = "{}/frontend/shipment".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             shipment = self._jsonLoads(response.content)
             return shipment
@@ -583,7 +717,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/frontend/shipmentstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(shipmentStatus),
@@ -598,6 +732,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateShipmentsStatus(self, shipmentsStatus):
+        return self._updateEntitiesStatus("frontend/shipmentstatus:batch", shipmentsStatus)
+
     def syncInvoice(self, backoffice, frontend, boInvoiceId, invoice):
         queryString = {
             "backoffice": backoffice,
@@ -605,7 +742,7 @@ class DWConnector(object):
             "boinvoiceid": boInvoiceId
         }
         requestUrl = "{}/frontend/invoice".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(invoice),
@@ -620,13 +757,20 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def syncInvoices(self, backoffice, frontend, invoices):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend
+        }
+        return self._syncEntities("invoices:batch", queryString, invoices, "bo_invoice_id")
+
     def getInvoice(self, frontend, boInvoiceId):
         queryString = {
             "frontend": frontend,
             "boinvoiceid": boInvoiceId
         }
         requestUrl = "{}/frontend/invoice".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             invoice = self._jsonLoads(response.content)
             return invoice
@@ -639,7 +783,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/frontend/invoicestatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(invoiceStatus),
@@ -654,6 +798,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateInvoicesStatus(self, invoicesStatus):
+        return self._updateEntitiesStatus("frontend/invoicestatus:batch", invoicesStatus)
+
     def syncPurchaseOrder(self, backoffice, frontend, boPONum, purchaseOrder):
         queryString = {
             "backoffice": backoffice,
@@ -661,7 +808,7 @@ class DWConnector(object):
             "boponum": boPONum
         }
         requestUrl = "{}/frontend/purchaseorder".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(purchaseOrder),
@@ -676,13 +823,20 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def syncPurchaseOrders(self, backoffice, frontend, purchaseOrders):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend
+        }
+        return self._syncEntities("purchaseorders:batch", queryString, purchaseOrders, "bo_po_num")
+
     def getPurchaseOrder(self, frontend, boPONum):
         queryString = {
             "frontend": frontend,
             "boponum": boPONum
         }
         requestUrl = "{}/frontend/purchaseorder".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             purchaseOrder = self._jsonLoads(response.content)
             return purchaseOrder
@@ -695,7 +849,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/frontend/purchaseorderstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(purchaseOrderStatus),
@@ -710,13 +864,16 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updatePurchaseOrdersStatus(self, purchaseOrdersStatus):
+        return self._updateEntitiesStatus("frontend/purchaseorderstatus:batch", purchaseOrdersStatus)
+
     def syncItemReceipt(self, frontend, boPONum, itemReceipt):
         queryString = {
             "frontend": frontend,
             "boponum": boPONum
         }
         requestUrl = "{}/backoffice/itemreceipt".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(itemReceipt),
@@ -737,7 +894,7 @@ class DWConnector(object):
             "boponum": boPONum
         }
         requestUrl = "{}/backoffice/itemreceipt".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             itemReceipt = self._jsonLoads(response.content)
             return itemReceipt
@@ -750,7 +907,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/backoffice/itemreceiptstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(itemReceiptStatus),
@@ -765,6 +922,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateItemReceiptsStatus(self, itemReceiptsStatus):
+        return self._updateEntitiesStatus("backoffice/itemreceiptstatus:batch", itemReceiptsStatus)
+
     def syncProduct(self, backoffice, frontend, sku, product):
         queryString = {
             "backoffice": backoffice,
@@ -772,7 +932,7 @@ class DWConnector(object):
             "sku": sku
         }
         requestUrl = "{}/frontend/product".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     json=self._jsonDumps(product),
@@ -787,13 +947,51 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def _syncEntities(self, function, queryString, entities, key):
+        """Upsert entities through a batch endpoint in chunks of DWBATCHSIZE.
+
+        A chunk that fails comes back as one {key, "error"} result per entity, so the
+        results of the other chunks are kept.
+        """
+        batchSize = int(self.setting.get("DWBATCHSIZE", 100))
+        requestUrl = "{}/frontend/{}".format(self.setting['DWRESTENDPOINT'], function)
+        results = []
+        for i in range(0, len(entities), batchSize):
+            chunk = entities[i:i+batchSize]
+            try:
+                response = self.session.put(
+                                            requestUrl,
+                                            headers=self.headers,
+                                            data=self._jsonDumps(chunk),
+                                            timeout=60,
+                                            verify=True,
+                                            params=queryString
+                                        )
+                if response.status_code == 200:
+                    results.extend(self._jsonLoads(response.content)['entities'])
+                    continue
+                log = response.content
+                self.logger.error(log)
+            except Exception as e:
+                log = traceback.format_exc()
+                self.logger.exception(log)
+            results.extend([{key: entity[key], "error": "{0}".format(log)} for entity in chunk])
+        return results
+
+    def syncProducts(self, backoffice, frontend, products):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend
+        }
+        return self._syncEntities("products:batch", queryString, products, "sku")
+
     def getProduct(self, frontend, sku):
         queryString = {
             "frontend": frontend,
             "sku": sku
         }
         requestUrl = "{}/frontend/product".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             product = self._jsonLoads(response.content)
             return product
@@ -806,7 +1004,7 @@ class DWConnector(object):
             "id": id
         }
         requestUrl = "{}/frontend/productstatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(productStatus),
@@ -821,6 +1019,9 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateProductsStatus(self, productsStatus):
+        return self._updateEntitiesStatus("frontend/productstatus:batch", productsStatus)
+
     def syncProductExtData(self, backoffice, frontend, sku, dataType, productExtData):
         queryString = {
             "backoffice": backoffice,
@@ -829,7 +1030,7 @@ class DWConnector(object):
             "datatype": dataType
         }
         requestUrl = "{}/frontend/productextdata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     #json = productExtData,
@@ -845,6 +1046,14 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def syncProductsExtData(self, backoffice, frontend, dataType, productsExtData):
+        queryString = {
+            "backoffice": backoffice,
+            "frontend": frontend,
+            "datatype": dataType
+        }
+        return self._syncEntities("productsextdata:batch", queryString, productsExtData, "sku")
+
     def getProductExtData(self, frontend, sku, dataType):
         queryString = {
             "frontend": frontend,
@@ -852,7 +1061,7 @@ class DWConnector(object):
             "datatype": dataType
         }
         requestUrl = "{}/frontend/productextdata".format(self.setting['DWRESTENDPOINT'])
-        response = requests.get(requestUrl, headers=self.headers, params=queryString)
+        response = self.session.get(requestUrl, headers=self.headers, params=queryString)
         if response.status_code == 200:
             productExtData = self._jsonLoads(response.content)
             return productExtData
@@ -867,7 +1076,7 @@ class DWConnector(object):
             "datatype": dataType
         }
         requestUrl = "{}/frontend/productextdatastatus".format(self.setting['DWRESTENDPOINT'])
-        response = requests.put(
+        response = self.session.put(
                                     requestUrl,
                                     headers=self.headers,
                                     data=self._jsonDumps(productExtDataStatus),
@@ -882,6 +1091,86 @@ class DWConnector(object):
             self.logger.error(response.content)
             raise Exception(response.content)
 
+    def updateProductsExtDataStatus(self, productsExtDataStatus):
+        """Update the statuses grouped by data_type, one batch call per data type.
+        """
+        dataTypes = {}
+        for id, productExtDataStatus in productsExtDataStatus.items():
+            productExtDataStatus = dict(productExtDataStatus)
+            dataType = productExtDataStatus.pop('data_type', None)
+            dataTypes.setdefault(dataType, {})[id] = productExtDataStatus
+        results = []
+        for dataType, entitiesStatus in dataTypes.items():
+            results.extend(
+                self._updateEntitiesStatus(
+                    "frontend/productextdatastatus:batch",
+                    entitiesStatus,
+                    queryString={"datatype": dataType}
+                )
+            )
+        return results
+
+    def _updateEntitiesStatus(self, function, entitiesStatus, queryString=None):
+        requestUrl = "{}/{}".format(self.setting['DWRESTENDPOINT'], function)
+        response = self.session.put(
+                                    requestUrl,
+                                    headers=self.headers,
+                                    data=self._jsonDumps(entitiesStatus),
+                                    timeout=60,
+                                    verify=True,
+                                    params=queryString
+                                )
+        if response.status_code == 200:
+            results = self._jsonLoads(response.content)['entities']
+            for result in results:
+                if "error" in result.keys():
+                    self.logger.error("Fail to update the status of {0}: {1}".format(result["id"], result["error"]))
+            return results
+        else:
+            self.logger.error(response.content)
+            raise Exception(response.content)
+
     @property
     def headers(self):
         return self.connect()
+
+
+class AsyncDWConnector(object):
+    """Asyncio client with the DWConnector method surface.
+
+    Every public DWConnector method is a coroutine function here.  The calls run on a
+    thread pool bounded by DWMAXCONCURRENCY (setting of the connection) and share the
+    pooled session of the wrapped DWConnector, so an event loop keeps up to that many
+    requests in flight.
+    """
+
+    def __init__(self, setting=None, logger=None, dwConnector=None):
+        self.dwConnector = dwConnector if dwConnector is not None else DWConnector(setting=setting, logger=logger)
+        self.setting = setting if setting is not None else self.dwConnector.setting
+        self.logger = logger if logger is not None else self.dwConnector.logger
+        self.executor = ThreadPoolExecutor(max_workers=self.maxConcurrency)
+
+    @property
+    def maxConcurrency(self):
+        setting = self.setting or {}
+        return int(setting.get("DWMAXCONCURRENCY", 10))
+
+    def __getattr__(self, name):
+        attr = getattr(self.dwConnector, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(attr, *args, **kwargs))
+        call.__name__ = name
+        return call
+
+    async def gather(self, name, paramsList):
+        """Run one method for each args tuple in paramsList concurrently, keeping the order.
+        """
+        funct = getattr(self, name)
+        return await asyncio.gather(*[funct(*params) for params in paramsList])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -1,5 +1,7 @@
-import boto3, json, uuid, copy, traceback
+import boto3, json, uuid, copy, traceback, threading, os
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Full
 from boto3.dynamodb.conditions import Key, Attr
 from decimal import Decimal
 
@@ -84,16 +86,108 @@ class DynamoDBConnector(object):
     def dynamodb(self):
         return self.connect()
 
+    @property
+    def scanSegments(self):
+        """Segments of the parallel scan used for full resyncs (setting SCANSEGMENTS, 0 to disable).
+        """
+        return int(self.setting.get("SCANSEGMENTS", 0)) if self.setting is not None else 0
+
+    @property
+    def defaultCutDt(self):
+        """The cut date a sync starts from when it has never run, i.e. a full resync.
+        """
+        defaultCutDt = self.setting.get("DEFAULTCUTDT") if self.setting is not None else None
+        return defaultCutDt if defaultCutDt is not None else os.environ.get("DEFAULTCUTDT")
+
+    def scanPages(self, tableType, source=None, updateDt=None, checkpoint=None):
+        """Yield (items, checkpoint) per page of a parallel Scan, one thread per segment.
+
+        Items come in the order the segments return them, not in update_dt order.  The
+        checkpoint (serialized LastEvaluatedKey of every segment, null once a segment is
+        done) covers the pages yielded so far; pass it back in to resume the scan.
+        """
+        checkpoint = json.loads(checkpoint, parse_float=Decimal) if checkpoint is not None else {}
+        totalSegments = int(checkpoint.get("total_segments", self.scanSegments))
+        segments = checkpoint.get("segments", {})
+        tableName = self.setting["tables"][tableType]
+        partition = self.metadata[tableType]["partition"]
+        filterExpression = Attr(partition).eq(source)
+        if updateDt is not None:
+            filterExpression = filterExpression & Attr('update_dt').gte(updateDt)
+        pending = [segment for segment in range(totalSegments) if segments.get(str(segment), {}) is not None]
+        if len(pending) == 0:
+            return
+        pages = Queue(maxsize=len(pending) * 2)
+        stop = threading.Event()
+
+        def put(page):
+            while not stop.is_set():
+                try:
+                    pages.put(page, timeout=1)
+                    return
+                except Full:
+                    continue
+
+        def scanSegment(segment, startKey):
+            try:
+                # boto3 resources are not thread-safe, so every segment opens its own.
+                table = self.connect().Table(tableName)
+                kwargs = {
+                    "Segment": segment,
+                    "TotalSegments": totalSegments,
+                    "FilterExpression": filterExpression
+                }
+                if startKey:
+                    kwargs["ExclusiveStartKey"] = startKey
+                while not stop.is_set():
+                    response = table.scan(**kwargs)
+                    put((segment, response["Items"], response.get('LastEvaluatedKey')))
+                    if 'LastEvaluatedKey' not in response.keys():
+                        break
+                    kwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+            except Exception as e:
+                log = traceback.format_exc()
+                self.logger.exception(log)
+                put(e)
+
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            for segment in pending:
+                executor.submit(scanSegment, segment, segments.get(str(segment)))
+            try:
+                done = 0
+                while done < len(pending):
+                    page = pages.get()
+                    if isinstance(page, Exception):
+                        raise page
+                    (segment, items, lastEvaluatedKey) = page
+                    segments[str(segment)] = lastEvaluatedKey
+                    if lastEvaluatedKey is None:
+                        done = done + 1
+                    yield (
+                        items,
+                        json.dumps({"total_segments": totalSegments, "segments": segments}, cls=JSONEncoder)
+                    )
+            finally:
+                stop.set()
+
     def getCount(self, tableType, source=None, updateDt=None):
         tableName = self.setting["tables"][tableType]
         partition = self.metadata[tableType]["partition"]
         index = "update_dt_index"
         table = self.dynamodb.Table(tableName)
-        response = table.query(
-            IndexName=index,
-            KeyConditionExpression=Key(partition).eq(source) & Key('update_dt').gte(updateDt)
-        )
-        return response['Count']
+        kwargs = {
+            "IndexName": index,
+            "KeyConditionExpression": Key(partition).eq(source) & Key('update_dt').gte(updateDt),
+            "Select": "COUNT"
+        }
+        count = 0
+        while True:
+            response = table.query(**kwargs)
+            count = count + response['Count']
+            if 'LastEvaluatedKey' not in response.keys():
+                break
+            kwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+        return count
 
     def deleteItems(self, tableType, items):
         tableName = self.setting["tables"][tableType]
@@ -137,21 +231,43 @@ class DynamoDBConnector(object):
         return item
 
     def getItems(self, tableType, limit, offset, source=None, updateDt=None):
+        (items, cursor) = self.getItemsPage(tableType, limit, offset=offset, source=source, updateDt=updateDt)
+        return items
+
+    def getItemsPage(self, tableType, limit, offset=0, source=None, updateDt=None, cursor=None):
+        """Read one page of the update_dt_index in update_dt order.
+
+        The page starts after cursor (a serialized LastEvaluatedKey) or, without one,
+        after skipping offset items. Returns (items, cursor of the next page or None).
+        """
         tableName = self.setting["tables"][tableType]
         partition = self.metadata[tableType]["partition"]
         index = "update_dt_index"
         table = self.dynamodb.Table(tableName)
-        response = table.query(
-            IndexName=index,
-            KeyConditionExpression=Key(partition).eq(source) & Key('update_dt').gte(updateDt)
-        )
-        if response['Count'] != 0:
-            items = sorted(response["Items"], key=lambda x: x['update_dt'], reverse=False)
-            offset = int(offset)
-            limit = int(limit)
-            return items[offset:offset+limit]
-        else:
-            return []
+        limit = int(limit)
+        skip = int(offset) if cursor is None else 0
+        kwargs = {
+            "IndexName": index,
+            "KeyConditionExpression": Key(partition).eq(source) & Key('update_dt').gte(updateDt),
+            "ScanIndexForward": True
+        }
+        if cursor is not None:
+            kwargs["ExclusiveStartKey"] = json.loads(cursor, parse_float=Decimal)
+
+        items = []
+        while True:
+            # Query returns at most 1 MB, so keep reading until the page is full.
+            kwargs["Limit"] = skip + limit - len(items)
+            response = table.query(**kwargs)
+            items.extend(response["Items"])
+            if len(items) >= skip + limit or 'LastEvaluatedKey' not in response.keys():
+                break
+            kwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+        items = items[skip:skip+limit]
+
+        if 'LastEvaluatedKey' not in response.keys():
+            return (items, None)
+        return (items, json.dumps(response['LastEvaluatedKey'], cls=JSONEncoder))
 
     def putItem(self, tableType, source=None, value=None, data=None):
         tableName = self.setting["tables"][tableType]
@@ -325,3 +441,21 @@ class DynamoDBConnector(object):
             source=self.setting["source"],
             updateDt=cutDt
         )
+
+    def scanProducts(self, cutDt=None, checkpoint=None):
+        return self.scanPages(
+            "products",
+            source=self.setting["source"],
+            updateDt=cutDt,
+            checkpoint=checkpoint
+        )
+
+    def getProductsPage(self, cutDt, limit, offset=0, cursor=None):
+        return self.getItemsPage(
+            "products",
+            limit,
+            offset=offset,
+            source=self.setting["source"],
+            updateDt=cutDt,
+            cursor=cursor
+        )
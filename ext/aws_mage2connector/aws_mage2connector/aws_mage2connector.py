@@ -1,4 +1,5 @@
-import re, copy
+import re, copy, threading, traceback
+from datetime import datetime
 from pymysql import connect, cursors
 
 class Adaptor(object):
@@ -42,6 +43,8 @@ class Mage2Connector(object):
 
     GETPRODUCTIDBYSKUSQL = """SELECT distinct entity_id FROM catalog_product_entity WHERE sku = %s;"""
 
+    GETPRODUCTIDSBYSKUSSQL = """SELECT sku, entity_id FROM catalog_product_entity WHERE sku IN ({skus});"""
+
     GETROWIDBYENTITYIDSQL = """SELECT distinct row_id FROM catalog_product_entity WHERE entity_id = %s;"""
 
     ENTITYMETADATASQL = """
@@ -58,6 +61,12 @@ class Mage2Connector(object):
         AND t1.attribute_code = %s
         AND t2.entity_type_code = %s;"""
 
+    ATTRIBUTESMETADATASQL = """
+        SELECT DISTINCT t1.attribute_code, t1.attribute_id, t2.entity_type_id, t1.backend_type, t1.frontend_input
+        FROM eav_attribute t1, eav_entity_type t2
+        WHERE t1.entity_type_id = t2.entity_type_id
+        AND t2.entity_type_code = %s;"""
+
     ISENTITYEXITSQL = """SELECT count(*) as count FROM {entityTypeCode}_entity WHERE entity_id = %s;"""
 
     ISATTRIBUTEVALUEEXITSQL = """
@@ -67,6 +76,13 @@ class Mage2Connector(object):
         AND store_id = %s
         AND {key} = %s;"""
 
+    EXISTATTRIBUTEVALUESSQL = """
+        SELECT {key} as entity_id, attribute_id
+        FROM {entityTypeCode}_entity_{dataType}
+        WHERE store_id = %s
+        AND {key} IN ({entityIds})
+        AND attribute_id IN ({attributeIds});"""
+
     REPLACEATTRIBUTEVALUESQL = """REPLACE INTO {entityTypeCode}_entity_{dataType} ({cols}) values ({vls});"""
 
     UPDATEENTITYUPDATEDATSQL = """UPDATE {entityTypeCode}_entity SET updated_at = UTC_TIMESTAMP() WHERE entity_id = %s;"""
@@ -79,6 +95,13 @@ class Mage2Connector(object):
         AND t2.value = %s
         AND t2.store_id = %s;"""
 
+    GETOPTIONIDSSQL = """
+        SELECT t2.value, t2.option_id
+        FROM eav_attribute_option t1, eav_attribute_option_value t2
+        WHERE t1.option_id = t2.option_id
+        AND t1.attribute_id = %s
+        AND t2.store_id = %s;"""
+
     INSERTCATALOGPRODUCTENTITYEESQL = """
         INSERT INTO catalog_product_entity
         (entity_id, created_in, updated_in, attribute_set_id, type_id, sku, has_options, required_options, created_at, updated_at)
@@ -89,6 +112,25 @@ class Mage2Connector(object):
         (attribute_set_id, type_id, sku, has_options, required_options, created_at, updated_at)
         VALUES(%s, %s, %s, 0, 0, UTC_TIMESTAMP(), UTC_TIMESTAMP());"""
 
+    INSERTCATALOGPRODUCTENTITIESEESQL = """
+        INSERT INTO catalog_product_entity
+        (entity_id, created_in, updated_in, attribute_set_id, type_id, sku, has_options, required_options, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
+
+    INSERTCATALOGPRODUCTENTITIESSQL = """
+        INSERT INTO catalog_product_entity
+        (attribute_set_id, type_id, sku, has_options, required_options, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s);"""
+
+    GETNEWROWIDSBYSKUSEESQL = """SELECT sku, row_id FROM catalog_product_entity WHERE entity_id = 0 AND sku IN ({skus});"""
+
+    UPDATECATALOGPRODUCTSSQL = """
+        UPDATE catalog_product_entity
+        SET attribute_set_id = %s,
+        type_id = %s,
+        updated_at = UTC_TIMESTAMP()
+        WHERE {key} IN ({productIds});"""
+
     UPDATECATALOGPRODUCTSQL = """
         UPDATE catalog_product_entity
         SET attribute_set_id = %s,
@@ -245,8 +287,20 @@ class Mage2Connector(object):
         SET children_count = children_count + 1
         where row_id = %s;"""
 
+    SETPRODUCTCATEGORIESSQL = """
+        INSERT INTO catalog_category_product
+        (category_id, product_id, position)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        position = VALUES(position);"""
+
+    UPDATECATEGORIESCHILDRENCOUNTSQL = """
+        UPDATE catalog_category_entity
+        SET children_count = children_count + %s
+        where {key} = %s;"""
+
     GETMAXCATEGORYIDSQL = """
-        SELECT max(entity_id) as max_category_id FROM catalog_category_entity;"""
+        SELECT max(entity_id) as max_category_id FROM catalog_category_entity FOR UPDATE;"""
 
     # for Magento 2 CE
     GETCATEGORYIDBYATTRIBUTEVALUEANDPATHSQL = """
@@ -264,6 +318,13 @@ class Mage2Connector(object):
         INNER JOIN eav_attribute c ON b.attribute_id = c.attribute_id AND c.attribute_code = 'name' and c.entity_type_id = 3
         WHERE a.level = %s and a.parent_id = %s and b.value = %s;"""
 
+    # {key} is entity_id for Magento 2 CE and row_id for EE.
+    GETCATEGORYTREESQL = """
+        SELECT a.{key} AS category_id, a.level, a.parent_id, b.value
+        FROM catalog_category_entity a
+        INNER JOIN catalog_category_entity_varchar b ON a.{key} = b.{key}
+        INNER JOIN eav_attribute c ON b.attribute_id = c.attribute_id AND c.attribute_code = 'name' and c.entity_type_id = 3;"""
+
     # for Magento 2 CE
     INSERTCATALOGCATEGORYENTITYSQL = """
         INSERT INTO catalog_category_entity
@@ -483,11 +544,18 @@ class Mage2Connector(object):
     def __init__(self, setting=None, logger=None):
         self.setting = setting
         self.logger = logger
-        self._adaptor = None
+        self._local = threading.local()
+        self._adaptors = []
+        self._detachedAdaptors = []
+        self._lock = threading.Lock()
+        self._cacheGeneration = 0
+        self.clearMetadataCache()
 
     def __del__(self):
-        if self._adaptor is not None:
-            self.adaptor.__del__()
+        with self._lock:
+            adaptors, self._adaptors = self._adaptors, []
+        for thread, adaptor in adaptors:
+            adaptor.__del__()
             self.logger.info("Close Mage2 DB connection")
 
     def connect(self):
@@ -505,21 +573,102 @@ class Mage2Connector(object):
 
     @property
     def adaptor(self):
-        self._adaptor = self.connect() if self._adaptor is None else self._adaptor
-        return self._adaptor
+        """MySQL adaptor of the calling thread; pymysql connections are not thread-safe,
+        so every worker thread opens its own.
+        """
+        adaptor = getattr(self._local, "adaptor", None)
+        if adaptor is None:
+            adaptor = self.connect()
+            self._local.adaptor = adaptor
+            with self._lock:
+                self._adaptors.append((threading.current_thread(), adaptor))
+        return adaptor
+
+    def closeIdleAdaptors(self):
+        """Close the connections of the threads that have ended, e.g. the workers of a
+        thread pool that was shut down.
+        """
+        with self._lock:
+            idle = [adaptor for thread, adaptor in self._adaptors if not thread.is_alive()]
+            self._adaptors = [(thread, adaptor) for thread, adaptor in self._adaptors if thread.is_alive()]
+        for adaptor in idle:
+            adaptor.__del__()
+            self.logger.info("Close Mage2 DB connection")
+
+    def detachAdaptors(self):
+        """Forget the connections inherited from a parent process without closing them,
+        so a forked worker opens its own connection.
+        """
+        # The parent's lock may have been held at fork time.
+        self._lock = threading.Lock()
+        with self._lock:
+            self._detachedAdaptors.extend([adaptor for thread, adaptor in self._adaptors])
+            self._adaptors = []
+        self._local = threading.local()
+
+    def clearMetadataCache(self):
+        """Drop the cached entity type, attribute and option metadata (of every thread).
+        """
+        self._entityMetadatas = {}
+        self._attributeMetadatas = {}
+        self._cacheGeneration = self._cacheGeneration + 1
+        self.queriesSaved = 0
+
+    @property
+    def _transactionCache(self):
+        """Option ids and categories of the calling thread.  They may come from its own
+        uncommitted writes, so they live with the thread's connection and transaction,
+        never shared with the other threads.
+        """
+        cache = getattr(self._local, "cache", None)
+        if cache is None or cache["generation"] != self._cacheGeneration:
+            cache = {"generation": self._cacheGeneration, "optionIds": {}, "categoryTree": None}
+            self._local.cache = cache
+        return cache
+
+    @property
+    def _optionIds(self):
+        return self._transactionCache["optionIds"]
 
     def getEntityMetaData(self, entityTypeCode='catalog_product', attributeSet='Default'):
+        entityMetadata = self._entityMetadatas.get((entityTypeCode, attributeSet))
+        if entityMetadata is not None:
+            self.queriesSaved += 1
+            return entityMetadata
         self.adaptor.mySQLCursor.execute(self.ENTITYMETADATASQL, [entityTypeCode, attributeSet])
         entityMetadata = self.adaptor.mySQLCursor.fetchone()
         if entityMetadata is not None:
+            self._entityMetadatas[(entityTypeCode, attributeSet)] = entityMetadata
             return entityMetadata
         else:
             log = "attribute_set/entity_type_code: {0}/{1} not existed".format(attributeSet, entityTypeCode)
             raise Exception(log)
 
+    def rollback(self):
+        """Roll back the transaction and forget option ids and categories that may have been rolled back with it.
+        """
+        self.adaptor.rollback()
+        self._local.cache = None
+
+    def _getAttributesMetadata(self, entityTypeCode):
+        attributesMetadata = self._attributeMetadatas.get(entityTypeCode)
+        if attributesMetadata is None:
+            self.adaptor.mySQLCursor.execute(self.ATTRIBUTESMETADATASQL, [entityTypeCode])
+            attributesMetadata = {}
+            for row in self.adaptor.mySQLCursor.fetchall():
+                attributeCode = row.pop('attribute_code')
+                attributesMetadata.setdefault(attributeCode, row)
+            self._attributeMetadatas[entityTypeCode] = attributesMetadata
+        return attributesMetadata
+
     def getAttributeMetadata(self, attributeCode, entityTypeCode):
-        self.adaptor.mySQLCursor.execute(self.ATTRIBUTEMETADATASQL, [attributeCode, entityTypeCode])
-        attributeMetadata = self.adaptor.mySQLCursor.fetchone()
+        attributeMetadata = self._getAttributesMetadata(entityTypeCode).get(attributeCode)
+        if attributeMetadata is not None:
+            self.queriesSaved += 1
+        else:
+            # MySQL may still match the code under its collation.
+            self.adaptor.mySQLCursor.execute(self.ATTRIBUTEMETADATASQL, [attributeCode, entityTypeCode])
+            attributeMetadata = self.adaptor.mySQLCursor.fetchone()
         if attributeMetadata is None:
             log = "Entity Type/Attribute Code: {0}/{1} does not exist".format(entityTypeCode, attributeCode)
             raise Exception(log)
@@ -555,6 +704,39 @@ class Mage2Connector(object):
         self.adaptor.mySQLCursor.execute(sql, param)
         self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 1")
 
+    def getExistAttributeValues(self, entityTypeCode, dataType, entityIds, attributeIds, storeId):
+        """Return the (entity_id, attribute_id) pairs that already have a value in the store.
+        """
+        key = 'row_id' if self.setting['VERSION'] == "EE" else 'entity_id'
+        entityIds = list(set(entityIds))
+        attributeIds = list(set(attributeIds))
+        sql = self.EXISTATTRIBUTEVALUESSQL.format(
+            entityTypeCode=entityTypeCode,
+            dataType=dataType,
+            key=key,
+            entityIds=",".join(["%s"] * len(entityIds)),
+            attributeIds=",".join(["%s"] * len(attributeIds))
+        )
+        self.adaptor.mySQLCursor.execute(sql, [storeId] + entityIds + attributeIds)
+        return set([(int(row['entity_id']), row['attribute_id']) for row in self.adaptor.mySQLCursor.fetchall()])
+
+    def replaceAttributeValues(self, entityTypeCode, dataType, rows):
+        """Write (entityId, attributeId, storeId, value) rows of one backend type with a multi-row REPLACE.
+        """
+        if entityTypeCode == 'catalog_product' or entityTypeCode == 'catalog_category':
+            cols = "entity_id, attribute_id, store_id, value"
+            if self.setting['VERSION'] == "EE":
+                cols = "row_id, attribute_id, store_id, value"
+            vls = "%s, %s, %s, %s"
+            params = [list(row) for row in rows]
+        else:
+            cols = "entity_id, attribute_id, value"
+            vls = "%s, %s, %s"
+            params = [[entityId, attributeId, value] for (entityId, attributeId, storeId, value) in rows]
+        sql = self.REPLACEATTRIBUTEVALUESQL.format(entityTypeCode=entityTypeCode, dataType=dataType, cols=cols, vls=vls)
+        # pymysql folds executemany of a single VALUES tuple into multi-row statements.
+        self.adaptor.mySQLCursor.executemany(sql, params)
+
     def updateEntityUpdatedAt(self, entityTypeCode, entityId):
         sql = self.UPDATEENTITYUPDATEDATSQL.format(entityTypeCode=entityTypeCode)
         self.adaptor.mySQLCursor.execute(sql, [entityId])
@@ -569,8 +751,11 @@ class Mage2Connector(object):
             exist = self.adaptor.mySQLCursor.fetchone()
             if not exist or exist['cnt'] == 0 :
                 self.adaptor.mySQLCursor.execute(self.INSERTOPTIONVALUESQL, [optionId, storeId, optionValue])
+                if (attributeId, storeId) in self._optionIds:
+                    self._optionIds[(attributeId, storeId)].setdefault(optionValue, optionId)
             elif exist['cnt'] >0 and updateExistingOption == True:
                 self.adaptor.mySQLCursor.execute(self.UPDATEOPTIONVALUESQL, [optionValue, optionId, storeId])
+                self._optionIds.pop((attributeId, storeId), None)
         return optionId
 
     def setMultiSelectOptionIds(self, attributeId, values, entityTypeCode="catalog_product", adminStoreId=0, delimiter="|"):
@@ -584,12 +769,29 @@ class Mage2Connector(object):
         optionIds = ",".join(listOptionIds) if len(listOptionIds) > 0 else None
         return optionIds
 
+    def _getOptionIds(self, attributeId, storeId):
+        optionIds = self._optionIds.get((attributeId, storeId))
+        if optionIds is None:
+            self.adaptor.mySQLCursor.execute(self.GETOPTIONIDSSQL, [attributeId, storeId])
+            optionIds = {}
+            for row in self.adaptor.mySQLCursor.fetchall():
+                optionIds.setdefault(row['value'], row['option_id'])
+            self._optionIds[(attributeId, storeId)] = optionIds
+        return optionIds
+
     def getOptionId(self, attributeId, value, adminStoreId=0):
+        optionIds = self._getOptionIds(attributeId, adminStoreId)
+        optionId = optionIds.get(value)
+        if optionId is not None:
+            self.queriesSaved += 1
+            return optionId
+        # MySQL may still match the value under its collation.
         self.adaptor.mySQLCursor.execute(self.GETOPTIONIDSQL, [attributeId, value, adminStoreId])
         res = self.adaptor.mySQLCursor.fetchone()
         optionId = None
         if res is not None:
             optionId = res['option_id']
+            optionIds[value] = optionId
         return optionId
 
     def getMultiSelectOptionIds(self, attributeId, values, adminStoreId=0, delimiter="|"):
@@ -613,6 +815,19 @@ class Mage2Connector(object):
             entityId = 0
         return entityId
 
+    def getProductIdsBySkus(self, skus):
+        """Return {sku: entity_id} of the skus found; the keys are lower-cased as MySQL compares them.
+        """
+        productIds = {}
+        skus = list(set(skus))
+        if len(skus) == 0:
+            return productIds
+        sql = self.GETPRODUCTIDSBYSKUSSQL.format(skus=",".join(["%s"] * len(skus)))
+        self.adaptor.mySQLCursor.execute(sql, skus)
+        for entity in self.adaptor.mySQLCursor.fetchall():
+            productIds[entity["sku"].lower()] = int(entity["entity_id"])
+        return productIds
+
     def getRowIdByEntityId(self, entityId):
         self.adaptor.mySQLCursor.execute(self.GETROWIDBYENTITYIDSQL, [entityId])
         entity = self.adaptor.mySQLCursor.fetchone()
@@ -640,6 +855,50 @@ class Mage2Connector(object):
 
         return productId
 
+    def insertCatalogProductEntities(self, products):
+        """Insert the catalog_product_entity rows of [(sku, attributeSetId, typeId)] and return {sku: entity_id}.
+        """
+        if len(products) == 0:
+            return {}
+        skus = [sku for (sku, attributeSetId, typeId) in products]
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        if self.setting['VERSION'] == 'EE':
+            self.adaptor.mySQLCursor.executemany(
+                self.INSERTCATALOGPRODUCTENTITIESEESQL,
+                [(0, 1, 2147483647, attributeSetId, typeId, sku, 0, 0, now, now) for (sku, attributeSetId, typeId) in products]
+            )
+            sql = self.GETNEWROWIDSBYSKUSEESQL.format(skus=",".join(["%s"] * len(skus)))
+            self.adaptor.mySQLCursor.execute(sql, skus)
+            rowIds = [int(entity["row_id"]) for entity in self.adaptor.mySQLCursor.fetchall()]
+            self.adaptor.mySQLCursor.execute(
+                """UPDATE catalog_product_entity SET entity_id = row_id WHERE row_id IN ({rowIds});""".format(
+                    rowIds=",".join(["%s"] * len(rowIds))
+                ),
+                rowIds
+            )
+            self.adaptor.mySQLCursor.executemany(
+                """INSERT INTO sequence_product (sequence_value) VALUES (%s);""",
+                [(rowId,) for rowId in rowIds]
+            )
+        else:
+            self.adaptor.mySQLCursor.executemany(
+                self.INSERTCATALOGPRODUCTENTITIESSQL,
+                [(attributeSetId, typeId, sku, 0, 0, now, now) for (sku, attributeSetId, typeId) in products]
+            )
+        # Multi-row inserts do not return every id, so read them back by sku.
+        return self.getProductIdsBySkus(skus)
+
+    def updateCatalogProductEntities(self, products):
+        """Update [(productId, attributeSetId, typeId)] with one statement per attribute set and type.
+        """
+        groups = {}
+        for productId, attributeSetId, typeId in products:
+            groups.setdefault((attributeSetId, typeId), []).append(productId)
+        key = 'row_id' if self.setting['VERSION'] == "EE" else 'entity_id'
+        for (attributeSetId, typeId), productIds in groups.items():
+            sql = self.UPDATECATALOGPRODUCTSSQL.format(key=key, productIds=",".join(["%s"] * len(productIds)))
+            self.adaptor.mySQLCursor.execute(sql, [attributeSetId, typeId] + productIds)
+
     def updateCatalogProductEntity(self, productId, attributeSet='Default', typeId='simple'):
         entityMetadata = self.getEntityMetaData('catalog_product', attributeSet)
         if entityMetadata == None:
@@ -648,8 +907,11 @@ class Mage2Connector(object):
         sql = self.UPDATECATALOGPRODUCTSQL.format(key=key)
         self.adaptor.mySQLCursor.execute(sql, [entityMetadata['attribute_set_id'], typeId, productId])
 
-    def syncEntityData(self, entityId, data, entityTypeCode='catalog_product', storeId=0, adminStoreId=0):
+    def getEntityValues(self, data, entityTypeCode='catalog_product', adminStoreId=0):
+        """Resolve the data into attribute values grouped by backend type, creating missing options.
+        """
         doNotUpdateOptionAttributes = ['status','visibility','tax_class_id']
+        values = {}
         for attributeCode, value in data.items():
             (dataType, attributeMetadata) = self.getAttributeMetadata(attributeCode, entityTypeCode)
             if attributeMetadata['frontend_input'] == 'select' and attributeCode not in doNotUpdateOptionAttributes:
@@ -666,9 +928,51 @@ class Mage2Connector(object):
 
             # ignore the static datatype.
             if dataType != "static":
-                exist = self.isAttributeValueExit(entityTypeCode, dataType, attributeMetadata['attribute_id'], adminStoreId, entityId)
-                storeId = adminStoreId if exist == 0 else storeId
-                self.replaceAttributeValue(entityTypeCode, dataType, entityId, attributeMetadata['attribute_id'], value, storeId=storeId)
+                values.setdefault(dataType, []).append((attributeMetadata['attribute_id'], value))
+        return values
+
+    def writeEntitiesValues(self, entitiesValues, entityTypeCode='catalog_product', adminStoreId=0):
+        """Write [(entityId, storeId, values)] with one existence check and one multi-row REPLACE per backend type.
+
+        A value goes to the admin store until the entity has one there, as syncEntityData always did.
+        """
+        dataTypes = {}
+        for entityId, storeId, values in entitiesValues:
+            for dataType, attributeValues in values.items():
+                dataTypes.setdefault(dataType, []).extend(
+                    [(entityId, storeId, attributeId, value) for (attributeId, value) in attributeValues]
+                )
+
+        for dataType, attributeValues in dataTypes.items():
+            existAttributeValues = self.getExistAttributeValues(
+                entityTypeCode,
+                dataType,
+                [entityId for (entityId, storeId, attributeId, value) in attributeValues],
+                [attributeId for (entityId, storeId, attributeId, value) in attributeValues],
+                adminStoreId
+            )
+            rows = [
+                (entityId, attributeId, storeId if (int(entityId), attributeId) in existAttributeValues else adminStoreId, value)
+                for (entityId, storeId, attributeId, value) in attributeValues
+            ]
+            self.replaceAttributeValues(entityTypeCode, dataType, rows)
+
+    def syncEntityData(self, entityId, data, entityTypeCode='catalog_product', storeId=0, adminStoreId=0, foreignKeyChecks=True):
+        """Write the entity's attribute values, one multi-row REPLACE per backend type.
+
+        FOREIGN_KEY_CHECKS is switched off once around the writes unless foreignKeyChecks
+        is False, in which case the caller owns the toggle (e.g. for a batch of products).
+        """
+        values = self.getEntityValues(data, entityTypeCode=entityTypeCode, adminStoreId=adminStoreId)
+        if len(values) == 0:
+            return
+        if foreignKeyChecks:
+            self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            self.writeEntitiesValues([(entityId, storeId, values)], entityTypeCode=entityTypeCode, adminStoreId=adminStoreId)
+        finally:
+            if foreignKeyChecks:
+                self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 1")
 
     def _getWebsiteIdByStoreId(self, storeId):
         self.adaptor.mySQLCursor.execute("SELECT website_id FROM store WHERE store_id = %s",[storeId])
@@ -684,7 +988,127 @@ class Mage2Connector(object):
             websiteId = 1
         self.adaptor.mySQLCursor.execute("INSERT IGNORE INTO catalog_product_website (product_id, website_id) VALUES (%s, %s)",[productId,websiteId])
 
+    def assignWebsites(self, products):
+        """Assign [(productId, storeId)] to the stores' websites with one multi-row insert.
+        """
+        websiteIds = {}
+        rows = set()
+        for productId, storeId in products:
+            if storeId not in websiteIds:
+                websiteId = self._getWebsiteIdByStoreId(storeId)
+                websiteIds[storeId] = websiteId if websiteId != 0 else 1
+            rows.add((productId, websiteIds[storeId]))
+        if len(rows) > 0:
+            self.adaptor.mySQLCursor.executemany(
+                "INSERT IGNORE INTO catalog_product_website (product_id, website_id) VALUES (%s, %s)",
+                list(rows)
+            )
+
+    @property
+    def batchSize(self):
+        """Number of products written and committed together by syncProducts (setting MAGE2BATCHSIZE).
+        """
+        return int(self.setting.get("MAGE2BATCHSIZE", 100))
+
+    def syncProducts(self, products, batchSize=None):
+        """Sync products given as dicts with sku, attribute_set, data, type_id and store_id.
+
+        The products are written batchSize at a time, one transaction per batch.
+        Returns ({sku: productId}, {sku: error}) with an entry for every sku given, also
+        for the skus a batch merged with another one differing only in case.
+        """
+        batchSize = batchSize if batchSize is not None else self.batchSize
+        productIds = {}
+        errors = {}
+        for i in range(0, len(products), batchSize):
+            batch = products[i:i+batchSize]
+            (batchProductIds, batchErrors) = self._syncProductsBatch(batch)
+            batchProductIds = dict([(sku.lower(), productId) for sku, productId in batchProductIds.items()])
+            batchErrors = dict([(sku.lower(), error) for sku, error in batchErrors.items()])
+            for product in batch:
+                sku = product["sku"]
+                if sku.lower() in batchErrors.keys():
+                    errors[sku] = batchErrors[sku.lower()]
+                elif sku.lower() in batchProductIds.keys():
+                    productIds[sku] = batchProductIds[sku.lower()]
+        return (productIds, errors)
+
+    def _syncProductsBatch(self, products):
+        # The last occurrence of a sku wins, as it would syncing them one by one; MySQL
+        # compares skus case-insensitively, so "ABC" and "abc" are the same product.
+        batch = list(dict([(product["sku"].lower(), product) for product in products]).values())
+        productIds = {}
+        errors = {}
+        queriesSaved = self.queriesSaved
+        try:
+            self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+
+            # The attribute set and the values (with their new options) are resolved per sku
+            # in a savepoint, before any product row is written, so a failing sku leaves
+            # nothing behind and the rest of the batch goes on.
+            attributeSetIds = {}
+            values = {}
+            for i, product in enumerate(batch):
+                sku = product["sku"]
+                savepoint = "sku_{0}".format(i)
+                self.adaptor.mySQLCursor.execute("SAVEPOINT {0}".format(savepoint))
+                try:
+                    entityMetadata = self.getEntityMetaData('catalog_product', product["attribute_set"])
+                    values[sku] = self.getEntityValues(product["data"], entityTypeCode='catalog_product')
+                    attributeSetIds[sku] = entityMetadata['attribute_set_id']
+                    self.adaptor.mySQLCursor.execute("RELEASE SAVEPOINT {0}".format(savepoint))
+                except Exception:
+                    log = traceback.format_exc()
+                    self.logger.exception(log)
+                    self.adaptor.mySQLCursor.execute("ROLLBACK TO SAVEPOINT {0}".format(savepoint))
+                    self._transactionCache["optionIds"] = {}
+                    values.pop(sku, None)
+                    errors[sku] = log
+            products = [product for product in batch if product["sku"] in attributeSetIds.keys()]
+
+            existingIds = self.getProductIdsBySkus([product["sku"] for product in products])
+            newIds = self.insertCatalogProductEntities([
+                (product["sku"], attributeSetIds[product["sku"]], product["type_id"])
+                for product in products if product["sku"].lower() not in existingIds.keys()
+            ])
+            self.updateCatalogProductEntities([
+                (existingIds[product["sku"].lower()], attributeSetIds[product["sku"]], product["type_id"])
+                for product in products if product["sku"].lower() in existingIds.keys()
+            ])
+            ids = dict(existingIds, **newIds)
+
+            entitiesValues = []
+            for product in products:
+                sku = product["sku"]
+                productIds[sku] = ids[sku.lower()]
+                entitiesValues.append((productIds[sku], product["store_id"], values[sku]))
+
+            self.writeEntitiesValues(entitiesValues, entityTypeCode='catalog_product')
+            self.assignWebsites([(productIds[product["sku"]], product["store_id"]) for product in products])
+            self.adaptor.commit()
+            self.logger.info("{0} products: {1} queries saved by the metadata cache.".format(len(products), self.queriesSaved - queriesSaved))
+            return (productIds, errors)
+        except Exception:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            self.rollback()
+        finally:
+            self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+        # The batch failed as a whole; replay it sku by sku to isolate the failing ones.
+        productIds = {}
+        errors = {}
+        for product in batch:
+            try:
+                productIds[product["sku"]] = self.syncProduct(
+                    product["sku"], product["attribute_set"], product["data"], product["type_id"], product["store_id"]
+                )
+            except Exception:
+                errors[product["sku"]] = traceback.format_exc()
+        return (productIds, errors)
+
     def syncProduct(self, sku, attributeSet, data, typeId, storeId):
+        queriesSaved = self.queriesSaved
         try:
             productId = self.getProductIdBySku(sku)
             if productId == 0:
@@ -694,9 +1118,10 @@ class Mage2Connector(object):
             self.syncEntityData(productId, data, entityTypeCode='catalog_product', storeId=storeId)
             self.assingWebsite(productId,storeId)
             self.adaptor.commit()
+            self.logger.info("{0}: {1} queries saved by the metadata cache.".format(sku, self.queriesSaved - queriesSaved))
             return productId
         except Exception:
-            self.adaptor.rollback()
+            self.rollback()
             raise
 
     def getCustomOption(self, productId, title):
@@ -1012,6 +1437,46 @@ class Mage2Connector(object):
             else:
                 self.adaptor.mySQLCursor.execute(self.UPDATECATEGORYCHILDRENCOUNTSQL, [categoryId])
 
+    def setProductCategories(self, productCategories):
+        """Link [(productId, categoryId, position)] with one multi-row insert and bump the categories' children_count once each.
+        """
+        productCategories = [
+            (productId, categoryId, position) for (productId, categoryId, position) in productCategories
+            if productId is not None and categoryId is not None
+        ]
+        if len(productCategories) == 0:
+            return
+        childrenCounts = {}
+        for productId, categoryId, position in productCategories:
+            childrenCounts[categoryId] = childrenCounts.get(categoryId, 0) + 1
+        self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            self.adaptor.mySQLCursor.executemany(
+                self.SETPRODUCTCATEGORIESSQL,
+                [(categoryId, productId, position) for (productId, categoryId, position) in productCategories]
+            )
+        finally:
+            self.adaptor.mySQLCursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        sql = self.UPDATECATEGORIESCHILDRENCOUNTSQL.format(key="row_id" if self.setting["VERSION"] == "EE" else "entity_id")
+        self.adaptor.mySQLCursor.executemany(sql, [(count, categoryId) for categoryId, count in childrenCounts.items()])
+
+    @property
+    def categoryTree(self):
+        """Category ids keyed by (level, parent_id, lower-cased name), loaded once per thread
+        until the metadata cache is cleared or the transaction is rolled back.
+        """
+        cache = self._transactionCache
+        if cache["categoryTree"] is None:
+            key = "row_id" if self.setting["VERSION"] == "EE" else "entity_id"
+            self.adaptor.mySQLCursor.execute(self.GETCATEGORYTREESQL.format(key=key))
+            categoryTree = {}
+            for row in self.adaptor.mySQLCursor.fetchall():
+                if row['value'] is None:
+                    continue
+                categoryTree.setdefault((int(row['level']), int(row['parent_id']), row['value'].lower()), int(row['category_id']))
+            cache["categoryTree"] = categoryTree
+        return cache["categoryTree"]
+
     def getMaxCategoryId(self):
         self.adaptor.mySQLCursor.execute(self.GETMAXCATEGORYIDSQL)
         res = self.adaptor.mySQLCursor.fetchone()
@@ -1022,6 +1487,7 @@ class Mage2Connector(object):
         entityMetadata = self.getEntityMetaData('catalog_category', attributeSet)
         if entityMetadata == None:
             return 0
+        # Read in the transaction (and locked): a counter kept across threads would hand out the same id twice.
         entityId = self.getMaxCategoryId() + 1
         parentId = currentPathIds[-1]
         level = len(currentPathIds)
@@ -1063,10 +1529,14 @@ class Mage2Connector(object):
             'display_mode': 'PRODUCTS',
         }
         self.syncEntityData(categoryId, data, entityTypeCode='catalog_category', storeId=storeId)
+        self.categoryTree[(len(currentPathIds), int(currentPathIds[-1]), category.lower())] = int(categoryId)
         return categoryId
 
     def _getCategoryId(self, level, parentId, category):
-        categoryId = None
+        categoryId = self.categoryTree.get((level, int(parentId), category.lower()))
+        if categoryId is not None:
+            self.queriesSaved += 1
+            return categoryId
         sql = self.GETCATEGORYIDBYATTRIBUTEVALUEANDPATHSQL
         if self.setting["VERSION"] == "EE":
             sql = self.GETCATEGORYIDBYATTRIBUTEVALUEANDPATHEESQL
@@ -1074,10 +1544,12 @@ class Mage2Connector(object):
         res = self.adaptor.mySQLCursor.fetchone()
         if res is not None and len(res) > 0:
             categoryId = res['row_id'] if self.setting["VERSION"] == "EE" else res['entity_id']
+            self.categoryTree[(level, int(parentId), category.lower())] = int(categoryId)
         return categoryId
 
     def setCategories(self, sku, data):
         productId = self.getProductIdBySku(sku)
+        productCategories = []
 
         for row in data:
             storeId = row.pop("store_id", 0)
@@ -1108,14 +1580,15 @@ class Mage2Connector(object):
                                 currentPathIds.append(categoryId)
                                 continue
                             else:
-                                self.setProductCategory(productId, categoryId, position=position)
+                                productCategories.append((productId, categoryId, position))
                         elif level == len(categories):
-                            self.setProductCategory(productId, categoryId, position=position)
+                            productCategories.append((productId, categoryId, position))
 
                         currentPathIds.append(categoryId)
                         parentId = categoryId
                 except Exception:
                     raise
+        self.setProductCategories(productCategories)
         return productId
 
     def getVariants(self, productId, attributeIds, adminStoreId=0):
@@ -1267,7 +1740,7 @@ class Mage2Connector(object):
             self.adaptor.commit()
             return productId
         except Exception:
-            self.adaptor.rollback()
+            self.rollback()
             raise
 
     def getTotalProductsCount(self, cutdt, attributeSetName='%', sql=None):
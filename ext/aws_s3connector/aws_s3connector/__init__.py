@@ -1,2 +1,2 @@
 __all__ = ["aws_s3connector"]
-from .aws_s3connector import S3Connector
+from .aws_s3connector import S3Connector, ExportWriter
@@ -1,15 +1,141 @@
-import boto3, csv, xmltodict, json, uuid, copy, traceback
-from io import StringIO
+import boto3, csv, xmltodict, json, uuid, copy, traceback, codecs, threading, gzip
+from io import StringIO, BytesIO
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
 from dicttoxml import dicttoxml
 from datetime import datetime, timedelta
 from xml.dom.minidom import parseString
-from time import sleep
+
+try:
+    import pyarrow, pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+class JSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            if o % 1 > 0:
+                return float(o)
+            else:
+                return int(o)
+        elif isinstance(o, datetime):
+            return o.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            return super(JSONEncoder, self).default(o)
+
+class ExportWriter(object):
+    """Append many docs to one export object per time window.
+
+    The buffer is written to "{prefix}/{window}/{timestamp}-{uuid}.{ext}" when it
+    reaches maxRecords docs or maxBytes serialized bytes, when the window changes
+    and on close. Supported types: ndjson, csv.gz and parquet (needs pyarrow).
+    """
+
+    EXTENSIONS = {"ndjson": "ndjson", "csv.gz": "csv.gz", "parquet": "parquet"}
+
+    def __init__(self, connector, prefix, exportType="ndjson", maxRecords=10000, maxBytes=64*1024*1024, window="%Y/%m/%d/%H"):
+        if exportType not in self.EXTENSIONS.keys():
+            raise Exception("Export type({0}) is not supported.".format(exportType))
+        if exportType == "parquet" and pyarrow is None:
+            raise Exception("Export type(parquet) requires pyarrow.")
+        self.connector = connector
+        self.logger = connector.logger
+        self.prefix = prefix
+        self.exportType = exportType
+        self.maxRecords = maxRecords
+        self.maxBytes = maxBytes
+        self.window = window
+        self.keys = []
+        self.failed = []
+        self._reset()
+
+    def _reset(self):
+        self._docs = []
+        self._refs = []
+        self._bytes = 0
+        self._window = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
+
+    def write(self, doc, ref=None):
+        """Buffer the doc; ref is reported back in failed if its object cannot be written.
+        """
+        window = datetime.utcnow().strftime(self.window)
+        if self._window is not None and window != self._window:
+            self.flush()
+        self._window = window
+        # Normalize through JSON once, so every format sees plain types.
+        line = json.dumps(doc, cls=JSONEncoder)
+        self._docs.append(json.loads(line) if self.exportType != "ndjson" else line)
+        self._refs.append(ref)
+        self._bytes = self._bytes + len(line) + 1
+        if len(self._docs) >= self.maxRecords or self._bytes >= self.maxBytes:
+            self.flush()
+
+    def _body(self, docs):
+        if self.exportType == "ndjson":
+            return ("\n".join(docs) + "\n").encode("utf-8")
+        elif self.exportType == "csv.gz":
+            rows = []
+            keys = []
+            for doc in docs:
+                docRows = self.connector._dict2CSV(doc)
+                if len(docRows) == 0:
+                    docRows = [{k: v for k, v in doc.items() if not isinstance(v, (dict, list))}]
+                for row in docRows:
+                    keys.extend([k for k in row.keys() if k not in keys])
+                    rows.append(row)
+            output = StringIO()
+            writer = csv.DictWriter(output, keys, delimiter=',')
+            writer.writeheader()
+            writer.writerows(rows)
+            return gzip.compress(output.getvalue().encode("utf-8"))
+        elif self.exportType == "parquet":
+            output = BytesIO()
+            pyarrow.parquet.write_table(pyarrow.Table.from_pylist(docs), output)
+            return output.getvalue()
+
+    def flush(self):
+        if len(self._docs) == 0:
+            return
+        (docs, refs, window) = (self._docs, self._refs, self._window)
+        self._reset()
+        key = "{0}/{1}/{2}-{3}.{4}".format(
+            self.prefix,
+            window,
+            datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+            uuid.uuid4().hex,
+            self.EXTENSIONS[self.exportType]
+        )
+        try:
+            self.connector.s3.put_object(
+                Bucket=self.connector.setting["EXPORTBUCKET"],
+                Key=key,
+                Body=self._body(docs)
+            )
+            self.keys.append(key)
+        except Exception:
+            log = traceback.format_exc()
+            self.logger.exception(log)
+            self.failed.append((refs, log))
+
+    def close(self):
+        self.flush()
 
 class S3Connector(object):
 
     def __init__(self, setting=None, logger=None):
         self.setting = setting
         self.logger = logger
+        self._s3 = None
+        self._manifest = None
+        self._lock = threading.Lock()
+        self._listings = {}
 
     def connect(self):
         awsAccessKeyId = self.setting['AWSACCESSKEYID'] if self.setting is not None and 'AWSACCESSKEYID' in self.setting.keys() else None
@@ -24,9 +150,53 @@ class S3Connector(object):
         else:
             return boto3.client('s3')
 
+    def detachClients(self):
+        """Forget the clients inherited from a parent process, so a forked worker opens its own.
+        """
+        self._lock = threading.Lock()
+        self._s3 = None
+        self._manifest = None
+
     @property
     def s3(self):
-        return self.connect()
+        """The S3 client, created once; boto3 clients are safe to share across threads.
+        """
+        if self._s3 is None:
+            with self._lock:
+                if self._s3 is None:
+                    self._s3 = self.connect()
+        return self._s3
+
+    @property
+    def manifest(self):
+        """DynamoDB table indexing the pending objects (setting S3MANIFESTTABLE), or None
+        to list the bucket. Items are keyed by prefix ("bucket/folder/*.suffix") and
+        sort_key ("last_modified#key"), so pages come back in LastModified order.
+        The S3 events only index new uploads; run backfillManifest once per folder
+        for the objects that were already there.
+        """
+        tableName = self.setting.get("S3MANIFESTTABLE") if self.setting is not None else None
+        if tableName is None:
+            return None
+        if self._manifest is None:
+            awsAccessKeyId = self.setting.get('AWSACCESSKEYID')
+            awsSecretAccessKey = self.setting.get('AWSSECRETACCESSKEY')
+            if awsAccessKeyId is not None and awsSecretAccessKey is not None:
+                dynamodb = boto3.resource(
+                    'dynamodb',
+                    aws_access_key_id=awsAccessKeyId,
+                    aws_secret_access_key=awsSecretAccessKey
+                )
+            else:
+                dynamodb = boto3.resource('dynamodb')
+            self._manifest = dynamodb.Table(tableName)
+        return self._manifest
+
+    @property
+    def maxWorkers(self):
+        """Objects fetched and archived concurrently by getObjs (setting S3MAXWORKERS).
+        """
+        return int(self.setting.get("S3MAXWORKERS", 8)) if self.setting is not None else 8
 
     def _removeEmptyValue(self,row):
         newRow = {}
@@ -37,20 +207,65 @@ class S3Connector(object):
                 newRow[key] = value
         return newRow
 
-    def getRows(self, bucket, key, newLine="\r"):
+    @property
+    def chunkSize(self):
+        """Rows per chunk object a large CSV is split into (setting S3CHUNKSIZE).
+        """
+        return int(self.setting.get("S3CHUNKSIZE", 200)) if self.setting is not None else 200
+
+    def _iterLines(self, body, coding, newLine, readSize=65536):
+        decoder = codecs.getincrementaldecoder(coding)()
+        buffer = ""
+        for content in iter(lambda: body.read(readSize), b""):
+            buffer += decoder.decode(content)
+            lines = buffer.split(newLine)
+            buffer = lines.pop()
+            for line in lines:
+                yield line
+        buffer += decoder.decode(b"", final=True)
+        if buffer != "":
+            yield buffer
+
+    def iterRows(self, bucket, key, newLine="\r"):
+        """Stream the non-empty rows of a CSV object, decoding it incrementally.
+        """
         coding = self.setting['FILEENCODING'] if self.setting is not None and 'FILEENCODING' in self.setting.keys() else 'utf-8'
-        #self.logger.info(coding)
-        #self.logger.info(self.s3.get_object(Bucket=bucket, Key=key)["Body"])
-        content = self.s3.get_object(Bucket=bucket, Key=key)["Body"].read()
-        content = content.decode(coding).encode('utf-8')
-        lines = content.split(newLine)
+        body = self.s3.get_object(Bucket=bucket, Key=key)["Body"]
+        try:
+            for row in csv.DictReader(self._iterLines(body, coding, newLine)):
+                row = self._removeEmptyValue(row)
+                if row:
+                    yield row
+        finally:
+            body.close()
+
+    def _putRows(self, bucket, key, rows):
+        keys = []
+        for row in rows:
+            keys.extend([k for k in row.keys() if k not in keys])
+        output = StringIO()
+        writer = csv.DictWriter(output, keys, delimiter=',')
+        writer.writeheader()
+        writer.writerows(rows)
+        self.s3.put_object(Bucket=bucket, Key=key, Body=output.getvalue())
+
+    def getRows(self, bucket, key, newLine="\r"):
+        """Return the rows of a CSV object of up to chunkSize rows.
+
+        A larger object is split into chunk objects (key.N.csv) while it is
+        streamed, so only one chunk is held in memory, and [] is returned.
+        """
+        chunkSize = self.chunkSize
         rows = []
-        for row in csv.DictReader(lines):
-            #self.logger.info(row)
-            row = self._removeEmptyValue(row)
-            #self.logger.info(row)
-            if row:
-                rows.append(row)
+        suffix = 0
+        for row in self.iterRows(bucket, key, newLine=newLine):
+            rows.append(row)
+            if len(rows) > chunkSize:
+                self._putRows(bucket, key.replace(".csv", ".{0}.csv".format(suffix)), rows[:chunkSize])
+                rows = rows[chunkSize:]
+                suffix = suffix + 1
+        if suffix > 0 and len(rows) > 0:
+            self._putRows(bucket, key.replace(".csv", ".{0}.csv".format(suffix)), rows)
 
         if key.find('.csv') != -1:
             self.s3.copy_object(
@@ -60,25 +275,7 @@ class S3Connector(object):
             )
             self.s3.delete_object(Bucket=bucket, Key=key)
 
-        if len(rows) <= 200:
-            return rows
-        else:
-            suffix = 0
-            rowMaxAmountKeys = max(rows, key=lambda row:len(row.keys()))
-            keys = rowMaxAmountKeys.keys()
-            for i in range(0, len(rows), 200):
-                output = StringIO()
-                writer = csv.DictWriter(output, keys, delimiter=',')
-                writer.writeheader()
-                writer.writerows(rows[i:i+200])
-                self.s3.put_object(
-                    Bucket=bucket,
-                    Key=key.replace(".csv", ".{0}.csv".format(suffix)),
-                    Body=output.getvalue()
-                )
-                suffix = suffix + 1
-                sleep(5)
-            return []
+        return rows if suffix == 0 else []
 
     def _dict2CSV(self, data):
         rows = []
@@ -138,6 +335,23 @@ class S3Connector(object):
             Body=output.getvalue()
         )
 
+    @property
+    def exportBatchType(self):
+        """ndjson, csv.gz or parquet to batch the exports with ExportWriter (setting EXPORTTYPE).
+        """
+        exportType = self.setting.get("EXPORTTYPE") if self.setting is not None else None
+        return exportType if exportType in ExportWriter.EXTENSIONS.keys() else None
+
+    def exportWriter(self, prefix, exportType=None):
+        return ExportWriter(
+            self,
+            prefix,
+            exportType=exportType if exportType is not None else self.exportBatchType,
+            maxRecords=int(self.setting.get("EXPORTMAXRECORDS", 10000)),
+            maxBytes=int(self.setting.get("EXPORTMAXBYTES", 64*1024*1024)),
+            window=self.setting.get("EXPORTWINDOW", "%Y/%m/%d/%H")
+        )
+
     def getMatchingS3Keys(self, bucket, prefix='', suffix=''):
         """
         Generate the keys in an S3 bucket.
@@ -171,63 +385,215 @@ class S3Connector(object):
             except KeyError:
                 break
 
+    def listObjs(self, bucket, prefix='', suffix=''):
+        """List the matching objects once; getTotalObjs and getObjs share the listing
+        until clearListings is called or getObjs archives the objects. getTotalObjs
+        starts every sync run from a fresh listing.
+        """
+        listingKey = (bucket, prefix, suffix)
+        if listingKey not in self._listings:
+            self._listings[listingKey] = list(self.getMatchingS3Keys(bucket, prefix=prefix, suffix=suffix))
+        return self._listings[listingKey]
+
+    def clearListings(self):
+        self._listings = {}
+
+    def _manifestPrefix(self, bucket, prefix, suffix):
+        return "{0}/{1}*{2}".format(bucket, prefix, suffix)
+
+    def _manifestKeyCondition(self, bucket, prefix, suffix, cutDt=None):
+        keyCondition = Key("prefix").eq(self._manifestPrefix(bucket, prefix, suffix))
+        if cutDt is not None:
+            # LastModified has second precision, so "after cutDt" starts at the next second.
+            cutDt = datetime.strptime(cutDt, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=1)
+            keyCondition = keyCondition & Key("sort_key").gte(cutDt.strftime("%Y-%m-%d %H:%M:%S"))
+        return keyCondition
+
+    def countManifestObjs(self, bucket, prefix='', suffix='', cutDt=None):
+        kwargs = {
+            "KeyConditionExpression": self._manifestKeyCondition(bucket, prefix, suffix, cutDt=cutDt),
+            "Select": "COUNT"
+        }
+        count = 0
+        while True:
+            response = self.manifest.query(**kwargs)
+            count = count + response["Count"]
+            if "LastEvaluatedKey" not in response.keys():
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        return count
+
+    def getManifestObjs(self, bucket, prefix='', suffix='', cutDt=None, offset=0, limit=5):
+        """Return a page of the pending objects in the shape of list_objects_v2 contents.
+        """
+        kwargs = {
+            "KeyConditionExpression": self._manifestKeyCondition(bucket, prefix, suffix, cutDt=cutDt),
+            "Limit": offset + limit
+        }
+        items = []
+        while len(items) < offset + limit:
+            response = self.manifest.query(**kwargs)
+            items.extend(response["Items"])
+            if "LastEvaluatedKey" not in response.keys():
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            kwargs["Limit"] = offset + limit - len(items)
+        return [
+            {
+                "Key": item["key"],
+                "LastModified": datetime.strptime(item["last_modified"], "%Y-%m-%d %H:%M:%S"),
+                "Size": int(item.get("size", 0))
+            } for item in items[offset:(offset+limit)]
+        ]
+
+    def backfillManifest(self, folder):
+        """Index the objects already in the import folder, keyed as the S3 events key
+        them, so running it again or alongside the events is harmless.
+        """
+        bucket = self.setting["IMPORTBUCKET"]
+        prefix = "{}/".format(folder)
+        suffix = ".{}".format(self.setting["IMPORTTYPE"])
+        count = 0
+        with self.manifest.batch_writer() as batch:
+            for _obj in self.getMatchingS3Keys(bucket, prefix=prefix, suffix=suffix):
+                lastModified = _obj['LastModified'].strftime("%Y-%m-%d %H:%M:%S")
+                batch.put_item(
+                    Item={
+                        "prefix": self._manifestPrefix(bucket, prefix, suffix),
+                        "sort_key": "{0}#{1}".format(lastModified, _obj['Key']),
+                        "key": _obj['Key'],
+                        "last_modified": lastModified,
+                        "size": _obj.get('Size', 0)
+                    }
+                )
+                count = count + 1
+        return count
+
+    def removeManifestObjs(self, bucket, objs, prefix='', suffix=''):
+        with self.manifest.batch_writer() as batch:
+            for _obj in objs:
+                batch.delete_item(
+                    Key={
+                        "prefix": self._manifestPrefix(bucket, prefix, suffix),
+                        "sort_key": "{0}#{1}".format(_obj['LastModified'].strftime("%Y-%m-%d %H:%M:%S"), _obj['Key'])
+                    }
+                )
+
     def getTotalObjs(self, folder, cutDt):
         bucket = self.setting["IMPORTBUCKET"]
         prefix = "{}/".format(folder)
         suffix = ".{}".format(self.setting["IMPORTTYPE"])
-        objs = self.getMatchingS3Keys(bucket, prefix=prefix, suffix=suffix)
+        if self.manifest is not None:
+            return self.countManifestObjs(bucket, prefix=prefix, suffix=suffix, cutDt=cutDt)
+        # A warm container keeps the connector; list the objects uploaded since the last run.
+        self.clearListings()
+        objs = self.listObjs(bucket, prefix=prefix, suffix=suffix)
 
         cutDt = datetime.strptime(cutDt, "%Y-%m-%d %H:%M:%S")
         objs = list(filter(lambda t: (t["LastModified"].replace(tzinfo=None)>cutDt), objs))
         return len(objs)
 
+    def _getObj(self, bucket, _obj, prefix, suffix, coding):
+        # Download, parse and copy the object to the archive; the delete is batched by getObjs.
+        _key = _obj['Key']
+        _lastModified = _obj['LastModified'].strftime("%Y-%m-%d %H:%M:%S")
+        _key = _key.replace(prefix, "", 1)
+        _key = _key.replace(suffix, "", 1)
+        content = self.s3.get_object(Bucket=bucket, Key=_obj['Key'])["Body"].read()
+        content = content.decode(coding).encode('utf-8')
+        obj = None
+        if self.setting["IMPORTTYPE"] == "xml":
+            obj = xmltodict.parse(content, force_list={"item": True})["root"]
+            obj["key"] = _key
+            obj["lastModified"] = _lastModified
+        elif self.setting["IMPORTTYPE"] == "json":
+            obj = json.loads(content)
+            obj["key"] = _key
+            obj["lastModified"] = _lastModified
+
+        self.s3.copy_object(
+            CopySource={'Bucket': bucket, 'Key': _obj['Key']},
+            Bucket=bucket,
+            # Key="archive/{} ({})".format(_obj['Key'], datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
+            Key="archive/{0}/{1}/{2}/{3}/{4}".format(
+                _obj['Key'].split("/")[0],
+                datetime.utcnow().year,
+                datetime.utcnow().month,
+                datetime.utcnow().day,
+                _obj['Key'].split("/")[1]
+            )
+        )
+        return obj
+
+    def deleteObjs(self, bucket, keys):
+        """Delete the keys with delete_objects, 1000 keys per request.
+        """
+        for i in range(0, len(keys), 1000):
+            response = self.s3.delete_objects(
+                Bucket=bucket,
+                Delete={
+                    "Objects": [{"Key": key} for key in keys[i:i+1000]],
+                    "Quiet": True
+                }
+            )
+            for error in response.get("Errors", []):
+                self.logger.error("Fail to delete {0}: {1}".format(error.get("Key"), error.get("Message")))
+
     def getObjs(self, folder, offset=0, limit=5, cutDt=None):
+        """Return the parsed objects of the page and archive them. An object that fails
+        is logged and left in place for the next run; the others are still returned.
+        """
         coding = self.setting['FILEENCODING'] if self.setting is not None and 'FILEENCODING' in self.setting.keys() else 'utf-8'
         bucket = self.setting["IMPORTBUCKET"]
         prefix = "{}/".format(folder)
         suffix = ".{}".format(self.setting["IMPORTTYPE"])
-        _objs = self.getMatchingS3Keys(bucket, prefix=prefix, suffix=suffix)
+        if self.manifest is not None:
+            _objs = self.getManifestObjs(bucket, prefix=prefix, suffix=suffix, cutDt=cutDt, offset=offset, limit=limit)
+        else:
+            _objs = self.listObjs(bucket, prefix=prefix, suffix=suffix)
 
-        if cutDt is not None:
-            cutDt = datetime.strptime(cutDt, "%Y-%m-%d %H:%M:%S")
-            _objs = list(filter(lambda t: (t["LastModified"].replace(tzinfo=None)>cutDt), _objs))
+            if cutDt is not None:
+                cutDt = datetime.strptime(cutDt, "%Y-%m-%d %H:%M:%S")
+                _objs = list(filter(lambda t: (t["LastModified"].replace(tzinfo=None)>cutDt), _objs))
 
-        getLastModified = lambda _obj: int(_obj['LastModified'].strftime('%s'))
-        _objs = [_obj for _obj in sorted(_objs, key=getLastModified)][offset:(offset+limit)]
+            getLastModified = lambda _obj: int(_obj['LastModified'].strftime('%s'))
+            _objs = [_obj for _obj in sorted(_objs, key=getLastModified)][offset:(offset+limit)]
 
         objs = []
-        for _obj in _objs:
-            _key = _obj['Key']
-            _lastModified = _obj['LastModified'].strftime("%Y-%m-%d %H:%M:%S")
-            _key = _key.replace(prefix, "", 1)
-            _key = _key.replace(suffix, "", 1)
-            content = self.s3.get_object(Bucket=bucket, Key=_obj['Key'])["Body"].read()
-            content = content.decode(coding).encode('utf-8')
-            obj = None
-            if self.setting["IMPORTTYPE"] == "xml":
-                obj = xmltodict.parse(content, force_list={"item": True})["root"]
-                obj["key"] = _key
-                obj["lastModified"] = _lastModified
-            elif self.setting["IMPORTTYPE"] == "json":
-                obj = json.loads(content)
-                obj["key"] = _key
-                obj["lastModified"] = _lastModified
-            objs.append(obj)
+        archivedKeys = []
+        staleObjs = []
+        failedKeys = []
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            futures = [(_obj, executor.submit(self._getObj, bucket, _obj, prefix, suffix, coding)) for _obj in _objs]
+            for _obj, future in futures:
+                try:
+                    objs.append(future.result())
+                    archivedKeys.append(_obj['Key'])
+                except self.s3.exceptions.NoSuchKey:
+                    # Removed behind the manifest's back; forget it instead of failing every run.
+                    self.logger.warning("Object {0} is not found.".format(_obj['Key']))
+                    staleObjs.append(_obj)
+                except Exception:
+                    log = traceback.format_exc()
+                    self.logger.exception(log)
+                    failedKeys.append(_obj['Key'])
 
-            self.s3.copy_object(
-                CopySource={'Bucket': bucket, 'Key': _obj['Key']},
-                Bucket=bucket,
-                # Key="archive/{} ({})".format(_obj['Key'], datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
-                Key="archive/{0}/{1}/{2}/{3}/{4}".format(
-                    _obj['Key'].split("/")[0],
-                    datetime.utcnow().year,
-                    datetime.utcnow().month,
-                    datetime.utcnow().day,
-                    _obj['Key'].split("/")[1]
-                )
+        # Only the objects that were parsed and copied to the archive are removed.
+        self.deleteObjs(bucket, archivedKeys)
+        if self.manifest is not None:
+            self.removeManifestObjs(
+                bucket,
+                [_obj for _obj in _objs if _obj['Key'] in archivedKeys] + staleObjs,
+                prefix=prefix,
+                suffix=suffix
             )
-            self.s3.delete_object(Bucket=bucket, Key=_obj['Key'])
+        listing = self._listings.get((bucket, prefix, suffix))
+        if listing is not None:
+            archived = set(archivedKeys)
+            self._listings[(bucket, prefix, suffix)] = [_obj for _obj in listing if _obj['Key'] not in archived]
 
+        if len(failedKeys) > 0:
+            self.logger.error("Fail to get {0} object(s), left for the next run: {1}".format(len(failedKeys), failedKeys))
         return objs
 
     def insertOrder(self, frontend, feOrderId, order):
@@ -246,6 +612,8 @@ class S3Connector(object):
         return uuid.uuid1().int>>64
 
     def insertOrders(self, orders):
+        if self.exportBatchType is not None:
+            return self._insertOrdersBatch(orders)
         for order in orders:
             try:
                 order["bo_order_id"] = self.insertOrder(order["frontend"], order["fe_order_id"], copy.deepcopy(order))
@@ -256,4 +624,33 @@ class S3Connector(object):
                 order["tx_status"] = 'F'
                 order["tx_note"] = log
                 self.logger.exception('Failed to create order: {0} with error: {1}'.format(order, e))
-        return orders
\ No newline at end of file
+        return orders
+
+    def _insertOrdersBatch(self, orders):
+        # One writer per frontend, so every object keeps the salesorder/{frontend} layout.
+        writers = {}
+        for order in orders:
+            try:
+                doc = copy.deepcopy(order)
+                doc.pop("tx_status")
+                doc.pop("tx_note")
+                if order["frontend"] not in writers.keys():
+                    writers[order["frontend"]] = self.exportWriter("salesorder/{0}".format(order["frontend"]))
+                order["bo_order_id"] = uuid.uuid1().int>>64
+                order["tx_status"] = 'S'
+                writers[order["frontend"]].write(doc, ref=order)
+            except Exception as e:
+                log = traceback.format_exc()
+                order["bo_order_id"] = "####"
+                order["tx_status"] = 'F'
+                order["tx_note"] = log
+                self.logger.exception('Failed to create order: {0} with error: {1}'.format(order, e))
+
+        for writer in writers.values():
+            writer.close()
+            for refs, log in writer.failed:
+                for order in refs:
+                    order["bo_order_id"] = "####"
+                    order["tx_status"] = 'F'
+                    order["tx_note"] = log
+        return orders
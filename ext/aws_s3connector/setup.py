@@ -19,6 +19,7 @@ setup(
     include_package_data=True,
     platforms='any',
     install_requires=['boto3', 'dicttoxml', 'xmltodict'],
+    extras_require={'parquet': ['pyarrow']},
     download_url = 'https://github.com/ideabosque/AWS-S3Connector/tarball/0.0.2',
     keywords = ['DataWald'], # arbitrary keywords
     classifiers=[
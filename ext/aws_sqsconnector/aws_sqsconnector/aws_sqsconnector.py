@@ -60,3 +60,87 @@ class SQSConnector(object):
                     self.logger.exception(log)
                     break
         return data
+
+    def drainQueue(self, queueName, forward, getRemainingTime, shared=False):
+        """Hand the messages of the queue to forward(data, syncTaskIds) from one invocation,
+        long polling SQS, until the queue is empty or the remaining time (getRemainingTime,
+        in ms) drops under SQSTIMEBUDGET seconds. Returns (queueUrl, processedMessages,
+        totalMessages), totalMessages being what is left for a next invocation.
+
+        A per-task queue is deleted once nothing is left in it. A shared queue is kept, and
+        the end-of-task messages of its sync tasks come back as syncTaskIds; the agent stops
+        at the first empty receive, the dispatcher starts an agent per batch of messages.
+        """
+        sqs = self.sqs
+        budget = int(self.setting.get("SQSTIMEBUDGET", 30)) * 1000
+        waitTimeSeconds = int(self.setting.get("SQSWAITTIMESECONDS", 20))
+        maxNumberOfMessages = int(self.setting.get("SQSMAXMSG", 10))
+        processedMessages = 0
+        queueUrl = None
+
+        if shared:
+            queueUrl = sqs.get_queue_url(QueueName=queueName)["QueueUrl"]
+        else:
+            queueUrl = self.getQueueUrl(queueName=queueName)
+        if queueUrl is None:
+            return (queueUrl, processedMessages, 0)
+
+        try:
+            while getRemainingTime() > budget:
+                response = sqs.receive_message(
+                    QueueUrl=queueUrl,
+                    MaxNumberOfMessages=maxNumberOfMessages,
+                    VisibilityTimeout=600,
+                    WaitTimeSeconds=min(waitTimeSeconds, int((getRemainingTime() - budget) / 1000)),
+                    MessageAttributeNames=['All']
+                )
+                messages = response.get('Messages', [])
+                if len(messages) != 0:
+                    data = []
+                    syncTaskIds = []
+                    for message in messages:
+                        attributes = message.get('MessageAttributes', {})
+                        if 'sync_task_end' in attributes.keys():
+                            syncTaskIds.append(attributes['sync_task_id']['StringValue'])
+                            continue
+                        body = json.loads(message['Body'])
+                        data.extend(body if isinstance(body, list) else [body])
+                    forward(data, syncTaskIds)
+                    response = sqs.delete_message_batch(
+                        QueueUrl=queueUrl,
+                        Entries=[{"Id": str(i), "ReceiptHandle": message['ReceiptHandle']} for i, message in enumerate(messages)]
+                    )
+                    for failed in response.get('Failed', []):
+                        self.logger.error(failed)
+                    processedMessages = processedMessages + len(messages)
+
+                if len(messages) == maxNumberOfMessages:
+                    continue
+                if shared:
+                    # The messages other agents hold in flight are theirs to finish.
+                    if len(messages) == 0:
+                        return (queueUrl, processedMessages, 0)
+                # A short receive means the queue may be empty; other agents may still hold messages
+                # in flight, so it is done only when nothing is left.
+                elif self.getQueueAttributes(queueUrl)["TotalMessages"] == 0:
+                    sqs.delete_queue(QueueUrl=queueUrl)
+                    return (queueUrl, processedMessages, 0)
+            attributes = self.getQueueAttributes(queueUrl)
+            return (
+                queueUrl,
+                processedMessages,
+                int(attributes["ApproximateNumberOfMessages"]) if shared else attributes["TotalMessages"]
+            )
+        except sqs.exceptions.QueueDoesNotExist:
+            # Another agent drained the queue and finished the sync task.
+            return (None, processedMessages, 0)
+
+    def getQueueAttributes(self, queueUrl):
+        attributes = self.sqs.get_queue_attributes(
+            QueueUrl=queueUrl,
+            AttributeNames=['All']
+        )["Attributes"]
+        attributes["TotalMessages"] = int(attributes["ApproximateNumberOfMessages"]) + \
+            int(attributes["ApproximateNumberOfMessagesNotVisible"]) + \
+            int(attributes["ApproximateNumberOfMessagesDelayed"])
+        return attributes
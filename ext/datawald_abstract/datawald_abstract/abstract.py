@@ -1,22 +1,40 @@
-import traceback
+import traceback, asyncio
 from datetime import datetime
 from decimal import Decimal
 from time import sleep
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
+
+# Set in each forked worker process by _initWorkerProcess, never in the parent.
+_workerFt = None
+
+def _initWorkerProcess(workerFt, initWorkerProcess):
+    global _workerFt
+    _workerFt = workerFt
+    initWorkerProcess()
+
+def _runWorkerFt(entity):
+    return _workerFt(entity)
 
 class Abstract(object):
+    STATUSBATCHSIZE = 25
+    TXPLANCACHESIZE = 64
 
     def insertBOEntities(self, entityType, entities, fePrimaryId, boPrimaryId,\
         stack=False, getEntity=None, getEntityId=None, txEntity=None,\
-        cancelEntity=None, insertEntities=None, updateEntityStatus=None):
+        cancelEntity=None, insertEntities=None, updateEntityStatus=None, updateEntitiesStatus=None):
         self.logger.info("Insert entities({0}) into BackOffice.".format(entityType))
         newEntities = []
         entityStatuses = {}
-        while len(entities) > 0:
-            o = entities.pop()
-            entity = getEntity(o["frontend"], o[fePrimaryId])
+
+        def prepareEntity(entity):
             id = entity['id']
             entityStatus = {}
             entityStatus["tx_note"] = 'DataWald -> ' + self.boApp
+            if "sync_task_id" in entity.keys():
+                entityStatus["sync_task_id"] = entity["sync_task_id"]
+            newEntity = None
             try:
                 boEntityId = getEntityId(entity)
                 if boEntityId is None or stack:
@@ -25,7 +43,6 @@ class Abstract(object):
                     newEntity["tx_note"] = entityStatus["tx_note"]
                     if stack:
                         newEntity[boPrimaryId] = boEntityId
-                    newEntities.append(newEntity)
                 else:
                     if cancelEntity is not None and entity.get('status', None) == 'canceled':
                         cancelEntity(boEntityId)
@@ -37,58 +54,52 @@ class Abstract(object):
                 entityStatus["tx_note"] = log
                 entityStatus[boPrimaryId] = "####"
                 self.logger.exception(e)
+            return (id, entityStatus, newEntity)
+
+        for id, entityStatus, newEntity in self.runEntities(entities, fePrimaryId, getEntity, prepareEntity):
+            if newEntity is not None:
+                newEntities.append(newEntity)
             entityStatuses[id] = entityStatus
 
         if len(newEntities) > 0:
             boEntities = insertEntities(newEntities)
             for entity in boEntities:
                 id = entity["id"]
-                entityStatuses[id] = {
+                entityStatuses.setdefault(id, {}).update({
                     boPrimaryId: entity[boPrimaryId],
                     'tx_status': entity["tx_status"],
                     'tx_note': entity["tx_note"]
-                }
+                })
 
-        for id, entityStatus in entityStatuses.items():
-            try:
-                updateEntityStatus(id, entityStatus)
-            except:
-                log = traceback.format_exc()
-                self.logger.exception(log)
+        self.flushEntitiesStatus(entityStatuses, updateEntityStatus, updateEntitiesStatus)
         return entityStatuses
 
     def syncFEEntities(self, entityType, entities, fePrimaryId, boPrimaryId,\
-        getEntity=None, syncFt=None, updateEntityStatus=None, validateData=None):
+        getEntity=None, syncFt=None, updateEntityStatus=None, validateData=None, updateEntitiesStatus=None,\
+        syncEntitiesFt=None):
         entitiesStatuses = {}
-        while len(entities) > 0:
-            e = entities.pop()
-            if "data_type" in e.keys():
-                entity = getEntity(e["frontend"], e[boPrimaryId], e["data_type"])
-            else:
-                entity = getEntity(e["frontend"], e[boPrimaryId])
-            try:
-                if validateData is not None:
-                    validateData(entity)
-                syncFt(entity)
+        pendingStatuses = {}
+
+        def setEntityStatus(entity, log=None):
+            entity["tx_dt"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            if log is None:
                 entity["tx_status"] = "S"
-                entity["tx_dt"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
                 entity["tx_note"] = 'DataWald -> {0}'.format(self.feApp)
-            except Exception as e:
-                log = traceback.format_exc()
+            else:
                 entity["tx_status"] = "F"
-                entity["tx_dt"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
                 entity["tx_note"] = log
                 entity[fePrimaryId] = "####"
-                self.logger.exception(e)
 
             id = entity["id"]
-            entitiesStatuses[id] = {
+            entityStatus = {
                 fePrimaryId: entity[fePrimaryId],
                 'tx_status': entity["tx_status"],
                 'tx_note': entity["tx_note"]
             }
             if "data_type" in entity.keys():
-                entitiesStatuses[id]["data_type"] = entity["data_type"]
+                entityStatus["data_type"] = entity["data_type"]
+            if "sync_task_id" in entity.keys():
+                entityStatus["sync_task_id"] = entity["sync_task_id"]
 
             if entity['tx_status'] == 'F':
                 log = "Fail to sync a {0}: {1}/{2}".format(entityType, entity[boPrimaryId], id)
@@ -97,39 +108,255 @@ class Abstract(object):
             else:
                 log = "Successfully sync a {0}: {1}/{2}".format(entityType, entity[boPrimaryId], id)
                 self.logger.info(log)
+            return (id, entityStatus)
+
+        def syncEntity(entity):
+            try:
+                if validateData is not None:
+                    validateData(entity)
+                syncFt(entity)
+            except Exception as e:
+                log = traceback.format_exc()
+                self.logger.exception(e)
+                return setEntityStatus(entity, log)
+            return setEntityStatus(entity)
 
-        for id, entityStatus in entitiesStatuses.items():
+        def syncBatches():
+            # syncEntitiesFt syncs a list of entities and returns {id: log} of the failed ones.
+            batch = []
+            for entity in self.fetchEntities(entities, boPrimaryId, getEntity, prefetch=self.prefetch):
+                try:
+                    if validateData is not None:
+                        validateData(entity)
+                except Exception as e:
+                    log = traceback.format_exc()
+                    self.logger.exception(e)
+                    yield setEntityStatus(entity, log)
+                    continue
+                batch.append(entity)
+                if len(batch) >= self.syncBatchSize:
+                    for result in syncBatch(batch):
+                        yield result
+                    batch = []
+            for result in syncBatch(batch):
+                yield result
+
+        def syncBatch(batch):
+            if len(batch) == 0:
+                return []
+            try:
+                logs = syncEntitiesFt(batch)
+            except Exception as e:
+                log = traceback.format_exc()
+                self.logger.exception(e)
+                logs = dict([(entity["id"], log) for entity in batch])
+            return [setEntityStatus(entity, logs.get(entity["id"])) for entity in batch]
+
+        if syncEntitiesFt is not None and self.syncBatchSize > 1:
+            results = syncBatches()
+        else:
+            results = self.runEntities(entities, boPrimaryId, getEntity, syncEntity)
+
+        for id, entityStatus in results:
+            entitiesStatuses[id] = entityStatus
+            pendingStatuses[id] = entityStatus
+            if len(pendingStatuses) >= self.STATUSBATCHSIZE:
+                self.flushEntitiesStatus(pendingStatuses, updateEntityStatus, updateEntitiesStatus)
+                pendingStatuses = {}
+
+        self.flushEntitiesStatus(pendingStatuses, updateEntityStatus, updateEntitiesStatus)
+        return entitiesStatuses
+
+    @property
+    def prefetch(self):
+        """Number of entities fetched ahead in the sync loops (setting PREFETCH, 0 to disable).
+        """
+        setting = getattr(self, "setting", None) or {}
+        return int(setting.get("PREFETCH", 0))
+
+    @property
+    def asyncDataWald(self):
+        """AsyncDWConnector the prefetching loops fetch through (setting DWASYNC), or None.
+        """
+        setting = getattr(self, "setting", None) or {}
+        if not bool(int(setting.get("DWASYNC", 0))):
+            return None
+        return getattr(getattr(self, "dataWald", None), "asyncConnector", None)
+
+    @property
+    def syncBatchSize(self):
+        """Number of entities handed together to a batch sync function (setting SYNCBATCHSIZE, 0 to disable).
+        """
+        setting = getattr(self, "setting", None) or {}
+        return int(setting.get("SYNCBATCHSIZE", 0))
+
+    @property
+    def executor(self):
+        """How the sync loops run their entities: serial, thread or process (setting EXECUTOR).
+        """
+        setting = getattr(self, "setting", None) or {}
+        return setting.get("EXECUTOR", "serial")
+
+    @property
+    def maxWorkers(self):
+        setting = getattr(self, "setting", None) or {}
+        return int(setting.get("MAXWORKERS", 4))
+
+    def initWorkerProcess(self):
+        """Called once in every forked worker process.  The pooled connections inherited
+        from the parent must not be shared across processes: the DataWald session is reset
+        here, and agencies reset the connections of their own connectors.
+        """
+        dataWald = getattr(self, "dataWald", None)
+        if dataWald is not None and hasattr(dataWald, "resetSession"):
+            dataWald.resetSession()
+
+    def endWorkerThreads(self):
+        """Called once the worker threads of runEntities are shut down; agencies close the
+        connections their connectors opened in those threads.
+        """
+        pass
+
+    def _fetchEntityFt(self, key, getEntity):
+        def setSyncTaskId(e, entity):
+            # The status of the entity counts towards the sync task that dispatched it.
+            if entity is not None and "sync_task_id" in e.keys():
+                entity["sync_task_id"] = e["sync_task_id"]
+            return entity
+
+        def args(e):
+            return (e["frontend"], e[key], e["data_type"]) if "data_type" in e.keys() else (e["frontend"], e[key])
+
+        if asyncio.iscoroutinefunction(getEntity):
+            async def fetchAsync(e):
+                return setSyncTaskId(e, await getEntity(*args(e)))
+            return fetchAsync
+
+        def fetch(e):
+            return setSyncTaskId(e, getEntity(*args(e)))
+        return fetch
+
+    def fetchEntities(self, entities, key, getEntity, prefetch=0):
+        """Pop the entities and yield them fetched, keeping up to prefetch fetches in flight.
+        """
+        if prefetch <= 0:
+            fetch = self._fetchEntityFt(key, getEntity)
+            while len(entities) > 0:
+                yield fetch(entities.pop())
+            return
+
+        # A DataWald fetch goes through the AsyncDWConnector when DWASYNC is set.
+        asyncDataWald = self.asyncDataWald
+        if asyncDataWald is not None and getattr(getEntity, "__self__", None) is getattr(self, "dataWald", None):
+            getEntity = getattr(asyncDataWald, getEntity.__name__)
+        fetch = self._fetchEntityFt(key, getEntity)
+        if asyncio.iscoroutinefunction(fetch):
+            for entity in self.fetchEntitiesAsync(entities, fetch, prefetch):
+                yield entity
+            return
+
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            futures = deque()
+            while len(entities) > 0 or len(futures) > 0:
+                while len(entities) > 0 and len(futures) <= prefetch:
+                    futures.append(executor.submit(fetch, entities.pop()))
+                yield futures.popleft().result()
+
+    def fetchEntitiesAsync(self, entities, fetch, prefetch):
+        """fetchEntities on an event loop of its own: up to prefetch coroutine fetches run
+        while the current entity is handed to the caller.
+        """
+        loop = asyncio.new_event_loop()
+        tasks = deque()
+        try:
+            while len(entities) > 0 or len(tasks) > 0:
+                while len(entities) > 0 and len(tasks) <= prefetch:
+                    tasks.append(loop.create_task(fetch(entities.pop())))
+                yield loop.run_until_complete(tasks.popleft())
+        finally:
+            for task in tasks:
+                task.cancel()
+            if len(tasks) > 0:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def runEntities(self, entities, key, getEntity, funct):
+        """Fetch every entity and run funct on it with the configured executor.
+
+        The serial executor yields the results in order; the thread and process
+        executors run MAXWORKERS entities at a time and yield them as they complete.
+        """
+        executor = self.executor
+        if executor == "serial":
+            for entity in self.fetchEntities(entities, key, getEntity, prefetch=self.prefetch):
+                yield funct(entity)
+            return
+
+        fetch = self._fetchEntityFt(key, getEntity)
+        work = lambda e: funct(fetch(e))
+        if executor == "thread":
+            pool = ThreadPoolExecutor(max_workers=self.maxWorkers)
+        elif executor == "process":
+            # The job reaches every forked worker through the initializer arguments (not
+            # pickled with fork), so only the entity dicts and the results cross the
+            # process boundary.
+            pool = ProcessPoolExecutor(
+                max_workers=self.maxWorkers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_initWorkerProcess,
+                initargs=(work, self.initWorkerProcess)
+            )
+            work = _runWorkerFt
+        else:
+            log = "Executor({0}) is not supported.".format(executor)
+            self.logger.error(log)
+            raise Exception(log)
+
+        try:
+            with pool:
+                futures = []
+                while len(entities) > 0:
+                    futures.append(pool.submit(work, entities.pop()))
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            if executor == "thread":
+                self.endWorkerThreads()
+
+    def flushEntitiesStatus(self, entitiesStatus, updateEntityStatus, updateEntitiesStatus=None):
+        """Write the entities' statuses back, STATUSBATCHSIZE at a time when a batch call is given.
+        """
+        if updateEntitiesStatus is not None:
+            ids = list(entitiesStatus.keys())
+            for i in range(0, len(ids), self.STATUSBATCHSIZE):
+                chunk = dict([(id, entitiesStatus[id]) for id in ids[i:i+self.STATUSBATCHSIZE]])
+                try:
+                    updateEntitiesStatus(chunk)
+                    continue
+                except:
+                    log = traceback.format_exc()
+                    self.logger.exception(log)
+                for id, entityStatus in chunk.items():
+                    try:
+                        updateEntityStatus(id, entityStatus)
+                    except:
+                        log = traceback.format_exc()
+                        self.logger.exception(log)
+            return
+
+        for id, entityStatus in entitiesStatus.items():
             try:
                 updateEntityStatus(id, entityStatus)
             except:
                 log = traceback.format_exc()
                 self.logger.exception(log)
-            
-        return entitiesStatuses
 
     def transformData(self, record, metadatas, getCustValue=None):
+        plan = self.compileMetadatas(metadatas)
         tgt = {}
-        for k, v in metadatas.items():
+        for k, v, runner in plan:
             try:
-                if v["type"] == "list":
-                    value = self.extractValue(getCustValue, **self._getParams(record, v["src"][0]))
-                    tgt[k] = self.loadData(v["funct"], value, dataType="list", getCustValue=getCustValue)
-                elif v["type"] == "dict":
-                    value = self.extractValue(getCustValue, **self._getParams(record, v["src"][0]))
-                    tgt[k] = self.loadData(v["funct"], value, dataType="dict", getCustValue=getCustValue)
-                else:
-                    try:
-                        src = dict(
-                            [(i["label"], self.extractValue(getCustValue, **self._getParams(record, i))) for i in v["src"]]
-                        )
-                        funct = eval("lambda src: {funct}".format(funct=v["funct"]))
-                        tgt[k] = funct(src)
-                    except Exception as e:
-                        self.logger.info(src)
-                        self.logger.info(v["funct"])
-                        log = traceback.format_exc()
-                        self.logger.exception(log)
-                        tgt[k] = None
+                tgt[k] = runner(record, getCustValue)
             except Exception as e:
                 log = traceback.format_exc()
                 log = "{0}: {1}\nlog: {2}\n".format(k, v, log)
@@ -138,52 +365,174 @@ class Abstract(object):
         tgt = dict([(vkey, vdata) for vkey, vdata in tgt.items() if(vdata is not None)])
         return tgt
 
-    def loadData(self, tx, value, dataType="attribute", getCustValue=None):
-        if value is None:
-            return None
-        elif dataType == "list":
-            items = []
-            for i in value:
-                item = {}
-                for k, v in tx.items():
-                    item[k] = self.loadData(
-                        v if v["type"] == "attribute" else v["funct"],
-                        i if v["type"] == "attribute" else self.extractValue(getCustValue, **self._getParams(i, v["src"][0])),
-                        dataType=v["type"],
-                        getCustValue=getCustValue
-                    )
-                item = {vkey: vdata for vkey, vdata in item.items() if vdata is not None}
-                items.append(item)
-            return items
-        elif dataType == "dict":
-            item = {}
-            for k, v in tx.items():
-                item[k] = self.loadData(
-                    v if v["type"] == "attribute" else v["funct"],
-                    value,
-                    dataType=v["type"],
+    def transformRecords(self, records, metadatas, getCustValue=None, getRecord=None):
+        """Transform a page of records with one compiled plan.
+
+        Yields (record, data, log) per record; a failed record gives data
+        None and the traceback in log instead of stopping the page.
+        """
+        for record in records:
+            try:
+                data = self.transformData(
+                    getRecord(record) if getRecord is not None else record,
+                    metadatas,
                     getCustValue=getCustValue
                 )
-            item = {vkey: vdata for vkey, vdata in item.items() if vdata is not None}
-            return item
+                yield (record, data, None)
+            except Exception:
+                log = traceback.format_exc()
+                yield (record, None, log)
+
+    def groupRows(self, rows, *keys):
+        """Group the rows by the value of the keys in one pass, keeping the order of
+        first appearance: {value: rows} for one key, {(value, ...): rows} for several.
+        """
+        groups = {}
+        if len(keys) == 1:
+            key = keys[0]
+            for row in rows:
+                groups.setdefault(row[key], []).append(row)
         else:
-            src = {}
-            for i in tx["src"]:
-                value = self.extractValue(getCustValue, **self._getParams(value, i))
-                if value is not None and isinstance(value, str):
-                    src[i["label"]] = value.encode('ascii', 'ignore')
+            for row in rows:
+                groups.setdefault(tuple([row[key] for key in keys]), []).append(row)
+        return groups
+
+    def compileMetadatas(self, metadatas):
+        """Compile the metadatas into a reusable transform plan.
+        """
+        plans = self.__dict__.setdefault("_txPlans", {})
+        cached = plans.get(id(metadatas))
+        if cached is not None and cached[0] is metadatas:
+            return cached[1]
+
+        plan = []
+        for k, v in metadatas.items():
+            try:
+                if v["type"] in ("list", "dict"):
+                    runner = self._compileNode(v["funct"], v["type"], self._compileExtractor(v["src"][0]))
                 else:
-                    src[i["label"]] = value
-            src = {k: v.decode("utf-8", "ignore") if isinstance(v, (bytes, bytearray)) else v for k, v in src.items()}
-            funct = lambda src: eval(tx["funct"])
-            return funct(src)
+                    runner = self._compileAttribute(v)
+            except Exception as e:
+                log = traceback.format_exc()
+                log = "{0}: {1}\nlog: {2}\n".format(k, v, log)
+                self.logger.exception(log)
+                raise Exception(log)
+            plan.append((k, v, runner))
 
-    def exists(self, obj, chain):
-        _key = chain.pop(0)
-        if obj is not None and _key in obj:
-            return self.exists(obj[_key], chain) if chain else obj[_key]
+        if len(plans) >= self.TXPLANCACHESIZE:
+            plans.pop(next(iter(plans)))
+        plans[id(metadatas)] = (metadatas, plan)
+        return plan
+
+    def _compileFunct(self, funct):
+        try:
+            return eval(compile("lambda src: {funct}".format(funct=funct), "<txmap>", "eval"))
+        except SyntaxError:
+            # Keep the failure at run time so it is reported per record as before.
+            return lambda src: eval("lambda src: {funct}".format(funct=funct))(src)
+
+    def _compileExtractor(self, params):
+        key = params.get("key", None)
+        default = params.get("default", None)
+        if key is None:
+            return lambda record, getCustValue: default
+        elif key == "####":
+            return lambda record, getCustValue: record
+
+        chain = tuple(key.split("|"))
+        custom = key.find("@") != -1
+        existsChain = self._existsChain
+        def extract(record, getCustValue):
+            if custom and getCustValue is not None:
+                _value = getCustValue(record, key)
+            else:
+                _value = existsChain(record, chain)
+            return _value if _value is not None else default
+        return extract
+
+    def _compileAttribute(self, tx):
+        extractors = [(i["label"], self._compileExtractor(i)) for i in tx["src"]]
+        funct = self._compileFunct(tx["funct"])
+        def run(record, getCustValue):
+            src = {}
+            try:
+                for label, extract in extractors:
+                    src[label] = extract(record, getCustValue)
+                return funct(src)
+            except Exception as e:
+                self.logger.info(src)
+                self.logger.info(tx["funct"])
+                log = traceback.format_exc()
+                self.logger.exception(log)
+                return None
+        return run
+
+    def _compileNode(self, tx, dataType, extract=None):
+        """Compile a loadData mapping; the runner takes the source value
+        through extract when it is given.
+        """
+        if dataType == "list":
+            children = [
+                (k, self._compileNode(v, "attribute") if v["type"] == "attribute" else \
+                    self._compileNode(v["funct"], v["type"], self._compileExtractor(v["src"][0])))
+                for k, v in tx.items()
+            ]
+            def load(value, getCustValue):
+                if value is None:
+                    return None
+                items = []
+                for i in value:
+                    item = {}
+                    for k, child in children:
+                        item[k] = child(i, getCustValue)
+                    items.append({vkey: vdata for vkey, vdata in item.items() if vdata is not None})
+                return items
+        elif dataType == "dict":
+            children = [
+                (k, self._compileNode(v if v["type"] == "attribute" else v["funct"], v["type"]))
+                for k, v in tx.items()
+            ]
+            def load(value, getCustValue):
+                if value is None:
+                    return None
+                item = {}
+                for k, child in children:
+                    item[k] = child(value, getCustValue)
+                return {vkey: vdata for vkey, vdata in item.items() if vdata is not None}
         else:
-            return None
+            extractors = [(i["label"], self._compileExtractor(i)) for i in tx["src"]]
+            funct = self._compileFunct(tx["funct"])
+            def load(value, getCustValue):
+                if value is None:
+                    return None
+                src = {}
+                for label, _extract in extractors:
+                    value = _extract(value, getCustValue)
+                    if isinstance(value, str):
+                        src[label] = value.encode('ascii', 'ignore').decode("utf-8", "ignore")
+                    elif isinstance(value, (bytes, bytearray)):
+                        src[label] = value.decode("utf-8", "ignore")
+                    else:
+                        src[label] = value
+                return funct(src)
+
+        if extract is None:
+            return load
+        return lambda record, getCustValue: load(extract(record, getCustValue), getCustValue)
+
+    def loadData(self, tx, value, dataType="attribute", getCustValue=None):
+        return self._compileNode(tx, dataType)(value, getCustValue)
+
+    def exists(self, obj, chain):
+        return self._existsChain(obj, chain)
+
+    def _existsChain(self, obj, chain):
+        for _key in chain:
+            if obj is not None and _key in obj:
+                obj = obj[_key]
+            else:
+                return None
+        return obj
 
     def _getParams(self, record, params):
         params["record"] = record
@@ -191,51 +540,29 @@ class Abstract(object):
 
     def extractValue(self, getCustValue, **params):
         record = params.pop("record")
-        key = params.pop("key", None)
-        default = params.pop("default", None)
-        _value = None
-        if key is None:
-            pass
-        elif key == "####":
-            return record
-        elif key.find("@") is not -1 and getCustValue is not None:
-            _value = getCustValue(record, key)
-        else:
-            _value = self.exists(record, key.split("|"))
-        value = _value if _value is not None else default
-        return value
+        return self._compileExtractor(params)(record, getCustValue)
 
     def updateSyncTask(self, id):
         try:
             syncTask = self.dataWald.getSyncTask(id)
             id = syncTask["id"]
             table = syncTask["table"]
-            queues = [
-                {
-                    'entity': entity,
-                    'count': 0
-                } for entity in syncTask["entities"]
-            ]
+            # The entities' status updates count pending down atomically, so one read tells
+            # whether every result is in; one getTasks (BatchGetItem) call then resolves them.
+            pending = syncTask.get("pending")
+            tasks = dict([(task["id"], task) for task in self.dataWald.getTasks(table, [entity["id"] for entity in syncTask["entities"]])])
             entities = []
-            while len(queues):
-                queue = queues.pop(0)
-                self.logger.info(queue)
-                entity = queue['entity']
+            for entity in syncTask["entities"]:
                 taskId = entity["id"]
-                queue['count'] = queue['count'] + 1
-                if queue['count'] > 1:
-                    sleep(2**queue['count']*0.5)
-                task = self.dataWald.getTask(table, taskId)
-                if task['ready']:
+                task = tasks.get(taskId)
+                if task is not None and task['ready']:
                     entity['task_status'] = task['status']
                     entity['task_detail'] = task['detail']
-                    entities.append(entity)
-                elif queue['count'] > 6:
-                    entity['task_status'] = '?'
-                    entity['task_detail'] = 'Not able to retrieve the result from task %s in 8 times.' % taskId
-                    entities.append(entity)
                 else:
-                    queues.append(queue)
+                    entity['task_status'] = '?'
+                    entity['task_detail'] = 'Not able to retrieve the result from task %s (%s pending).' % (taskId, pending)
+                entities.append(entity)
+            self.logger.info({"id": id, "pending": pending, "tasks": len(entities), "unresolved": len([entity for entity in entities if entity['task_status'] == '?'])})
             self.dataWald.updateSyncTask(id, entities)
         except Exception as e:
             log = traceback.format_exc()
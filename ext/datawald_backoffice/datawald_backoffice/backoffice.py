@@ -10,6 +10,9 @@ class BackOffice(Abstract):
         self.boApp = boApp
         self.dataWald = dataWald
         self.logger = logger
+        # Keyset cursor of the products paging: boProductsFt may resume from it and
+        # leave the next one (None when the last page is read).
+        self.cursor = None
 
     def setRawData(self, **params):
         pass
@@ -62,7 +65,8 @@ class BackOffice(Abstract):
             txEntity=self.txOrder,
             cancelEntity=self.cancelOrderFt,
             insertEntities=self.insertOrdersFt,
-            updateEntityStatus=self.dataWald.updateOrderStatus
+            updateEntityStatus=self.dataWald.updateOrderStatus,
+            updateEntitiesStatus=self.dataWald.updateOrdersStatus
         )
 
     # Sync customers from Frontend to Backoffice.
@@ -96,7 +100,8 @@ class BackOffice(Abstract):
             getEntityId=self.boCustomerIdFt,
             txEntity=self.txCustomer,
             insertEntities=self.insertCustomersFt,
-            updateEntityStatus=self.dataWald.updateBOCustomerStatus
+            updateEntityStatus=self.dataWald.updateBOCustomerStatus,
+            updateEntitiesStatus=self.dataWald.updateBOCustomersStatus
         )
 
     def boItemReceiptFt(self, itemReceipt):
@@ -131,7 +136,8 @@ class BackOffice(Abstract):
             getEntityId=self.boItemReceiptIdFt,
             txEntity=self.txItemReceipt,
             insertEntities=self.insertItemReceiptsFt,
-            updateEntityStatus=self.dataWald.updateItemReceiptStatus
+            updateEntityStatus=self.dataWald.updateItemReceiptStatus,
+            updateEntitiesStatus=self.dataWald.updateItemReceiptsStatus
         )
 
     def getMetadata(self, frontend, table):
@@ -146,6 +152,19 @@ class BackOffice(Abstract):
     def boProductsExtFt(self, products, rawProducts):
         pass
 
+    def boProductsExportFt(self, frontend, table, cutDt=None, offset=0, cursor=None):
+        """Return an iterator of (products, cursor, latest update_dt) pages for a bulk export
+        resumed from cursor, or None to page with boProductsFt.
+        """
+        return None
+
+    @property
+    def exportBatchSize(self):
+        """Number of exported products recorded per sync control (setting EXPORTBATCHSIZE).
+        """
+        setting = getattr(self, "setting", None) or {}
+        return int(setting.get("EXPORTBATCHSIZE", 1000))
+
     def getProducts(self, frontend, table, offset, limit, cutDt=None):
         """Get products from the back office application.
         """
@@ -153,6 +172,100 @@ class BackOffice(Abstract):
         self.boProductsExtFt(products, rawProducts)
         return products
 
+    @property
+    def syncRetries(self):
+        """Times a record DataWald rejects is pushed again before it is recorded as failed
+        (setting DWSYNCRETRIES).
+        """
+        setting = getattr(self, "setting", None) or {}
+        return int(setting.get("DWSYNCRETRIES", 2))
+
+    def syncDWEntities(self, records, key, syncEntities):
+        """Push records to DataWald in batch calls and collect the sync task entities.
+
+        The records DataWald rejects, or that a failed call left out, are pushed again up to
+        syncRetries times.  Returns (entities, failed): failed holds {key, update_dt, error}
+        for the records still rejected, which the sync control records, so the offset moves on.
+        """
+        updateDts = dict([(record[key], record['update_dt']) for record in records])
+        entities = []
+        errors = {}
+        retries = 0
+        while len(records) > 0:
+            try:
+                results = syncEntities(records)
+            except Exception as e:
+                log = traceback.format_exc()
+                self.logger.exception(log)
+                results = [{key: record[key], "error": log} for record in records]
+            rejected = set()
+            for result in results:
+                if "error" in result.keys():
+                    self.logger.error(result["error"])
+                    rejected.add(result.get(key))
+                    errors[result.get(key)] = result["error"]
+                    continue
+                log = "Successfully inserted document: %s/%s." % (result['id'], result[key])
+                self.logger.info(log)
+                errors.pop(result[key], None)
+                entities.append({
+                    'id': result['id'],
+                    key: result[key],
+                    'update_dt': updateDts[result[key]]
+                })
+            records = [record for record in records if record[key] in rejected]
+            if len(records) == 0 or retries >= self.syncRetries:
+                break
+            retries = retries + 1
+            sleep(retries)
+        failed = [{key: record[key], 'update_dt': record['update_dt'], 'error': "{0}".format(errors.get(record[key]))} for record in records]
+        return (entities, failed)
+
+    def exportProducts(self, frontend, table, storeCode, task, cutDt, offset, pages):
+        """Push the exported pages to DataWald in batches, one sync control per batch.
+
+        The intermediate sync controls keep the cut date and save the export's cursor, with
+        the number of products pushed so far as offset, so an interrupted export resumes
+        after its last batch.  The last batch always writes the final control, cut at the
+        latest update_dt; the products DataWald kept rejecting are recorded as failed on
+        their batch's control.  Only the counts are returned, not the entities.
+        """
+        batch = []
+        count = 0
+        (cursor, lastCutDt) = (None, cutDt)
+        syncControlId = None
+        pages = iter(pages)
+        page = next(pages, None)
+        while True:
+            if page is not None:
+                (products, cursor, lastCutDt) = page
+                batch.extend(products)
+                # Look ahead, so the final control is written with the last batch.
+                page = next(pages, None)
+                if page is not None and len(batch) < self.exportBatchSize:
+                    continue
+            (entities, failed) = self.syncDWEntities(
+                batch,
+                'sku',
+                lambda products: self.dataWald.syncProducts(self.boApp, frontend, products)
+            )
+            count = count + len(batch)
+            batch = []
+            syncTask = {
+                "store_code": storeCode,
+                "cut_dt": cutDt,
+                "offset": offset + count,
+                "cursor": cursor,
+                "entities": entities,
+                "failed": failed
+            }
+            if page is None:
+                syncTask.update({"cut_dt": lastCutDt, "offset": 0, "cursor": None})
+            syncControlId = self.dataWald.insertSyncControl(self.boApp, frontend, task, 'products', syncTask)
+            if page is None:
+                break
+        return {"id": str(syncControlId), "table": table, "count": count, "offset": 0}
+
     def retrieveProducts(self, **params):
         frontend = params.pop("frontend")
         table = params.pop("table")
@@ -160,39 +273,33 @@ class BackOffice(Abstract):
         limit = params.pop("limit", None)
         #task = sys._getframe().f_code.co_name
         task = 'syncProducts'
-        (offset, cutDt) = self.dataWald.getLastCut(frontend, task, offset=True)  # Need update function.
+        (offset, cutDt, self.cursor) = self.dataWald.getLastCut(frontend, task, offset=True, cursor=True)  # Need update function.
+        pages = self.boProductsExportFt(frontend, table, cutDt, offset=offset, cursor=self.cursor)
+        if pages is not None:
+            self.logger.info("Export Offset:{0} Cut Date:{1}".format(offset, cutDt))
+            return self.exportProducts(frontend, table, storeCode, task, cutDt, offset, pages)
         totalRecord = self.boProductsTotalFt(cutDt)  # Need update function.
         self.logger.info("Total:{0} Offset:{1} Limit:{2} Cut Date:{3}".format(totalRecord,offset,limit,cutDt))
         products = self.getProducts(frontend, table, offset, limit, cutDt)
-        entities = []
-        for product in products:
-            try:
-                sku = product['sku']
-                updateDt = product['update_dt']
-                id = self.dataWald.syncProduct(self.boApp, frontend, sku, product)
-                log = "Successfully inserted document: %s/%s." % (id, sku)
-                self.logger.info(log)
-                entity = {
-                    'id': id,
-                    'sku': sku,
-                    'update_dt': updateDt
-                }
-                entities.append(entity)
-            except Exception as e:
-                log = traceback.format_exc()
-                self.logger.exception(log)
-                self.logger.error(product)
+        (entities, failed) = self.syncDWEntities(
+            products,
+            'sku',
+            lambda products: self.dataWald.syncProducts(self.boApp, frontend, products)
+        )
         if len(products) > 0:
             offset = offset + len(products)
             if offset >= totalRecord:
                 lastProduct = max(products, key=lambda product:datetime.strptime(product['update_dt'], "%Y-%m-%d %H:%M:%S"))
                 cutDt = lastProduct['update_dt']
                 offset = 0
+                self.cursor = None
         syncTask = {
             "store_code": storeCode,
             "cut_dt": cutDt,
             "offset": offset,
-            "entities": entities
+            "cursor": self.cursor,
+            "entities": entities,
+            "failed": failed
         }
         syncControlId = self.dataWald.insertSyncControl(self.boApp, frontend, task, 'products', syncTask)
         return {"id": str(syncControlId), "table": table, "entities": entities, "offset": offset}
@@ -227,24 +334,11 @@ class BackOffice(Abstract):
         totalRecord = self.boProductsExtDataTotalFt(dataType, cutDt)
         self.logger.info("Total:{0} Offset:{1} Limit:{2} Cut Date:{3}".format(totalRecord,offset,limit,cutDt))
         productsExtData = self.getProductsExtData(frontend, dataType, offset, limit, cutDt)
-        entities = []
-        for productExtData in productsExtData:
-            try:
-                sku = productExtData['sku']
-                updateDt = productExtData['update_dt']
-                id = self.dataWald.syncProductExtData(self.boApp, frontend, sku, dataType, productExtData) # Develop the function.
-                log = "Successfully inserted document: %s/%s." % (id, sku)
-                self.logger.info(log)
-                entity = {
-                    'id': id,
-                    'sku': sku,
-                    'update_dt': updateDt
-                }
-                entities.append(entity)
-            except Exception as e:
-                log = traceback.format_exc()
-                self.logger.exception(log)
-                self.logger.error(productExtData)
+        (entities, failed) = self.syncDWEntities(
+            productsExtData,
+            'sku',
+            lambda productsExtData: self.dataWald.syncProductsExtData(self.boApp, frontend, dataType, productsExtData)
+        )
         if len(productsExtData) > 0:
             offset = offset + len(productsExtData)
             if offset >= totalRecord:
@@ -255,7 +349,8 @@ class BackOffice(Abstract):
             "store_code": storeCode,
             "cut_dt": cutDt,
             "offset": offset,
-            "entities": entities
+            "entities": entities,
+            "failed": failed
         }
         syncControlId = self.dataWald.insertSyncControl(self.boApp, frontend, task, "{0}-{1}".format("products", dataType), syncTask)
         return {"id": str(syncControlId), "data_type": dataType, "entities": entities, "offset": offset}
@@ -2,6 +2,7 @@ from datawald_frontend import FrontEnd
 from datawald_backoffice import BackOffice
 from datetime import datetime, timedelta
 import copy
+import json
 import traceback
 
 class DynamoDBAgency(FrontEnd, BackOffice):
@@ -82,20 +83,50 @@ class DynamoDBAgency(FrontEnd, BackOffice):
     def boProductsFt(self, frontend, table, offset, limit, cutDt=None):
         """We could add validation into this function.
         """
-        products = []
+        (rawData, self.cursor) = self.dynamodb.getProductsPage(
+            cutDt,
+            limit if limit is not None else self.limit,
+            offset=offset,
+            cursor=getattr(self, "cursor", None)
+        )
+        products = list(self.txProducts(frontend, table, rawData))
+        return (products, rawData)
+
+    def boProductsExportFt(self, frontend, table, cutDt=None, offset=0, cursor=None):
+        # Full resyncs scan the table in parallel when SCANSEGMENTS is set on the connection.
+        if self.dynamodb.scanSegments <= 0 or cutDt != self.dynamodb.defaultCutDt:
+            return None
+        export = json.loads(cursor) if cursor is not None else {}
+        if "scan" not in export.keys() and offset != 0:
+            return None
+        return self.exportProductPages(frontend, table, cutDt, export.get("scan"), export.get("cut_dt", cutDt))
+
+    def exportProductPages(self, frontend, table, cutDt, checkpoint, lastCutDt):
+        """Yield (products, cursor, latest update_dt) per scanned page.
+
+        The cursor holds the scan checkpoint and the latest update_dt exported so far, so
+        an interrupted export resumes where its last sync control left it.
+        """
+        getUpdateDt = lambda updateDt: datetime.strptime(updateDt, "%Y-%m-%d %H:%M:%S")
+        for rawData, checkpoint in self.dynamodb.scanProducts(cutDt, checkpoint=checkpoint):
+            for rawProduct in rawData:
+                if lastCutDt is None or getUpdateDt(rawProduct['update_dt']) > getUpdateDt(lastCutDt):
+                    lastCutDt = rawProduct['update_dt']
+            products = list(self.txProducts(frontend, table, rawData))
+            yield (products, json.dumps({"scan": checkpoint, "cut_dt": lastCutDt}), lastCutDt)
+
+    def txProducts(self, frontend, table, rawData):
         headers = self.getMetadata(frontend, table)
         metadatas = dict(
             [(metadata["dest"], {"funct": metadata["funct"], "src": metadata["src"], "type": "attribute"}) for metadata in [header["metadata"] for header in headers]]
         )
 
-        rawData = self.dynamodb.getProducts(
-            cutDt,
-            limit if limit is not None else self.limit,
-            offset
-        )
-        for rawProduct in rawData:
+        for rawProduct, data, log in self.transformRecords(rawData, metadatas, getRecord=lambda r: r["data"]):
+            if log is not None:
+                self.logger.error(log)
+                self.logger.error(rawProduct)
+                continue
             try:
-                data = self.transformData(rawProduct["data"], metadatas)
                 product = {}
                 product["sku"] = rawProduct["sku"]
                 product["frontend"] = frontend
@@ -104,11 +135,11 @@ class DynamoDBAgency(FrontEnd, BackOffice):
                 product["data"] = data
                 product["create_dt"] = rawProduct['create_dt']
                 product["update_dt"] = rawProduct['update_dt']
-                products.append(product)
             except Exception as e:
                 log = traceback.format_exc()
                 self.logger.exception(log)
                 self.logger.error(data)
                 self.logger.error(rawProduct)
                 # raise
-        return (products, rawData)
+                continue
+            yield product
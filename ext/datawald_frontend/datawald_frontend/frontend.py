@@ -186,7 +186,8 @@ class FrontEnd(Abstract):
             "bo_customer_id",
             getEntity=self.dataWald.getFECustomer,
             syncFt=self.syncCustomerFt,
-            updateEntityStatus=self.dataWald.updateFECustomerStatus
+            updateEntityStatus=self.dataWald.updateFECustomerStatus,
+            updateEntitiesStatus=self.dataWald.updateFECustomersStatus
         )
 
     # Sync Invoices from BackOffice to FrontEnd.
@@ -202,7 +203,8 @@ class FrontEnd(Abstract):
             "bo_invoice_id",
             getEntity=self.dataWald.getInvoice,
             syncFt=self.syncInvoiceFt,
-            updateEntityStatus=self.dataWald.updateInvoiceStatus
+            updateEntityStatus=self.dataWald.updateInvoiceStatus,
+            updateEntitiesStatus=self.dataWald.updateInvoicesStatus
         )
 
     # Sync Shipments from BackOffice to FrontEnd.
@@ -218,7 +220,8 @@ class FrontEnd(Abstract):
             "bo_shipment_id",
             getEntity=self.dataWald.getShipment,
             syncFt=self.syncShipmentFt,
-            updateEntityStatus=self.dataWald.updateShipmentStatus
+            updateEntityStatus=self.dataWald.updateShipmentStatus,
+            updateEntitiesStatus=self.dataWald.updateShipmentsStatus
         )
 
     # Sync PurchaseOrders from BackOffice to FrontEnd.
@@ -234,7 +237,8 @@ class FrontEnd(Abstract):
             "bo_po_num",
             getEntity=self.dataWald.getPurchaseOrder,
             syncFt=self.syncPurchaseOrderFt,
-            updateEntityStatus=self.dataWald.updatePurchaseOrderStatus
+            updateEntityStatus=self.dataWald.updatePurchaseOrderStatus,
+            updateEntitiesStatus=self.dataWald.updatePurchaseOrdersStatus
         )
 
     def validateProductData(self, product):
@@ -251,6 +255,9 @@ class FrontEnd(Abstract):
     def syncProductFt(self, product):
         pass
 
+    # Sync a list of Products at once; agencies that support it return {id: error} of the failed ones.
+    syncProductsFt = None
+
     def syncProducts(self, **params):
         products = params.pop("data")
         return self.syncFEEntities(
@@ -261,7 +268,9 @@ class FrontEnd(Abstract):
             getEntity=self.dataWald.getProduct,
             syncFt=self.syncProductFt,
             updateEntityStatus=self.dataWald.updateProductStatus,
-            validateData=self.validateProductData
+            updateEntitiesStatus=self.dataWald.updateProductsStatus,
+            validateData=self.validateProductData,
+            syncEntitiesFt=self.syncProductsFt
         )
 
     @property
@@ -334,5 +343,6 @@ class FrontEnd(Abstract):
             getEntity=self.dataWald.getProductExtData,
             syncFt=self.syncProductExtDataFt,
             updateEntityStatus=self.dataWald.updateProductExtDataStatus,
+            updateEntitiesStatus=self.dataWald.updateProductsExtDataStatus,
             validateData=self.validateCustomOptions if dataType == "customoption" else None
         )
@@ -248,22 +248,19 @@ class Mage1Agency(FrontEnd, BackOffice):
         try:
             rawData = self.mage1.getInventory(cutdt,offset,limit) # Develop the function.
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in  ['sku', 'website_code'])
-            for sku in metaData["sku"]:
+            for sku, skuRows in self.groupRows(rawData, "sku").items():
                 inventories = []
-                for warehouse in metaData["website_code"]:
-                    rows = list(filter(lambda t: (t["sku"]==sku and t["website_code"]==warehouse), rawData))
-                    if len(rows) != 0:
-                        entity = rows[0]
-                        inventory = copy.deepcopy(self.inventory)
-                        inventory["warehouse"] = warehouse
-                        inventory["qty"] = entity["qty"]
-                        if "full" in entity.keys():
-                            inventory["full"] = entity["full"]
-                        if inventory["full"]:
-                            inventory["on_hand"] = inventory["qty"]
-                        inventory["in_stock"] = True if inventory["qty"] > 0 else False
-                        inventories.append(inventory)
+                for warehouse, rows in self.groupRows(skuRows, "website_code").items():
+                    entity = rows[0]
+                    inventory = copy.deepcopy(self.inventory)
+                    inventory["warehouse"] = warehouse
+                    inventory["qty"] = entity["qty"]
+                    if "full" in entity.keys():
+                        inventory["full"] = entity["full"]
+                    if inventory["full"]:
+                        inventory["on_hand"] = inventory["qty"]
+                    inventory["in_stock"] = True if inventory["qty"] > 0 else False
+                    inventories.append(inventory)
                 productsExtData[sku] = inventories
             return productsExtData
         except Exception as e:
@@ -275,11 +272,10 @@ class Mage1Agency(FrontEnd, BackOffice):
         try:
             rawDataImage = self.mage1.getImages(cutDt, offset=offset, limit=limit)
             rawDataGallery = self.mage1.getGallery(cutDt, offset=offset, limit=limit)
-            metaData = dict((k, list(set(map(lambda d: d[k], rawDataImage)))) for k in ['sku'])
+            galleryRows = self.groupRows(rawDataGallery, "sku")
 
             productsExtData = {}
-            for sku in metaData["sku"]:
-                rows = list(filter(lambda t: (t["sku"]==sku), rawDataImage))
+            for sku, rows in self.groupRows(rawDataImage, "sku").items():
                 imageGallery = {}
                 for row in rows:
                     imageGallery[row["type"]] = row["value"]
@@ -292,7 +288,7 @@ class Mage1Agency(FrontEnd, BackOffice):
                         "media_source": row["media_source"],
                         "media_type": row["type"],
                         "value": row["value"]
-                    } for row in list(filter(lambda t: (t["sku"]==sku), rawDataGallery))
+                    } for row in galleryRows.get(sku, [])
                 ]
                 productsExtData[sku] = imageGallery
             return productsExtData
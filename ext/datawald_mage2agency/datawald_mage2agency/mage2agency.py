@@ -21,6 +21,14 @@ class Mage2Agency(FrontEnd, BackOffice):
     def __del__(self):
         self.mage2.__del__()
 
+    def initWorkerProcess(self):
+        super(Mage2Agency, self).initWorkerProcess()
+        self.mage2.detachAdaptors()
+
+    def endWorkerThreads(self):
+        super(Mage2Agency, self).endWorkerThreads()
+        self.mage2.closeIdleAdaptors()
+
     @property
     def custOptValidation(self):
         if self.setting is not None and "CUSTOPTVALIDATION" in self.setting.keys():
@@ -39,11 +47,10 @@ class Mage2Agency(FrontEnd, BackOffice):
         try:
             rawDataImage = self.mage2.getImages(cutDt, offset=offset, limit=limit)
             rawDataGallery = self.mage2.getGallery(cutDt, offset=offset, limit=limit)
-            metaData = dict((k, list(set(map(lambda d: d[k], rawDataImage)))) for k in ['sku'])
+            galleryRows = self.groupRows(rawDataGallery, "sku")
 
             productsExtData = {}
-            for sku in metaData["sku"]:
-                rows = list(filter(lambda t: (t["sku"]==sku), rawDataImage))
+            for sku, rows in self.groupRows(rawDataImage, "sku").items():
                 imageGallery = {}
                 for row in rows:
                     imageGallery[row["type"]] = row["value"]
@@ -56,7 +63,7 @@ class Mage2Agency(FrontEnd, BackOffice):
                         "media_source": row["media_source"],
                         "media_type": row["type"],
                         "value": row["value"]
-                    } for row in list(filter(lambda t: (t["sku"]==sku), rawDataGallery))
+                    } for row in galleryRows.get(sku, [])
                 ]
                 productsExtData[sku] = imageGallery
             return productsExtData
@@ -67,29 +74,48 @@ class Mage2Agency(FrontEnd, BackOffice):
 
     def feOrdersFt(self, cutdt):
         rawOrders = self.mage2.getOrders(cutdt)
-        orders = [
-            self.transformData(order, self.map["order"]) for order in rawOrders
-        ]
+        orders = []
+        for rawOrder, order, log in self.transformRecords(rawOrders, self.map["order"]):
+            if log is not None:
+                self.logger.error(log)
+                continue
+            orders.append(order)
         return (orders, rawOrders)
 
     def feOrdersExtFt(self, orders, rawOrders):
         pass
 
     # Sync Products from BackOffice to FrontEnd.
-    def syncProductFt(self, product):
-        sku = product['sku']
-        attributeSet = product['table']
+    def txProduct(self, product):
         data = product['data']
         data['status'] = data.pop('status', '1')
         data['visibility'] = data.pop('visibility', '4')
         data['tax_class_id'] = data.pop('tax_class_id', '2')
-        typeId = data.pop('type_id', 'simple')
-        storeId = data.pop('store_id', '0')
+        return {
+            "sku": product['sku'],
+            "attribute_set": product['table'],
+            "data": data,
+            "type_id": data.pop('type_id', 'simple'),
+            "store_id": data.pop('store_id', '0')
+        }
+
+    def syncProductFt(self, product):
+        row = self.txProduct(product)
         try:
-            product['fe_product_id'] = self.mage2.syncProduct(sku, attributeSet, data, typeId, storeId)
+            product['fe_product_id'] = self.mage2.syncProduct(row["sku"], row["attribute_set"], row["data"], row["type_id"], row["store_id"])
         except Exception:
             raise
 
+    def syncProductsFt(self, products):
+        (productIds, errors) = self.mage2.syncProducts([self.txProduct(product) for product in products])
+        logs = {}
+        for product in products:
+            if product['sku'] in errors.keys():
+                logs[product['id']] = errors[product['sku']]
+            else:
+                product['fe_product_id'] = productIds[product['sku']]
+        return logs
+
     def syncProductExtDataFt(self, productExtData):
         sku = productExtData['sku']
         dataType = productExtData['data_type']
@@ -63,11 +63,10 @@ class Mage2Agent(Mage2Agency):
         try:
             rawDataImage = self.mage2.getImages(cutDt, offset=offset, limit=limit, sql=EXPORTMEDIAIMAGESEESQL)
             rawDataGallery = self.mage2.getGallery(cutDt, offset=offset, limit=limit, sql=EXPORTMEDIAGALLERYEESQL)
-            metaData = dict((k, list(set(map(lambda d: d[k], rawDataImage)))) for k in ['sku'])
+            galleryRows = self.groupRows(rawDataGallery, "sku")
 
             productsExtData = {}
-            for sku in metaData["sku"]:
-                rows = list(filter(lambda t: (t["sku"]==sku), rawDataImage))
+            for sku, rows in self.groupRows(rawDataImage, "sku").items():
                 imageGallery = {}
                 for row in rows:
                     imageGallery[row["type"]] = row["value"]
@@ -80,7 +79,7 @@ class Mage2Agent(Mage2Agency):
                         "media_source": row["media_source"],
                         "media_type": row["type"],
                         "value": row["value"]
-                    } for row in list(filter(lambda t: (t["sku"]==sku), rawDataGallery))
+                    } for row in galleryRows.get(sku, [])
                 ]
                 productsExtData[sku] = imageGallery
             return productsExtData
@@ -95,8 +95,20 @@ class NSAgency(FrontEnd, BackOffice):
         if limit is not None:
             self.limit = int(limit)
 
-    def transformData(self, record, metadatas):
-        return super(NSAgency, self).transformData(record, metadatas, getCustValue=self.getCustomFieldValue)
+    def transformData(self, record, metadatas, getCustValue=None):
+        return super(NSAgency, self).transformData(
+            record,
+            metadatas,
+            getCustValue=getCustValue if getCustValue is not None else self.getCustomFieldValue
+        )
+
+    def transformRecords(self, records, metadatas, getRecord=None):
+        return super(NSAgency, self).transformRecords(
+            records,
+            metadatas,
+            getCustValue=self.getCustomFieldValue,
+            getRecord=getRecord
+        )
 
     def getCustomFieldValue(self, record, scriptId):
         value = None
@@ -158,8 +170,10 @@ class NSAgency(FrontEnd, BackOffice):
             }
             items = self._getRecords(params, funct=self.ns.getItems)
             rawProductsExtData = {}
-            for item in items:
-                data = self.transformData(item, self.map["inventory"])
+            for item, data, log in self.transformRecords(items, self.map["inventory"]):
+                if log is not None:
+                    self.logger.error(log)
+                    continue
                 rawProductsExtData[data["sku"]] = {
                     "createdDate": data["createdDate"],
                     "lastModifiedDate": data["lastModifiedDate"],
@@ -385,9 +399,12 @@ class NSAgency(FrontEnd, BackOffice):
 
         rawData = self._getRecords(params, funct=self.ns.getItems)
 
-        for rawProduct in rawData:
+        for rawProduct, data, log in self.transformRecords(rawData, metadatas):
+            if log is not None:
+                self.logger.error(log)
+                self.logger.error(rawProduct)
+                continue
             try:
-                data = self.transformData(rawProduct, metadatas)
                 product = {}
                 product["sku"] = data['sku']
                 product["frontend"] = frontend
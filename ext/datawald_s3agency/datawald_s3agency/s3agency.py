@@ -79,6 +79,10 @@ class S3Agency(FrontEnd, BackOffice):
             "in_stock": False
         }
 
+    def initWorkerProcess(self):
+        super(S3Agency, self).initWorkerProcess()
+        self.s3.detachClients()
+
     def setRawData(self, **params):
         bucket = params.pop("bucket")
         key = params.pop("key")
@@ -88,28 +92,25 @@ class S3Agency(FrontEnd, BackOffice):
     def setCustomOption(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku', 'title'])
-            for sku in metaData["sku"]:
+            for sku, skuRows in self.groupRows(rawData, "sku").items():
                 options = []
-                for title in metaData["title"]:
-                    rows = list(filter(lambda t: (t["sku"]==sku and t["title"]==title), rawData))
-                    if len(rows) != 0:
-                        option = deepcopy(self.option)
-                        for row in rows:
-                            for k, v in option.items():
-                                if type(v) is list:
-                                    optionValue = deepcopy(self.optionValue)
-                                    for x in optionValue.keys():
-                                        optionValue[x] = row[x] if x in row.keys() else optionValue[x]
+                for title, rows in self.groupRows(skuRows, "title").items():
+                    option = deepcopy(self.option)
+                    for row in rows:
+                        for k, v in option.items():
+                            if type(v) is list:
+                                optionValue = deepcopy(self.optionValue)
+                                for x in optionValue.keys():
+                                    optionValue[x] = row[x] if x in row.keys() else optionValue[x]
 
-                                    optionValue = {k: v for k, v in optionValue.items() if v is not None and v != ""}
-                                    if "option_value_title" in optionValue.keys():
-                                        option[k].append(optionValue)
-                                else:
-                                    option[k] = row[k] if k in row.keys() and row[k] is not None else option[k]
+                                optionValue = {k: v for k, v in optionValue.items() if v is not None and v != ""}
+                                if "option_value_title" in optionValue.keys():
+                                    option[k].append(optionValue)
+                            else:
+                                option[k] = row[k] if k in row.keys() and row[k] is not None else option[k]
 
-                        option = {k: v for k, v in option.items() if v is not None and v != ""}
-                        options.append(option)
+                    option = {k: v for k, v in option.items() if v is not None and v != ""}
+                    options.append(option)
                 productsExtData[sku]= options
             return productsExtData
         except Exception as e:
@@ -120,10 +121,8 @@ class S3Agency(FrontEnd, BackOffice):
     def setImageGallery(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
-            for sku in metaData["sku"]:
+            for sku, rows in self.groupRows(rawData, "sku").items():
                 imageGallery = deepcopy(self.imageGallery)
-                rows = list(filter(lambda t: (t["sku"]==sku), rawData))
                 uniqueValues = []
                 for row in rows:
                     mediaGallery = deepcopy(self.mediaGallery)
@@ -153,12 +152,11 @@ class S3Agency(FrontEnd, BackOffice):
     def setLinks(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
-            for sku in metaData["sku"]:
+            for sku, skuRows in self.groupRows(rawData, "sku").items():
                 links = deepcopy(self.links)
+                typeRows = self.groupRows(skuRows, "type")
                 for key in links.keys():
-                    rows = list(filter(lambda t: (t["sku"]==sku and t["type"]==key), rawData))
-                    for row in rows:
+                    for row in typeRows.get(key, []):
                         link = deepcopy(self.link)
                         for k,v in link.items():
                             link[k] = row[k]
@@ -173,10 +171,8 @@ class S3Agency(FrontEnd, BackOffice):
     def setCategories(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
-            for sku in metaData["sku"]:
+            for sku, rows in self.groupRows(rawData, "sku").items():
                 categories = []
-                rows = list(filter(lambda t: t["sku"]==sku, rawData))
                 for row in rows:
                     category = deepcopy(self.category)
                     for key in category.keys():
@@ -192,24 +188,21 @@ class S3Agency(FrontEnd, BackOffice):
     def setInventory(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku', 'warehouse'])
-            for sku in metaData["sku"]:
+            for sku, skuRows in self.groupRows(rawData, "sku").items():
                 inventories = []
-                for warehouse in metaData["warehouse"]:
-                    rows = list(filter(lambda t: (t["sku"]==sku and t["warehouse"]==warehouse), rawData))
-                    if len(rows) != 0:
-                        entity = rows[0]
-                        inventory = deepcopy(self.inventory)
-                        inventory["warehouse"] = warehouse
-                        inventory["qty"] = Decimal(entity["qty"])
-                        if "store_id" in entity.keys():
-                            inventory["store_id"] = entity["store_id"]
-                        if "full" in entity.keys():
-                            inventory["full"] = bool(entity["full"])
-                        if inventory["full"]:
-                            inventory["on_hand"] = inventory["qty"]
-                        inventory["in_stock"] = True if inventory["qty"] > 0 else False
-                        inventories.append(inventory)
+                for warehouse, rows in self.groupRows(skuRows, "warehouse").items():
+                    entity = rows[0]
+                    inventory = deepcopy(self.inventory)
+                    inventory["warehouse"] = warehouse
+                    inventory["qty"] = Decimal(entity["qty"])
+                    if "store_id" in entity.keys():
+                        inventory["store_id"] = entity["store_id"]
+                    if "full" in entity.keys():
+                        inventory["full"] = bool(entity["full"])
+                    if inventory["full"]:
+                        inventory["on_hand"] = inventory["qty"]
+                    inventory["in_stock"] = True if inventory["qty"] > 0 else False
+                    inventories.append(inventory)
                 productsExtData[sku] = inventories
             return productsExtData
         except Exception as e:
@@ -303,6 +296,7 @@ class S3Agency(FrontEnd, BackOffice):
     # Sync ItemReceipts from BackOffice to FrontEnd.
     def feItemReceiptsFt(self, cutDt=None):
         folder = "ItemReceipt"
+        self.s3.clearListings()
         rawItemReceipts = self.s3.getObjs(folder, limit=10)
         itemReceipts = []
         for rawItemReceipt in rawItemReceipts:
@@ -47,24 +47,21 @@ class SQSAgency(FrontEnd, BackOffice):
     def setInventory(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku', 'warehouse'])
-            for sku in metaData["sku"]:
+            for sku, skuRows in self.groupRows(rawData, "sku").items():
                 inventories = []
-                for warehouse in metaData["warehouse"]:
-                    rows = list(filter(lambda t: (t["sku"]==sku and t["warehouse"]==warehouse), rawData))
-                    if len(rows) != 0:
-                        entity = rows[0]
-                        inventory = deepcopy(self.inventory)
-                        inventory["warehouse"] = warehouse
-                        inventory["qty"] = Decimal(entity["qty"])
-                        if "store_id" in entity.keys():
-                            inventory["store_id"] = entity["store_id"]
-                        if "full" in entity.keys():
-                            inventory["full"] = bool(entity["full"])
-                        if inventory["full"]:
-                            inventory["on_hand"] = inventory["qty"]
-                        inventory["in_stock"] = True if inventory["qty"] > 0 else False
-                        inventories.append(inventory)
+                for warehouse, rows in self.groupRows(skuRows, "warehouse").items():
+                    entity = rows[0]
+                    inventory = deepcopy(self.inventory)
+                    inventory["warehouse"] = warehouse
+                    inventory["qty"] = Decimal(entity["qty"])
+                    if "store_id" in entity.keys():
+                        inventory["store_id"] = entity["store_id"]
+                    if "full" in entity.keys():
+                        inventory["full"] = bool(entity["full"])
+                    if inventory["full"]:
+                        inventory["on_hand"] = inventory["qty"]
+                    inventory["in_stock"] = True if inventory["qty"] > 0 else False
+                    inventories.append(inventory)
                 productsExtData[sku] = inventories
             return productsExtData
         except Exception as e:
@@ -75,10 +72,8 @@ class SQSAgency(FrontEnd, BackOffice):
     def setImageGallery(self, rawData):
         try:
             productsExtData = {}
-            metaData = dict((k, list(set(map(lambda d: d[k], rawData)))) for k in ['sku'])
-            for sku in metaData["sku"]:
+            for sku, rows in self.groupRows(rawData, "sku").items():
                 imageGallery = deepcopy(self.imageGallery)
-                rows = list(filter(lambda t: (t["sku"]==sku), rawData))
                 uniqueValues = []
                 for row in rows:
                     mediaGallery = deepcopy(self.mediaGallery)
@@ -0,0 +1,2 @@
+__all__ = ["datawald_tablemodel"]
+from .tablemodel import TableModel, JSONEncoder, tables, getTable, countSyncTask
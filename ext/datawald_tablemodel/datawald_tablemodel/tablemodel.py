@@ -0,0 +1,493 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+__author__ = 'bibow'
+
+import json, uuid, traceback, hashlib, threading, copy
+from datetime import datetime, date
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+logger = logging.getLogger()
+
+import boto3
+from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeDeserializer
+
+_local = threading.local()
+_lock = threading.Lock()
+_executors = {}
+
+
+def getTable(name):
+    """Table resource of the calling thread; boto3 resources are not thread-safe, so every
+    thread opens its own.
+    """
+    if getattr(_local, "tables", None) is None:
+        _local.dynamodb = boto3.session.Session().resource('dynamodb')
+        _local.tables = {}
+    if name not in _local.tables.keys():
+        _local.tables[name] = _local.dynamodb.Table(name)
+    return _local.tables[name]
+
+
+def getExecutor(maxWorkers):
+    """Workers of the batch endpoints, kept for the life of the container with their resources.
+    """
+    with _lock:
+        if maxWorkers not in _executors.keys():
+            _executors[maxWorkers] = ThreadPoolExecutor(max_workers=maxWorkers)
+        return _executors[maxWorkers]
+
+
+def countSyncTask(syncTaskId, processed, failed):
+    """Count processed (and failed) entities of the sync task; the count taking pending to 0
+    flips its sync_status.
+    """
+    table = getTable('sync_control')
+    try:
+        response = table.update_item(
+            Key={
+                'id': syncTaskId
+            },
+            UpdateExpression="ADD processed :val0, failed :val1, pending :val2",
+            # Sync tasks dispatched before the counters, or deleted by a reSync, are not counted.
+            ConditionExpression="attribute_exists(pending)",
+            ExpressionAttributeValues={
+                ':val0': processed,
+                ':val1': failed,
+                ':val2': -processed
+            },
+            ReturnValues="UPDATED_NEW"
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException as e:
+        return
+    counters = response["Attributes"]
+    if counters["pending"] == 0:
+        table.update_item(
+            Key={
+                'id': syncTaskId
+            },
+            UpdateExpression="set sync_status=:val0, end_dt=:val1",
+            ExpressionAttributeValues={
+                ':val0': 'Fail' if counters["failed"] > 0 else 'Completed',
+                ':val1': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            }
+        )
+
+
+# Helper class to convert a DynamoDB item to JSON.
+class JSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            if o % 1 > 0:
+                return float(o)
+            else:
+                return int(o)
+        elif isinstance(o, (datetime, date)):
+            return o.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(o, (bytes, bytearray)):
+            return str(o)
+        else:
+            return super(JSONEncoder, self).default(o)
+
+
+def setOldData(entity, item):
+    for k,v in item["data"].items():
+        if v != entity["data"].get(k, None):
+            entity["old_data"][k] = v
+
+
+def setInventory(entity, item):
+    for line in entity["data"]:
+        rows = list(filter(lambda t: (t["warehouse"]==line["warehouse"]), item["data"]))
+        if len(rows) > 0:
+            line["past_on_hand"] = rows[0]["on_hand"]
+
+        if not line["full"]:
+            line["on_hand"] = line["past_on_hand"] + line["qty"]
+        else:
+            line["on_hand"] = line["qty"]
+
+        if line["on_hand"] > 0:
+            line["in_stock"] = True
+
+
+def setHistory(entity, item):
+    history = {}
+    if 'history' in item.keys():
+        history = item['history']
+    history[item["create_dt"]] = item['data']
+    entity['history'] = history
+    if "bo_itemreceipt_id" in item.keys():
+        entity["bo_itemreceipt_id"] = item["bo_itemreceipt_id"]
+
+
+# Every table synced through DataWald, with its area (the API that stores it) and how it is
+# stored: label (log messages), defaults (set on every insert), mergeData (merges the stored
+# item into a changed entity), projection (extra attributes mergeData reads), keepCreateDt and
+# noUpdateStatus (tx_status of an unchanged entity, by default N if it is not synced yet and
+# I otherwise).
+tables = {
+    "orders": {
+        "area": "backoffice",
+        "srcKey": "fe_order_id",
+        "tgtKey": "bo_order_id",
+        "subject": "syncOrders",
+        "label": "order"
+    },
+    "customers-bo": {
+        "area": "backoffice",
+        "srcKey": "fe_customer_id",
+        "tgtKey": "bo_customer_id",
+        "subject": "syncBOCustomers",
+        "label": "customer"
+    },
+    "itemreceipts": {
+        "area": "backoffice",
+        "srcKey": "bo_po_num",
+        "tgtKey": "bo_itemreceipt_id",
+        "subject": "syncItemReceipts",
+        "label": "item recepit",
+        "mergeData": setHistory,
+        "projection": ["history", "bo_itemreceipt_id"],
+        "keepCreateDt": False,
+        "noUpdateStatus": "I"
+    },
+    "invoices": {
+        "area": "frontend",
+        "srcKey": "bo_invoice_id",
+        "tgtKey": "fe_invoice_id",
+        "subject": "syncInvoices",
+        "label": "invoice"
+    },
+    "customers-fe": {
+        "area": "frontend",
+        "srcKey": "bo_customer_id",
+        "tgtKey": "fe_customer_id",
+        "subject": "syncFECustomers",
+        "label": "customer"
+    },
+    "shipments": {
+        "area": "frontend",
+        "srcKey": "bo_shipment_id",
+        "tgtKey": "fe_shipment_id",
+        "subject": "syncShipments",
+        "label": "shipment"
+    },
+    "purchaseorders": {
+        "area": "frontend",
+        "srcKey": "bo_po_num",
+        "tgtKey": "fe_po_num",
+        "subject": "syncPurchaseOrders",
+        "label": "purchase order"
+    },
+    "products": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProducts",
+        "label": "product",
+        "defaults": {"old_data": {}},
+        "mergeData": setOldData
+    },
+    "products-customoption": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product custom option"
+    },
+    "products-inventory": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product inventory",
+        "mergeData": setInventory,
+        "noUpdateStatus": "N"
+    },
+    "products-imagegallery": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product image gallery"
+    },
+    "products-links": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product links"
+    },
+    "products-categories": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product categories"
+    },
+    "products-pricelevels": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product price levels"
+    },
+    "products-variants": {
+        "area": "frontend",
+        "srcKey": "sku",
+        "tgtKey": "fe_product_id",
+        "subject": "syncProductsExtData",
+        "label": "product variants"
+    }
+}
+
+
+class TableModel(object):
+    """Get, upsert and status updates of a table, configured by its entry in tables.
+
+    setting is the API's configuration; BATCHMAXWORKERS sizes the batch endpoints' workers.
+    """
+
+    def __init__(self, table, setting=None):
+        self.name = table
+        self.config = tables[table]
+        self.setting = setting if setting is not None else {}
+        # (frontend, key) -> id; ids never change, so they are kept for the life of the container.
+        self._ids = {}
+
+    @property
+    def table(self):
+        return getTable(self.name)
+
+    @property
+    def executor(self):
+        return getExecutor(int(self.setting.get("BATCHMAXWORKERS", 10)))
+
+    def _getEntity(self, frontend, key, projection=None):
+        kwargs = {
+            "IndexName": "frontend_index",
+            "KeyConditionExpression": Key('frontend').eq(frontend) & Key(self.config["srcKey"]).eq(key),
+            "Limit": 1
+        }
+        if projection is not None:
+            kwargs["ProjectionExpression"] = ",".join(["#p{0}".format(i) for i in range(len(projection))])
+            kwargs["ExpressionAttributeNames"] = dict([("#p{0}".format(i), p) for i, p in enumerate(projection)])
+        response = self.table.query(**kwargs)
+        return response
+
+    def getEntity(self, frontend, key):
+        entity = {}
+        response = self._getEntity(frontend, key)
+        if response['Count'] != 0:
+            entity = response["Items"][0]
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": (json.dumps(entity, indent=4, cls=JSONEncoder))
+        }
+
+    def _dataHash(self, data):
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(',', ':'), cls=JSONEncoder).encode("utf-8")
+        ).hexdigest()
+
+    def _entityId(self, frontend, key):
+        # The id is derived from the key, so an entity can be written without looking it up first.
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, "{0}/{1}/{2}".format(self.name, frontend, key)))
+
+    def _upsertEntity(self, source, frontend, key, entity):
+        """Insert or update an entity, keeping a digest of its data as data_hash.
+
+        An unchanged entity only costs a conditional update_item on data_hash.  The stored
+        item is read (from the failed condition or, for entities created before the ids were
+        derived from the key, from frontend_index) only when the data changed.
+        """
+        label = self.config["label"]
+        mergeData = self.config.get("mergeData")
+        noUpdateStatus = self.config.get("noUpdateStatus")
+        for k, v in self.config.get("defaults", {}).items():
+            entity[k] = copy.deepcopy(v)
+        entity["frontend"] = frontend
+        entity["tx_status"] = entity.get("tx_status", "N")
+        entity["tx_dt"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        entity["tx_note"] = '{0} -> DataWald'.format(source)
+        _id = self._ids.get((frontend, key), self._entityId(frontend, key))
+        dataHash = self._dataHash(entity["data"])
+        log = "No update {0}: {1}/{2}".format(label, frontend, key)
+
+        if noUpdateStatus is not None:
+            conditions = [(Attr('data_hash').eq(dataHash), noUpdateStatus)]
+        else:
+            # Try the common case first: an unchanged entity that was already synced.
+            conditions = [
+                (Attr('data_hash').eq(dataHash) & ~Attr('tx_status').is_in(['N', 'F']), 'I'),
+                (Attr('data_hash').eq(dataHash), 'N')
+            ]
+        item = None
+        for condition, txStatus in conditions:
+            try:
+                self.table.update_item(
+                    Key={
+                        'id': _id
+                    },
+                    UpdateExpression="set tx_dt=:val0, tx_status=:val1, tx_note=:val2",
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues={
+                        ':val0': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                        ':val1': txStatus,
+                        ':val2': log
+                    },
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD"
+                )
+                logger.info(log)
+                return (_id, log)
+            except self.table.meta.client.exceptions.ConditionalCheckFailedException as e:
+                item = e.response.get("Item")
+                if item is None:
+                    break
+                deserializer = TypeDeserializer()
+                item = dict((k, deserializer.deserialize(v)) for k, v in item.items())
+                if item.get("data_hash") != dataHash:
+                    break
+
+        if item is None:
+            response = self._getEntity(
+                frontend,
+                key,
+                projection=["id", "create_dt", "tx_status", "data_hash", "data"] + self.config.get("projection", [])
+            )
+            if response['Count'] != 0:
+                item = response["Items"][0]
+
+        if item is not None:
+            _id = item["id"]
+            self._ids[(frontend, key)] = _id
+            unchanged = item["data_hash"] == dataHash if "data_hash" in item.keys() \
+                else entity['data'] == item['data']
+            if unchanged:
+                self.table.update_item(
+                    Key={
+                        'id': _id
+                    },
+                    UpdateExpression="set tx_dt=:val0, tx_status=:val1, tx_note=:val2, data_hash=:val3",
+                    ExpressionAttributeValues={
+                        ':val0': datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                        ':val1': noUpdateStatus if noUpdateStatus is not None \
+                            else ("N" if item['tx_status'] in ('N', 'F') else 'I'),
+                        ':val2': log,
+                        ':val3': dataHash
+                    },
+                    ReturnValues="UPDATED_NEW"
+                )
+                logger.info(log)
+                return (_id, log)
+            if mergeData is not None:
+                mergeData(entity, item)
+            if self.config.get("keepCreateDt", True):
+                entity["create_dt"] = item["create_dt"]
+            log = "Successfully update {0}: {1}/{2}".format(label, frontend, key)
+        else:
+            log = "Successfully insert {0}: {1}/{2}".format(label, frontend, key)
+        entity["id"] = _id
+        entity["data_hash"] = self._dataHash(entity["data"])
+        self.table.put_item(Item=entity)
+        logger.info(log)
+        return (_id, log)
+
+    def insertEntity(self, source, frontend, key, entity):
+        (_id, log) = self._upsertEntity(source, frontend, key, entity)
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": json.dumps({
+                "id": _id,
+                "frontend": frontend,
+                self.config["srcKey"]: key
+            })
+        }
+
+    def insertEntities(self, source, frontend, entities):
+        keyName = self.config["srcKey"]
+        # The last entity wins when the same key is sent twice in one batch.
+        _entities = {}
+        for entity in entities:
+            _entities[entity[keyName]] = entity
+        keys = list(_entities.keys())
+
+        def insertEntity(key):
+            try:
+                (_id, log) = self._upsertEntity(source, frontend, key, _entities[key])
+                return {"id": _id, keyName: key, "tx_note": log}
+            except Exception as e:
+                log = traceback.format_exc()
+                logger.exception(log)
+                return {keyName: key, "error": log}
+
+        results = list(self.executor.map(insertEntity, keys))
+
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": json.dumps({
+                "frontend": frontend,
+                "entities": results
+            })
+        }
+
+    def updateEntityStatus(self, id, entityStatus):
+        tgtKey = self.config["tgtKey"]
+        txDt = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        response = self.table.update_item(
+            Key={
+                'id': id
+            },
+            UpdateExpression="set tx_dt=:val0, tx_status=:val1, tx_note=:val2, {0}=:val3".format(tgtKey),
+            ExpressionAttributeValues={
+                ':val0': txDt,
+                ':val1': entityStatus['tx_status'],
+                ':val2': entityStatus['tx_note'],
+                ':val3': entityStatus[tgtKey]
+            },
+            ReturnValues="UPDATED_OLD"
+        )
+        # Count the entity once, when its own status goes from N/P to a final one, so a redelivered
+        # message or a retried request does not count it again.
+        txStatus = response.get("Attributes", {}).get("tx_status")
+        response["Attributes"] = {
+            "tx_dt": txDt,
+            "tx_status": entityStatus['tx_status'],
+            "tx_note": entityStatus['tx_note'],
+            tgtKey: entityStatus[tgtKey]
+        }
+        if entityStatus.get("sync_task_id") is not None and \
+            txStatus in ["N", "P"] and entityStatus['tx_status'] not in ["N", "P"]:
+            countSyncTask(entityStatus["sync_task_id"], 1, 1 if entityStatus['tx_status'] == 'F' else 0)
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": (json.dumps(response, indent=4, cls=JSONEncoder))
+        }
+
+    def updateEntitiesStatus(self, entitiesStatus):
+        def updateStatus(id):
+            try:
+                self.updateEntityStatus(id, entitiesStatus[id])
+                return {"id": id}
+            except Exception as e:
+                log = traceback.format_exc()
+                logger.exception(log)
+                return {"id": id, "error": log}
+
+        ids = list(entitiesStatus.keys())
+        results = list(self.executor.map(updateStatus, ids))
+        return {
+            "statusCode": 200,
+            "headers": {},
+            "body": json.dumps({
+                "entities": results
+            })
+        }
@@ -0,0 +1,30 @@
+"""
+DataWald-TableModel
+---------------
+
+"""
+from setuptools import find_packages, setup
+
+setup(
+    name='DataWald-TableModel',
+    version='0.0.1',
+    #license='MIT',
+    author='Idea Bosque',
+    author_email='ideabosque@gmail.com',
+    description='DataWald table model of the API lambdas.',
+    long_description=__doc__,
+    packages=find_packages(),
+    include_package_data=True,
+    zip_safe=False,
+    platforms='Linux',
+    install_requires=['boto3'],
+    classifiers=[
+        #'License :: OSI Approved :: MIT License',
+        'Programming Language :: Python',
+        'Environment :: Web Environment',
+        'Intended Audience :: Developers',
+        'Operating System :: OS Independent',
+        'Topic :: Internet :: WWW/HTTP :: Dynamic Content',
+        'Topic :: Software Development :: Libraries :: Python Modules'
+    ]
+)
@@ -8,6 +8,7 @@ pip install ./aws_iqmetrixconnector --upgrade
 pip install ./aws_repairdeskconnector --upgrade
 pip install ./aws_mage2connector --upgrade
 pip install ./datawald_abstract --upgrade
+pip install ./datawald_tablemodel --upgrade
 pip install ./datawald_backoffice --upgrade
 pip install ./datawald_frontend --upgrade
 pip install ./datawald_s3agency --upgrade
@@ -8,6 +8,7 @@ pip uninstall AWS-IQMetrixConnector
 pip uninstall AWS-RepairDeskConnector
 pip uninstall AWS-Mage2Connector
 pip uninstall DataWald-Abstract
+pip uninstall DataWald-TableModel
 pip uninstall DataWald-BackOffice
 pip uninstall DataWald-Frontend
 pip uninstall DataWald-S3Agency
@@ -5,11 +5,19 @@ __author__ = 'bibow'
 
 import json, traceback, boto3, os
 from time import sleep
+from aws_sqsconnector import SQSConnector
+from datetime import datetime
+try:
+    from urllib.parse import unquote_plus
+except ImportError:
+    from urllib import unquote_plus
 
 import logging
 logger = logging.getLogger()
 logger.setLevel(eval(os.environ["LOGGINGLEVEL"]))
 lastRequestId = None
+# Drain the sync queues with long polling from one invocation (see drainQueue).
+longPolling = os.environ.get("SQSWAITTIMESECONDS") is not None
 
 def invoke(functionName, payload, invocationType="Event"):
     response = boto3.client('lambda').invoke(
@@ -53,7 +61,9 @@ def syncData(backoffice, queueName, subject):
                     VisibilityTimeout=600
                 )
                 for message in response['Messages']:
-                    data.append(json.loads(message['Body']))
+                    body = json.loads(message['Body'])
+                    # A message holds one entity, or a list of them when dispatchSyncTask packs them.
+                    data.extend(body if isinstance(body, list) else [body])
                     boto3.client('sqs').delete_message(
                         QueueUrl=queueUrl,
                         ReceiptHandle=message['ReceiptHandle']
@@ -75,6 +85,64 @@ def syncData(backoffice, queueName, subject):
         invoke(os.environ["CORETASKARN"], payload)
     return (queueUrl, len(data), totalMessages)
 
+def drainQueue(app, queueName, subject, context, syncTaskApp=None):
+    """Forward the messages of the queue to the core task with SQSConnector.drainQueue.
+
+    With syncTaskApp, the queue is a long-lived one shared by sync tasks, and the end-of-task
+    message of each task triggers its updateSyncTask on syncTaskApp.
+    """
+    def forward(data, syncTaskIds):
+        if len(data) != 0:
+            payload = {
+                "app": app,
+                "funct": subject,
+                "params": json.dumps({"data": data})
+            }
+            invoke(os.environ["CORETASKARN"], payload)
+        for syncTaskId in syncTaskIds:
+            invoke(
+                os.environ["CORETASKARN"],
+                {
+                    "app": syncTaskApp,
+                    "funct": "updateSyncTask",
+                    "params": json.dumps({"id": syncTaskId})
+                }
+            )
+
+    setting = dict(
+        [(k, os.environ[k]) for k in ["SQSTIMEBUDGET", "SQSWAITTIMESECONDS", "SQSMAXMSG"] if k in os.environ.keys()]
+    )
+    return SQSConnector(setting=setting, logger=logger).drainQueue(
+        queueName,
+        forward,
+        context.get_remaining_time_in_millis,
+        shared=syncTaskApp is not None
+    )
+
+
+def updateS3Manifest(records):
+    # Index the pending import objects (see S3Connector.manifest) so the connector pages
+    # them from DynamoDB instead of listing the whole prefix. Objects uploaded before the
+    # table existed are indexed by S3Connector.backfillManifest.
+    table = boto3.resource('dynamodb').Table(os.environ["S3MANIFESTTABLE"])
+    with table.batch_writer() as batch:
+        for record in records:
+            bucket = record['s3']['bucket']['name']
+            key = unquote_plus(record['s3']['object']['key'])
+            if key.find('/') == -1 or key.find('.') == -1:
+                continue
+            prefix = "{0}/{1}/*.{2}".format(bucket, key.split('/')[0], key.rsplit('.', 1)[1])
+            lastModified = datetime.strptime(record['eventTime'][0:19], "%Y-%m-%dT%H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+            if record['eventName'].startswith("ObjectCreated"):
+                batch.put_item(
+                    Item={
+                        "prefix": prefix,
+                        "sort_key": "{0}#{1}".format(lastModified, key),
+                        "key": key,
+                        "last_modified": lastModified,
+                        "size": record['s3']['object'].get('size', 0)
+                    }
+                )
 
 def handler(event, context):
     # TODO implement
@@ -86,40 +154,47 @@ def handler(event, context):
 
     try:
         if 'Records' in event.keys() and event['Records'][0]['eventSource'] == "aws:s3":
-            record = event['Records'][0]
-            bucket = record['s3']['bucket']['name']
-            key = record['s3']['object']['key']
-            keys = key.split('/')
-            if keys[0] == "product":
-                payload = {
-                    "app": "{0}.{1}".format("bo", "s3"),
-                    "funct": "syncProducts",
-                    "params": json.dumps(
-                        {
-                            "bucket": bucket,
-                            "key": key,
-                            "newLine": "\n",
-                            "frontend": keys[1],
-                            "table": keys[2]
-                        }
-                    )
-                }
-                invoke(os.environ["CORETASKARN"], payload)
-            elif keys[0] in ["customoption",'imagegallery','links','categories','inventory','pricelevels']:
-                payload = {
-                    "app": "{0}.{1}".format("bo", "s3"),
-                    "funct": "syncProductsExtData",
-                    "params": json.dumps(
-                        {
-                            "bucket": bucket,
-                            "key": key,
-                            "newLine": "\n",
-                            "frontend": keys[1],
-                            "dataType" : keys[0]
-                        }
-                    )
-                }
-                invoke(os.environ["CORETASKARN"], payload)
+            # Decide per record: one event may carry objects of several folders.
+            manifestRecords = []
+            for record in event['Records']:
+                bucket = record['s3']['bucket']['name']
+                key = record['s3']['object']['key']
+                keys = key.split('/')
+                if keys[0] not in ["product", "customoption", "imagegallery", "links", "categories", "inventory", "pricelevels"] \
+                    and os.environ.get("S3MANIFESTTABLE") is not None:
+                    manifestRecords.append(record)
+                elif keys[0] == "product":
+                    payload = {
+                        "app": "{0}.{1}".format("bo", "s3"),
+                        "funct": "syncProducts",
+                        "params": json.dumps(
+                            {
+                                "bucket": bucket,
+                                "key": key,
+                                "newLine": "\n",
+                                "frontend": keys[1],
+                                "table": keys[2]
+                            }
+                        )
+                    }
+                    invoke(os.environ["CORETASKARN"], payload)
+                elif keys[0] in ["customoption",'imagegallery','links','categories','inventory','pricelevels']:
+                    payload = {
+                        "app": "{0}.{1}".format("bo", "s3"),
+                        "funct": "syncProductsExtData",
+                        "params": json.dumps(
+                            {
+                                "bucket": bucket,
+                                "key": key,
+                                "newLine": "\n",
+                                "frontend": keys[1],
+                                "dataType" : keys[0]
+                            }
+                        )
+                    }
+                    invoke(os.environ["CORETASKARN"], payload)
+            if len(manifestRecords) > 0:
+                updateS3Manifest(manifestRecords)
 
         else:
             subject = event['subject']
@@ -129,9 +204,20 @@ def handler(event, context):
                 backoffice = i[0].upper()
                 feApp = i[1].upper()
                 table = i[2]
-                id = i[3]
+                # A queue without a task id is a long-lived one shared by the sync tasks (SQSSHAREDQUEUES).
+                id = i[3] if len(i) > 3 else None
                 try:
-                    (queueUrl, processedMessages, totalMessages) = syncData(backoffice, queueName, subject)
+                    if id is None:
+                        (queueUrl, processedMessages, totalMessages) = drainQueue(
+                            "{0}.{1}".format("bo", backoffice), queueName, subject, context,
+                            syncTaskApp="{0}.{1}".format("fe", feApp)
+                        )
+                    elif longPolling:
+                        (queueUrl, processedMessages, totalMessages) = drainQueue(
+                            "{0}.{1}".format("bo", backoffice), queueName, subject, context
+                        )
+                    else:
+                        (queueUrl, processedMessages, totalMessages) = syncData(backoffice, queueName, subject)
                 except Exception as e:
                     log = traceback.format_exc()
                     logger.exception(log)
@@ -148,7 +234,9 @@ def handler(event, context):
                 logger.info({"queueUrl": queueUrl, "processedMessages": processedMessages, "totalMessages": totalMessages})
                 if queueUrl is not None:
                     if totalMessages == 0:
-                        sleep(15)
+                        if id is None:
+                            return
+                        # updateSyncTask waits on the sync task's pending count, not a fixed delay.
                         invoke(
                             os.environ["CORETASKARN"],
                             {
@@ -158,7 +246,8 @@ def handler(event, context):
                             }
                         )
                     else:
-                        sleep(5)
+                        if not longPolling and id is not None:
+                            sleep(5)
                         invoke(
                             context.invoked_function_arn,
                             {
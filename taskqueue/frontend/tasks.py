@@ -5,11 +5,14 @@ __author__ = 'bibow'
 
 import json, traceback, boto3, os
 from time import sleep
+from aws_sqsconnector import SQSConnector
 
 import logging
 logger = logging.getLogger()
 logger.setLevel(eval(os.environ["LOGGINGLEVEL"]))
 lastRequestId = None
+# Drain the sync queues with long polling from one invocation (see drainQueue).
+longPolling = os.environ.get("SQSWAITTIMESECONDS") is not None
 
 def invoke(functionName, payload, invocationType="Event"):
     response = boto3.client('lambda').invoke(
@@ -53,7 +56,9 @@ def syncData(feApp, queueName, subject):
                     VisibilityTimeout=600
                 )
                 for message in response['Messages']:
-                    data.append(json.loads(message['Body']))
+                    body = json.loads(message['Body'])
+                    # A message holds one entity, or a list of them when dispatchSyncTask packs them.
+                    data.extend(body if isinstance(body, list) else [body])
                     boto3.client('sqs').delete_message(
                         QueueUrl=queueUrl,
                         ReceiptHandle=message['ReceiptHandle']
@@ -75,6 +80,40 @@ def syncData(feApp, queueName, subject):
         invoke(os.environ["CORETASKARN"], payload)
     return (queueUrl, len(data), totalMessages)
 
+def drainQueue(app, queueName, subject, context, syncTaskApp=None):
+    """Forward the messages of the queue to the core task with SQSConnector.drainQueue.
+
+    With syncTaskApp, the queue is a long-lived one shared by sync tasks, and the end-of-task
+    message of each task triggers its updateSyncTask on syncTaskApp.
+    """
+    def forward(data, syncTaskIds):
+        if len(data) != 0:
+            payload = {
+                "app": app,
+                "funct": subject,
+                "params": json.dumps({"data": data})
+            }
+            invoke(os.environ["CORETASKARN"], payload)
+        for syncTaskId in syncTaskIds:
+            invoke(
+                os.environ["CORETASKARN"],
+                {
+                    "app": syncTaskApp,
+                    "funct": "updateSyncTask",
+                    "params": json.dumps({"id": syncTaskId})
+                }
+            )
+
+    setting = dict(
+        [(k, os.environ[k]) for k in ["SQSTIMEBUDGET", "SQSWAITTIMESECONDS", "SQSMAXMSG"] if k in os.environ.keys()]
+    )
+    return SQSConnector(setting=setting, logger=logger).drainQueue(
+        queueName,
+        forward,
+        context.get_remaining_time_in_millis,
+        shared=syncTaskApp is not None
+    )
+
 
 def handler(event, context):
     # TODO implement
@@ -101,9 +140,20 @@ def handler(event, context):
             backoffice = i[0].upper()
             feApp = i[1].upper()
             table = i[2]
-            id = i[3]
+            # A queue without a task id is a long-lived one shared by the sync tasks (SQSSHAREDQUEUES).
+            id = i[3] if len(i) > 3 else None
             try:
-                (queueUrl, processedMessages, totalMessages) = syncData(feApp, queueName, subject)
+                if id is None:
+                    (queueUrl, processedMessages, totalMessages) = drainQueue(
+                        "{0}.{1}".format("fe", feApp), queueName, subject, context,
+                        syncTaskApp="{0}.{1}".format("bo", backoffice)
+                    )
+                elif longPolling:
+                    (queueUrl, processedMessages, totalMessages) = drainQueue(
+                        "{0}.{1}".format("fe", feApp), queueName, subject, context
+                    )
+                else:
+                    (queueUrl, processedMessages, totalMessages) = syncData(feApp, queueName, subject)
             except Exception as e:
                 log = traceback.format_exc()
                 logger.exception(log)
@@ -120,7 +170,9 @@ def handler(event, context):
             logger.info({"queueUrl": queueUrl, "processedMessages": processedMessages, "totalMessages": totalMessages})
             if queueUrl is not None:
                 if totalMessages == 0:
-                    sleep(15)
+                    if id is None:
+                        return
+                    # updateSyncTask waits on the sync task's pending count, not a fixed delay.
                     invoke(
                         os.environ["CORETASKARN"],
                         {
@@ -130,7 +182,8 @@ def handler(event, context):
                         }
                     )
                 else:
-                    sleep(5)
+                    if not longPolling and id is not None:
+                        sleep(5)
                     invoke(
                         context.invoked_function_arn,
                         {